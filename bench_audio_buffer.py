@@ -0,0 +1,151 @@
+
+"""
+Benchmark: per-call inbound audio buffering, old bytearray path vs AudioRingBuffer.
+
+Simulates N concurrent calls receiving Twilio media packets (20ms, base64)
+round-robin, running the VAD-side work for every frame (decode, webrtcvad,
+RMS) and handing an utterance to "ASR" every 3 seconds.
+
+    old:  b64decode -> vad_buffer.extend -> bytes(vad_buffer[:160]) + del vad_buffer[:160]
+          -> collected_audio.extend -> bytes(collected_audio) per utterance
+    ring: b64decode -> ring.write -> memoryview frame -> ring.view(start, end) per utterance
+
+Reports CPU time per audio-second per call, memory briefly allocated per
+frame (tracemalloc peak above baseline), memory held per call (including
+the preallocated ring) and GC collections, for the buffering alone and for the full per-frame path.
+
+    python bench_audio_buffer.py --calls 300 --seconds 30
+"""
+import argparse
+import base64
+import gc
+import random
+import time
+import tracemalloc
+
+import webrtcvad
+
+from voice_server.audio.codec import decode_mulaw, mulaw_rms, mulaw_to_pcm16, FRAME_BYTES
+from voice_server.audio.ring_buffer import AudioRingBuffer
+
+UTTERANCE_FRAMES = 100   # 2s of speech...
+TURN_FRAMES = 150        # ...every 3s
+
+
+class OldCall:
+    def __init__(self, vad: bool = True):
+        self.vad = webrtcvad.Vad(2) if vad else None
+        self.vad_buffer = bytearray()
+        self.collected_audio = bytearray()
+        self.frames = 0
+
+    def on_packet(self, payload: str):
+        self.vad_buffer.extend(base64.b64decode(payload))
+        while len(self.vad_buffer) >= 160:
+            frame = bytes(self.vad_buffer[:160])
+            del self.vad_buffer[:160]
+            if self.vad:
+                self.vad.is_speech(mulaw_to_pcm16(frame), 8000)
+                mulaw_rms(frame)
+            phase = self.frames % TURN_FRAMES
+            if phase == 0:
+                self.collected_audio.clear()
+            if phase < UTTERANCE_FRAMES and len(self.collected_audio) < 160000:
+                self.collected_audio.extend(frame)
+            if phase == UTTERANCE_FRAMES:
+                utterance = bytes(self.collected_audio)
+                self.collected_audio.clear()
+                assert len(utterance) == UTTERANCE_FRAMES * FRAME_BYTES
+            self.frames += 1
+
+
+class RingCall:
+    def __init__(self, vad: bool = True, ring_seconds: float = 12):
+        self.vad = webrtcvad.Vad(2) if vad else None
+        self.audio = AudioRingBuffer(int(ring_seconds * 8000), max_backlog=100 * FRAME_BYTES)
+        self.pcm = None
+        self.start = 0
+        self.frames = 0
+
+    def on_packet(self, payload: str):
+        self.audio.write(base64.b64decode(payload))
+        while True:
+            frame = self.audio.read_frame()
+            if frame is None:
+                break
+            if self.vad:
+                self.pcm = decode_mulaw(frame, out=self.pcm)
+                self.vad.is_speech(self.pcm, 8000)
+                mulaw_rms(frame)
+            phase = self.frames % TURN_FRAMES
+            if phase == 0:
+                self.start = self.audio.read_pos - FRAME_BYTES
+            if phase == UTTERANCE_FRAMES:
+                utterance = self.audio.view(self.start, self.audio.read_pos - FRAME_BYTES)
+                assert len(utterance) == UTTERANCE_FRAMES * FRAME_BYTES
+            self.frames += 1
+
+
+def packets(n: int, seed: int = 0):
+    rnd = random.Random(seed)
+    return [base64.b64encode(bytes(rnd.randrange(256) for _ in range(FRAME_BYTES))).decode() for _ in range(n)]
+
+
+def run(name, factory, calls, seconds, payloads):
+    gc.collect()
+    collections = [0, 0, 0]
+
+    def on_gc(phase, info):
+        if phase == "start":
+            collections[info["generation"]] += 1
+
+    n_frames = int(seconds * 50)
+    sessions = [factory() for _ in range(calls)]
+
+    # Pass 1: CPU time (no tracing overhead)
+    gc.callbacks.append(on_gc)
+    t0 = time.process_time()
+    for i in range(n_frames):
+        payload = payloads[i % len(payloads)]
+        for s in sessions:
+            s.on_packet(payload)
+    cpu = time.process_time() - t0
+    gc.callbacks.remove(on_gc)
+
+    # Pass 2: allocation volume and per-call footprint on a slice of the calls
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    sample = [factory() for _ in range(min(calls, 20))]
+    allocated = 0
+    for i in range(n_frames):
+        payload = payloads[i % len(payloads)]
+        for s in sample:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            s.on_packet(payload)
+            _, peak = tracemalloc.get_traced_memory()
+            allocated += peak - before  # bytes briefly needed by this packet
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    frames = n_frames * len(sample)
+    print(f"{name:<14}{cpu / (calls * seconds) * 1e6:>14.1f}{allocated / frames:>14.0f}"
+          f"{(retained - base) / len(sample) / 1024:>14.1f}{collections[0]:>8}{collections[1]:>6}{collections[2]:>6}")
+    return cpu
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--seconds", type=float, default=30)
+    args = parser.parse_args()
+
+    payloads = packets(500)
+    print(f"{args.calls} calls x {args.seconds:.0f}s of audio")
+    print(f"{'path':<14}{'cpu us/s/call':>14}{'B alloc/frm':>14}{'KiB/call':>14}{'gc0':>8}{'gc1':>6}{'gc2':>6}")
+    # Buffering alone, then the full per-frame path (buffering + decode + webrtcvad + RMS)
+    old = run("old/buffer", lambda: OldCall(vad=False), args.calls, args.seconds, payloads)
+    new = run("ring/buffer", lambda: RingCall(vad=False), args.calls, args.seconds, payloads)
+    old_full = run("old/frame", OldCall, args.calls, args.seconds, payloads)
+    new_full = run("ring/frame", RingCall, args.calls, args.seconds, payloads)
+    print(f"\nCPU speed-up: buffering {old / new:.2f}x, full frame path {old_full / new_full:.2f}x")
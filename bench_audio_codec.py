@@ -0,0 +1,101 @@
+
+"""
+Benchmark: per-frame audio work in the media-stream loop.
+Compares the old per-byte struct implementation against voice_server.audio.codec
+and reports frames/sec on one core plus how many live calls that covers
+(one call = 50 frames/sec).
+"""
+import math
+import os
+import random
+import struct
+import time
+
+from voice_server.audio import codec
+
+FRAMES_PER_CALL_SEC = 1000 // 20
+
+
+# --- LEGACY (copied from the old voice_server/main.py) ---
+def legacy_mulaw_to_pcm16(data: bytes) -> bytes:
+    res = bytearray()
+    for b in data:
+        b = ~b & 0xFF
+        sign = b & 0x80
+        exponent = (b >> 4) & 0x07
+        mantissa = b & 0x0F
+        sample = (2 * mantissa + 33) << (exponent + 2)
+        sample -= 33
+        if sign == 0: sample = -sample
+        if sample > 32767: sample = 32767
+        if sample < -32768: sample = -32768
+        res.extend(struct.pack('<h', sample))
+    return bytes(res)
+
+
+def legacy_calculate_rms(pcm_data: bytes) -> float:
+    if not pcm_data: return 0.0
+    count = len(pcm_data) // 2
+    sum_squares = 0.0
+    for i in range(0, len(pcm_data), 2):
+        sample = struct.unpack('<h', pcm_data[i:i+2])[0]
+        sum_squares += sample * sample
+    return math.sqrt(sum_squares / count)
+
+
+def legacy_frame(frame):
+    pcm = legacy_mulaw_to_pcm16(frame)
+    return pcm, legacy_calculate_rms(pcm)
+
+
+def codec_frame(frame):
+    return codec.mulaw_to_pcm16(frame), codec.mulaw_rms(frame)
+
+
+def bench(fn, frames, seconds=2.0):
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for f in frames:
+            fn(f)
+        done += len(frames)
+    return done / (time.perf_counter() - start)
+
+
+def check_parity(frames):
+    for f in frames:
+        pcm_old, rms_old = legacy_frame(f)
+        pcm_new, rms_new = codec_frame(f)
+        assert pcm_old == pcm_new, "PCM mismatch"
+        assert abs(rms_old - rms_new) < 1e-6 * max(1.0, rms_old), "RMS mismatch"
+        assert abs(codec.pcm16_rms(pcm_new) - rms_old) < 1e-6 * max(1.0, rms_old)
+    all_codes = bytes(range(256))
+    assert codec.mulaw_to_pcm16(all_codes) == legacy_mulaw_to_pcm16(all_codes)
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    frames = [bytes(random.getrandbits(8) for _ in range(codec.FRAME_BYTES)) for _ in range(200)]
+    views = [memoryview(bytearray(f)) for f in frames]
+
+    print(f"numpy backend: {codec.has_numpy()} | pid {os.getpid()}")
+    check_parity(frames)
+    print("✅ Parity: codec output matches legacy decode + RMS")
+
+    legacy_fps = bench(legacy_frame, frames)
+    codec_fps = bench(codec_frame, frames)
+    view_fps = bench(codec_frame, views)
+
+    # Whole-buffer path: 1s of audio per call
+    second = b"".join(frames[:FRAMES_PER_CALL_SEC])
+    batch_fps = bench(lambda buf: codec.frame_rms(buf), [second]) * FRAMES_PER_CALL_SEC
+
+    print(f"{'path':<28}{'frames/sec':>14}{'calls/core':>14}")
+    for name, fps in [
+        ("legacy struct loop", legacy_fps),
+        ("codec (bytes)", codec_fps),
+        ("codec (memoryview)", view_fps),
+        ("codec frame_rms (batch)", batch_fps),
+    ]:
+        print(f"{name:<28}{fps:>14,.0f}{fps / FRAMES_PER_CALL_SEC:>14,.0f}")
+    print(f"Speed-up (per frame): {codec_fps / legacy_fps:.1f}x")
@@ -0,0 +1,161 @@
+"""
+Benchmark: graph checkpoint cost, MemorySaver vs the SQLite checkpointer.
+
+1. Raw latency of aput / aput_writes / aget_tuple with a triage-sized state
+   (a conversation of --messages messages plus retrieved protocols), one
+   call at a time.
+2. --calls concurrent calls each running --turns turns through a graph with
+   the triage graph's shape (4 nodes, TriageState), so every turn does the
+   same checkpoint reads/writes as the real agent. Reports turn p50/p95 and
+   how many writes each SQLite commit carried (group commit).
+
+    python bench_checkpointer.py --calls 20 --turns 10
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, StateGraph
+
+from voice_server.agent.state import TriageState
+from voice_server.core.checkpointer import SqliteCheckpointSaver
+
+PROTOCOL = "If the patient reports chest pain radiating to the arm, escalate immediately. " * 6
+
+
+def triage_values(n_messages: int) -> dict:
+    messages = []
+    for i in range(n_messages // 2):
+        messages.append(HumanMessage(content=f"I have had a headache for {i + 1} days and it is getting worse"))
+        messages.append(AIMessage(content="I understand. Do you have any fever, stiff neck or sensitivity to light?"))
+    return {
+        "messages": messages,
+        "patient_profile": {"age": 42, "gender": None, "symptoms": ["headache", "sore throat"],
+                            "denied_symptoms": ["fever"], "duration": "2 days",
+                            "medical_history": [], "current_meds": []},
+        "retrieved_protocols": [PROTOCOL] * 3,
+        "differential_diagnosis": ["tension headache", "migraine"],
+        "safety_checklist": ["fever", "stiff neck"],
+        "investigated_symptoms": ["fever"],
+        "triage_decision": "PENDING",
+        "final_advice": "",
+        "final_response": "Do you have any fever?",
+        "assessment_complete": False,
+        "session_id": "bench",
+    }
+
+
+def pct(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, int(q * len(ordered) + 0.999999) - 1)]
+
+
+async def raw_latency(name, saver, n_messages, ops=300):
+    values = triage_values(n_messages)
+    put_ms, writes_ms, get_ms = [], [], []
+    config = {"configurable": {"thread_id": f"raw-{name}", "checkpoint_ns": ""}}
+    checkpoint = empty_checkpoint()
+    for step in range(ops):
+        versions = {k: saver.get_next_version(checkpoint["channel_versions"].get(k), None) for k in values}
+        checkpoint = create_checkpoint(checkpoint, None, step)
+        checkpoint["channel_values"] = values
+        checkpoint["channel_versions"] = versions
+
+        t0 = time.perf_counter()
+        config = await saver.aput(config, checkpoint, {"source": "loop", "step": step}, versions)
+        t1 = time.perf_counter()
+        await saver.aput_writes(config, [("messages", values["messages"][-1:]), ("final_response", "ok")], f"task-{step}")
+        t2 = time.perf_counter()
+        tup = await saver.aget_tuple({"configurable": {"thread_id": f"raw-{name}"}})
+        t3 = time.perf_counter()
+        assert tup is not None and tup.checkpoint["id"] == checkpoint["id"]
+        put_ms.append((t1 - t0) * 1000)
+        writes_ms.append((t2 - t1) * 1000)
+        get_ms.append((t3 - t2) * 1000)
+    print(f"{name:<24}" + "".join(f"{pct(v, 0.5):>9.3f}{pct(v, 0.95):>9.3f}" for v in (put_ms, writes_ms, get_ms)))
+
+
+def build_graph(saver):
+    async def node(state):
+        await asyncio.sleep(0)
+        return {"final_response": "ok"}
+
+    async def reply(state):
+        return {"messages": [AIMessage(content="Do you have any fever, stiff neck or sensitivity to light?")]}
+
+    workflow = StateGraph(TriageState)
+    for name in ("emergency_scan", "retrieval", "diagnostician"):
+        workflow.add_node(name, node)
+    workflow.add_node("strategist", reply)
+    workflow.set_entry_point("emergency_scan")
+    workflow.add_edge("emergency_scan", "retrieval")
+    workflow.add_edge("retrieval", "diagnostician")
+    workflow.add_edge("diagnostician", "strategist")
+    workflow.add_edge("strategist", END)
+    return workflow.compile(checkpointer=saver)
+
+
+async def concurrent_turns(name, saver, calls, turns, n_messages):
+    graph = build_graph(saver)
+    seed = triage_values(n_messages)
+    turn_ms = []
+
+    async def call(i):
+        config = {"configurable": {"thread_id": f"{name}-call-{i}"}}
+        state = dict(seed)
+        for t in range(turns):
+            state["messages"] = [HumanMessage(content=f"turn {t}: it is about the same")] if t else seed["messages"]
+            start = time.perf_counter()
+            await graph.ainvoke(state, config=config)
+            turn_ms.append((time.perf_counter() - start) * 1000)
+            state = {"messages": []}
+
+    commits, writes = getattr(saver, "commits", 0), getattr(saver, "writes", 0)
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(calls)))
+    wall = time.perf_counter() - start
+    per_commit = ""
+    if hasattr(saver, "commits"):
+        per_commit = f"{(saver.writes - writes) / max(1, saver.commits - commits):>15.1f}"
+    print(f"{name:<24}{pct(turn_ms, 0.5):>9.2f}{pct(turn_ms, 0.95):>9.2f}{calls * turns / wall:>11.0f}{per_commit}")
+
+
+async def main(args):
+    directory = tempfile.mkdtemp(prefix="bench_checkpoints_")
+    backends = [("memory", lambda tag: MemorySaver())]
+    for sync in ("OFF", "NORMAL", "FULL"):
+        for batch in (0, 2):
+            backends.append((f"sqlite {sync} batch={batch}ms",
+                             lambda tag, s=sync, b=batch: SqliteCheckpointSaver(
+                                 os.path.join(directory, f"{tag}-{s}-{b}.sqlite"), synchronous=s, batch_ms=b)))
+
+    print(f"State: {args.messages} messages. Times in ms (p50 / p95), one call at a time")
+    print(f"{'backend':<24}{'put p50':>9}{'p95':>9}{'writes':>9}{'p95':>9}{'get p50':>9}{'p95':>9}")
+    for name, factory in backends:
+        saver = factory("raw")
+        await raw_latency(name, saver, args.messages)
+        if hasattr(saver, "close"):
+            saver.close()
+
+    print(f"\n{args.calls} concurrent calls x {args.turns} turns through a 4-node triage-shaped graph")
+    print(f"{'backend':<24}{'turn p50':>9}{'p95':>9}{'turns/s':>11}{'writes/commit':>15}")
+    for name, factory in backends:
+        saver = factory("graph")
+        await concurrent_turns(name, saver, args.calls, args.turns, args.messages)
+        if hasattr(saver, "close"):
+            saver.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=20, help="messages already in the conversation")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,151 @@
+"""
+Benchmark: the guideline chunker on a large synthetic corpus.
+
+Synthetic pages (topic headings, section markers, body text) are generated
+lazily, so the corpus never exists in memory as a whole. Paths compared:
+- legacy: the previous chunk_pdf logic. It joins every page into one
+  string, splits it into a line list, loops over every topic and section
+  keyword per line, and returns the full chunk list.
+- streaming: SmartChunker.iter_chunks (pages -> lines -> chunks) feeding
+  iter_batches, with only a count kept. Uses compiled multi-pattern matching.
+  It starts each document afresh, so it yields a few more chunks than legacy.
+
+Reports lines/sec, chunks/sec and the Python heap peak (tracemalloc,
+measured in a separate pass) at two corpus sizes. The streaming peak should
+stay flat as the corpus grows.
+
+With --pdf-copies N, the real guideline PDF is also linked N times into a
+temporary directory and pushed through iter_pages with --workers processes
+(pages/sec for the whole extraction + chunking pipeline).
+
+    python bench_chunker.py --pages 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from ingest_agentic import BATCH_SIZE, DATA_PATH, SmartChunker, iter_batches, iter_documents, iter_pages
+
+WORDS = ("child fever cough fluids breathing dehydration mother health worker refer facility ORS zinc "
+         "days temperature rash stool vomiting pain feeding advice danger check follow up dose tablet").split()
+HEADINGS = ["UNIT {n}: {topic}", "Module {n} - {topic}", "{TOPIC}"]
+MARKERS = ["Danger Signs", "When to refer", "Management", "Treatment", "Assessment", "Signs and symptoms",
+           "Clinical features"]
+TOPICS = ["Fever", "Cough", "Diarrhoea", "Vomiting", "Burns", "Poisoning", "Hypertension", "Stroke"]
+
+
+def synthetic_pages(n_pages, pages_per_doc=200, lines_per_page=40, seed=0):
+    """(source, page text) for n_pages pages, generated on demand."""
+    rng = random.Random(seed)
+    for page in range(n_pages):
+        lines = []
+        for _ in range(lines_per_page):
+            roll = rng.random()
+            if roll < 0.01:
+                topic = rng.choice(TOPICS)
+                lines.append(rng.choice(HEADINGS).format(n=rng.randint(1, 30), topic=topic, TOPIC=topic.upper()))
+            elif roll < 0.06:
+                lines.append(rng.choice(MARKERS))
+            else:
+                lines.append(" ".join(rng.choices(WORDS, k=rng.randint(6, 14))))
+        yield f"doc_{page // pages_per_doc:05d}.pdf", "\n".join(lines)
+
+
+def legacy_chunks(chunker, pages):
+    """The pre-streaming chunk_pdf body, minus the PDF read."""
+    full_text = ""
+    for _, text in pages:
+        full_text += text + "\n"
+    chunks = []
+    lines = full_text.split('\n')
+    current_topic = "General Introduction"
+    current_chunk_buffer = []
+    current_section_type = "REFERENCE"
+    for line in lines:
+        clean_line = line.strip()
+        if not clean_line:
+            continue
+        is_new_topic = False
+        for topic in chunker.TOPICS:
+            if len(clean_line) < 50 and topic.upper() in clean_line.upper():
+                if clean_line.isupper() or "Unit" in clean_line or "Module" in clean_line:
+                    if current_chunk_buffer:
+                        chunks.append(chunker._create_chunk(current_topic, current_section_type, current_chunk_buffer))
+                        current_chunk_buffer = []
+                    current_topic = topic
+                    current_section_type = "REFERENCE"
+                    is_new_topic = True
+                    break
+        if is_new_topic:
+            continue
+        is_new_section = False
+        for section_type, keywords in chunker.SECTION_MARKERS.items():
+            for kw in keywords:
+                if kw in clean_line.lower() and len(clean_line) < 60:
+                    if current_chunk_buffer:
+                        chunks.append(chunker._create_chunk(current_topic, current_section_type, current_chunk_buffer))
+                        current_chunk_buffer = []
+                    current_section_type = section_type
+                    is_new_section = True
+                    break
+            if is_new_section:
+                break
+        current_chunk_buffer.append(clean_line)
+        if len(current_chunk_buffer) > 20:
+            chunks.append(chunker._create_chunk(current_topic, current_section_type, current_chunk_buffer))
+            current_chunk_buffer = []
+    if current_chunk_buffer:
+        chunks.append(chunker._create_chunk(current_topic, current_section_type, current_chunk_buffer))
+    return chunks
+
+
+def legacy(pages):
+    return len(legacy_chunks(SmartChunker(verbose=False), pages))
+
+
+def streaming(pages):
+    return sum(len(batch) for batch in iter_batches(SmartChunker(verbose=False).iter_chunks(pages), BATCH_SIZE))
+
+
+def measure(fn, n_pages, lines_per_page):
+    start = time.perf_counter()
+    n_chunks = fn(synthetic_pages(n_pages, lines_per_page=lines_per_page))
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn(synthetic_pages(n_pages, lines_per_page=lines_per_page))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return n_chunks, seconds, peak
+
+
+def main(args):
+    print(f"{'path':<12}{'pages':>9}{'chunks':>9}{'lines/s':>11}{'chunks/s':>10}{'peak MB':>9}")
+    for n_pages in (args.pages // 10, args.pages):
+        for name, fn in (("legacy", legacy), ("streaming", streaming)):
+            n_chunks, seconds, peak = measure(fn, n_pages, args.lines_per_page)
+            print(f"{name:<12}{n_pages:>9}{n_chunks:>9}{n_pages * args.lines_per_page / seconds:>11.0f}"
+                  f"{n_chunks / seconds:>10.0f}{peak / 1e6:>9.1f}")
+
+    if args.pdf_copies:
+        source = next(iter_documents(DATA_PATH))
+        with tempfile.TemporaryDirectory() as directory:
+            for i in range(args.pdf_copies):
+                os.symlink(os.path.abspath(source), os.path.join(directory, f"guideline_{i:03d}.pdf"))
+            chunker = SmartChunker(verbose=False)
+            start = time.perf_counter()
+            n_chunks = sum(1 for _ in chunker.iter_chunks(iter_pages(iter_documents(directory), args.workers, directory)))
+            seconds = time.perf_counter() - start
+        print(f"\nPDF pipeline: {args.pdf_copies} documents, {chunker.pages} pages, {n_chunks} chunks in {seconds:.1f}s "
+              f"with {args.workers} process(es): {chunker.pages / seconds:.1f} pages/sec, {n_chunks / seconds:.1f} chunks/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=20000, help="synthetic pages in the larger corpus")
+    parser.add_argument("--lines-per-page", type=int, default=40)
+    parser.add_argument("--pdf-copies", type=int, default=0, help="also run the PDF pipeline on N copies")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    main(parser.parse_args())
@@ -0,0 +1,64 @@
+
+"""
+Benchmark: per-turn provider HTTP cost, fresh client per request vs pooled ProviderClients.
+Each turn is one /v1/listen upload plus one /v1/speak synthesis against the local stub.
+"""
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from stub_provider_server import StubProviderServer
+from voice_server.core.http_clients import ProviderClients, ProviderConfig
+
+TURNS = 50
+AUDIO = b"\xff" * 16000  # 2s utterance
+TEXT = "Do you have any difficulty breathing?"
+
+
+async def fresh_client_turn(base_url):
+    # What main.py used to do: a new AsyncClient (new TCP/TLS) for every call
+    async with httpx.AsyncClient() as client:
+        await client.post(f"{base_url}/v1/listen", content=AUDIO)
+    async with httpx.AsyncClient() as client:
+        resp = await client.post(f"{base_url}/v1/speak", json={"text": TEXT})
+        assert resp.status_code == 200
+
+
+async def pooled_turn(clients: ProviderClients):
+    await clients.request("stub", "POST", "/v1/listen", content=AUDIO)
+    async with clients.stream("stub", "POST", "/v1/speak", json={"text": TEXT}) as resp:
+        async for _ in resp.aiter_bytes():
+            pass
+
+
+async def run(name, turn, server):
+    before = server.connections
+    timings = []
+    for _ in range(TURNS):
+        start = time.perf_counter()
+        await turn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[int(0.95 * (len(timings) - 1))]
+    print(f"{name:<22}{statistics.median(timings):>10.1f}{p95:>10.1f}{server.connections - before:>14}")
+    return statistics.median(timings)
+
+
+async def main():
+    server = await StubProviderServer(handshake_ms=30, latency_ms=5).start()
+    clients = ProviderClients({"stub": ProviderConfig(base_url=server.url, max_connections=4)})
+    print(f"Stub at {server.url} (30ms simulated handshake per connection), {TURNS} turns")
+    print(f"{'client':<22}{'p50 ms':>10}{'p95 ms':>10}{'connections':>14}")
+    try:
+        fresh = await run("fresh per request", lambda: fresh_client_turn(server.url), server)
+        pooled = await run("pooled keep-alive", lambda: pooled_turn(clients), server)
+        print(f"Saved per turn (p50): {fresh - pooled:.1f}ms")
+    finally:
+        await clients.aclose()
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
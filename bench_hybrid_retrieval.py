@@ -0,0 +1,122 @@
+"""
+Benchmark: hybrid (BM25 + vector) retrieval over the three collections.
+
+1. Latency, per query (p50 / p99 ms):
+   - lexical: BM25 scores + top candidates
+   - vector: exact search of a stored chunk embedding (no embedding model needed)
+   - hybrid: HybridRetriever.search with the embedding already cached
+2. Relevance on a small labelled set (caller phrasing -> expected protocol):
+   hit@k (a top-k chunk belongs to the protocol) and MRR, for lexical,
+   vector and hybrid. The vector and hybrid rows need the embedding model
+   and are skipped when it cannot be loaded.
+
+    python bench_hybrid_retrieval.py --queries 500
+"""
+import argparse
+import asyncio
+import time
+
+import chromadb
+import numpy as np
+
+from voice_server.agent.nodes.hybrid_retrieval import HybridRetriever
+from voice_server.agent.nodes.retrieval import COLLECTIONS
+from voice_server.core.config import settings
+
+# Phrased the way callers talk, without the protocol's own name where possible
+RELEVANCE = [
+    ("my toddler has had watery stools since yesterday", "Diarrhea"),
+    ("loose motions five times today and he is thirsty", "Diarrhea"),
+    ("there is blood in her poo", "Diarrhea"),
+    ("runny tummy and sunken eyes", "Diarrhea"),
+    ("he has been coughing for three weeks", "Cough"),
+    ("fast breathing and chest indrawing", "Cough"),
+    ("wheezing at night and a dry cough", "Cough"),
+    ("my chest rattles when she breathes", "Cough"),
+    ("she keeps throwing up everything she eats", "Vomiting"),
+    ("he vomits after every feed", "Vomiting"),
+    ("green vomit and a swollen belly", "Vomiting"),
+    ("cannot keep any fluids down", "Vomiting"),
+    ("his temperature is 39 degrees", "Fever"),
+    ("she feels very hot and is shivering", "Fever"),
+    ("high temperature with a stiff neck", "Fever"),
+    ("hot body for four days and a rash", "Fever"),
+]
+
+
+def pct(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, int(q * len(ordered) + 0.999999) - 1)]
+
+
+def row(name, ms):
+    print(f"{name:<34}{pct(ms, 0.5):>9.3f}{pct(ms, 0.99):>9.3f}")
+
+
+def relevance(name, ranked, k):
+    hits, reciprocal = 0, 0.0
+    for protocols, (_, expected) in zip(ranked, RELEVANCE):
+        if expected in protocols[:k]:
+            hits += 1
+        if expected in protocols:
+            reciprocal += 1 / (protocols.index(expected) + 1)
+    print(f"{name:<34}{hits / len(RELEVANCE):>9.2f}{reciprocal / len(RELEVANCE):>9.2f}")
+
+
+async def main(args):
+    client = chromadb.PersistentClient(path=settings.DB_PATH)
+    retriever = HybridRetriever([client.get_or_create_collection(n) for n in COLLECTIONS],
+                                candidates=args.candidates, fusion=args.fusion)
+    vectors = retriever.vectors
+    print(f"{len(retriever)} chunks from {len(COLLECTIONS)} collections, "
+          f"{len(retriever.bm25.vocabulary)} terms, fusion {args.fusion}")
+
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(retriever), args.queries)
+    texts = [retriever.vectors.documents[r][:120] for r in rows]  # Chunk openings as stand-in queries
+    embeddings = vectors.matrix[rows]
+    for text, embedding in zip(texts, embeddings):
+        vectors._embeddings[" ".join(text.lower().split())] = embedding  # Pre-cached, as for a repeated complaint
+
+    print(f"\n1. Latency ({args.queries} queries, top {args.k} of {args.candidates} candidates)")
+    print(f"{'path':<34}{'p50 ms':>9}{'p99 ms':>9}")
+    for name, fn in (("lexical (BM25)", lambda i: np.argsort(-retriever.bm25.scores(texts[i]))[:args.candidates]),
+                     ("vector (exact, stored embedding)", lambda i: vectors.search(embeddings[i], args.candidates))):
+        ms = []
+        for i in range(args.queries):
+            start = time.perf_counter()
+            fn(i)
+            ms.append((time.perf_counter() - start) * 1000)
+        row(name, ms)
+    ms = []
+    for text in texts:
+        start = time.perf_counter()
+        await retriever.search(text, args.k)
+        ms.append((time.perf_counter() - start) * 1000)
+    row("hybrid (cached embedding)", ms)
+
+    print(f"\n2. Relevance ({len(RELEVANCE)} labelled queries)")
+    print(f"{'ranking':<34}{f'hit@{args.k}':>9}{'MRR':>9}")
+
+    def protocols(rows):
+        return [vectors.metadatas[r].get("protocol") for r in rows]
+
+    relevance("lexical (BM25)", [protocols(np.argsort(-retriever.bm25.scores(q))[:args.candidates])
+                                 for q, _ in RELEVANCE], args.k)
+    try:
+        query_vectors = [vectors.embed(q) for q, _ in RELEVANCE]
+    except Exception as e:
+        print(f"vector / hybrid skipped: embedding model unavailable ({type(e).__name__}: {e})")
+        return
+    relevance("vector", [protocols([r for r, _ in vectors.search(v, args.candidates)[0]]) for v in query_vectors], args.k)
+    relevance("hybrid", [[h["metadata"].get("protocol") for h in await retriever.search(q, args.candidates)]
+                         for q, _ in RELEVANCE], args.k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--fusion", default="rrf", choices=["rrf", "weighted"])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,106 @@
+"""
+Benchmark: decision_rules retrieval, Chroma query vs the in-memory index.
+
+1. Search only. Query vectors are the stored chunk embeddings plus noise,
+   so no embedding model is needed. Paths compared:
+   - the current path: col_rules.query through asyncio.to_thread
+   - the index: VectorIndex.query in-process
+   Also reports how often the index's exact top-k equals Chroma's HNSW top-k.
+2. Text queries (only when the collection's embedding model can be loaded):
+   - Chroma with query_texts
+   - the index with a cold embedding cache
+   - the index with a warm embedding cache (repeated complaints)
+
+Times are per query: p50 / p99, in milliseconds.
+
+    python bench_retrieval.py --queries 500
+"""
+import argparse
+import asyncio
+import time
+
+import chromadb
+import numpy as np
+
+from voice_server.agent.nodes.vector_index import VectorIndex
+from voice_server.core.config import settings
+
+COMPLAINTS = [
+    "I have a fever", "chest pain", "my child has diarrhea", "bad cough for a week", "headache and vomiting",
+    "difficulty breathing", "my baby is not feeding", "burning when I pee", "rash all over my body",
+    "stomach pain on the right side", "I feel dizzy", "sore throat and fever", "my ear hurts",
+    "swollen legs", "bleeding during pregnancy",
+]
+
+
+def pct(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, int(q * len(ordered) + 0.999999) - 1)]
+
+
+def row(name, ms):
+    print(f"{name:<34}{pct(ms, 0.5):>9.3f}{pct(ms, 0.99):>9.3f}")
+
+
+async def timed(fn, items):
+    ms = []
+    for item in items:
+        start = time.perf_counter()
+        await fn(item)
+        ms.append((time.perf_counter() - start) * 1000)
+    return ms
+
+
+async def main(args):
+    collection = chromadb.PersistentClient(path=settings.DB_PATH).get_collection(args.collection)
+    index = VectorIndex(collection)
+    print(f"{args.collection}: {len(index)} chunks, dim {index.matrix.shape[1]}, space {index.space}")
+
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(index), args.queries)
+    queries = index.matrix[rows] + rng.normal(0, args.noise, (args.queries, index.matrix.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    async def chroma_vector(q):
+        return await asyncio.to_thread(collection.query, query_embeddings=[q.tolist()], n_results=args.k)
+
+    async def index_vector(q):
+        return index.query(query_embeddings=[q], n_results=args.k)
+
+    print(f"\n1. Search only ({args.queries} queries, top {args.k})")
+    print(f"{'path':<34}{'p50 ms':>9}{'p99 ms':>9}")
+    row("chroma query (to_thread)", await timed(chroma_vector, queries))
+    row("in-memory index", await timed(index_vector, queries))
+    same = sum(collection.query(query_embeddings=[q.tolist()], n_results=args.k)["ids"][0]
+               == index.query(query_embeddings=[q], n_results=args.k)["ids"][0] for q in queries[:200])
+    print(f"identical top-{args.k} ids: {same}/{min(200, len(queries))}")
+
+    print(f"\n2. Text queries ({len(COMPLAINTS)} complaints x {args.repeat})")
+    try:
+        index.embed(COMPLAINTS[0])
+    except Exception as e:
+        print(f"skipped: embedding model unavailable ({type(e).__name__}: {e})")
+        return
+    texts = COMPLAINTS * args.repeat
+
+    async def chroma_text(t):
+        return await asyncio.to_thread(collection.query, query_texts=[t], n_results=args.k)
+
+    async def index_text(t):
+        return index.query(query_embeddings=[await index.aembed(t)], n_results=args.k)
+
+    print(f"{'path':<34}{'p50 ms':>9}{'p99 ms':>9}")
+    row("chroma query_texts (to_thread)", await timed(chroma_text, texts))
+    index._embeddings.clear()
+    row("index, cold embedding cache", await timed(index_text, COMPLAINTS))
+    row("index, warm embedding cache", await timed(index_text, texts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--collection", default="decision_rules")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--noise", type=float, default=0.02, help="std of the noise added to stored embeddings")
+    parser.add_argument("--repeat", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
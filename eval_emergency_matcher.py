@@ -0,0 +1,157 @@
+"""
+Evaluation: the local emergency-rule matcher on a labelled utterance set.
+
+Each utterance is labelled emergency (1) or not (0). The matcher sorts it
+into EMERGENCY (flagged without the LLM), AMBIGUOUS (sent to the LLM
+scanner) or ROUTINE (bare yes/no/duration answers only, no LLM call). Reported:
+
+    rule precision / recall   EMERGENCY flags vs the emergency labels
+    safety recall             emergencies NOT classified ROUTINE (flagged
+                              locally or at least sent to the LLM)
+    missed                    emergencies classified ROUTINE (listed)
+    LLM calls                 fraction of turns still sent to the LLM
+    latency                   match() p50 / p95 / max in microseconds
+
+    python eval_emergency_matcher.py
+    python eval_emergency_matcher.py --labels my_labels.tsv   # "<0|1><TAB><utterance>" per line
+"""
+import argparse
+import sys
+import time
+
+from voice_server.agent.nodes.emergency_matcher import AMBIGUOUS, EMERGENCY, ROUTINE, EmergencyMatcher
+
+LABELLED = [
+    # Emergencies, in the words callers actually use
+    (1, "my lips are turning blue"),
+    (1, "he is not breathing"),
+    (1, "I can't breathe"),
+    (1, "I cannot catch my breath at all"),
+    (1, "she's choking on something"),
+    (1, "I have crushing chest pain going down my left arm"),
+    (1, "there's a lot of pressure in my chest and I'm sweating"),
+    (1, "my dad's face is drooping on one side"),
+    (1, "he suddenly can't move his arm and his speech is slurred"),
+    (1, "it's the worst headache of my life, it came on all of a sudden"),
+    (1, "my baby won't wake up"),
+    (1, "she's having a seizure right now"),
+    (1, "he collapsed and is unresponsive"),
+    (1, "my throat is closing up after I ate peanuts"),
+    (1, "my tongue is swelling and I can't swallow"),
+    (1, "I'm coughing up blood"),
+    (1, "the bleeding won't stop"),
+    (1, "I took a whole bottle of pills"),
+    (1, "I want to kill myself"),
+    (1, "my stomach is rigid and the pain is unbearable"),
+    (1, "my baby has a fever and a rash that doesn't fade when I press a glass on it"),
+    (1, "he fell and hit his head and now he is confused"),
+    (1, "I passed out twice this morning"),
+    (1, "my chest feels tight and my heart is racing"),
+    (1, "I think I'm having a heart attack"),
+    (1, "her neck is stiff and she can't look at the light"),
+    (1, "he has no pulse and is not breathing"),
+    (1, "no one can wake him up"),
+    (1, "I have no idea why he is unconscious"),
+    (1, "without warning I had crushing chest pain"),
+    (1, "my baby is not waking up"),
+    (1, "I took a whole bottle of sleeping tablets"),
+    (1, "I want to hurt myself"),
+    (1, "my child swallowed bleach"),
+    (1, "he is not responding"),
+    (1, "I was bitten by a snake"),
+    (1, "I can't feel my legs"),
+    # Not emergencies
+    (0, "I have had a headache and a sore throat since yesterday"),
+    (0, "about two days"),
+    (0, "yes a little bit"),
+    (0, "no it is about the same"),
+    (0, "okay"),
+    (0, "yes please"),
+    (0, "the morning slot"),
+    (0, "no chest pain"),
+    (0, "I don't have any trouble breathing"),
+    (0, "no, I'm not short of breath"),
+    (0, "I never had a seizure"),
+    (0, "I can't see a doctor until monday"),
+    (0, "my nose is runny and I keep sneezing"),
+    (0, "I have a mild fever and body aches"),
+    (0, "my back hurts when I lift things"),
+    (0, "I have a rash on my arm that itches"),
+    (0, "my knee is swollen after running"),
+    (0, "I've been feeling tired for a few weeks"),
+    (0, "I have heartburn after meals"),
+    (0, "my ear hurts and I have a cold"),
+    (0, "I'm 34 years old"),
+    (0, "I take ibuprofen sometimes"),
+    (0, "I had a small nosebleed yesterday but it stopped"),
+    (0, "my chest is a bit sore from coughing"),
+    (0, "I feel a little dizzy when I stand up too fast"),
+    (0, "I have a stomach ache after eating"),
+    (0, "can I book an appointment for thursday"),
+    (0, "I have diarrhea since this morning"),
+    (0, "my head feels stuffy"),
+    (0, "no blood in the stool"),
+]
+
+
+def load_labels(path):
+    labelled = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                label, text = line.rstrip("\n").split("\t", 1)
+                labelled.append((int(label), text))
+    return labelled
+
+
+def pct(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, int(q * len(ordered) + 0.999999) - 1)]
+
+
+def main(args):
+    labelled = load_labels(args.labels) if args.labels else LABELLED
+    matcher = EmergencyMatcher()
+    results = [(label, text, matcher.match(text)) for label, text in labelled]
+
+    counts = {(label, decision): 0 for label in (0, 1) for decision in (EMERGENCY, AMBIGUOUS, ROUTINE)}
+    for label, _, match in results:
+        counts[(label, match.decision)] += 1
+    positives = sum(1 for label, _, _ in results if label)
+    flagged = counts[(1, EMERGENCY)] + counts[(0, EMERGENCY)]
+
+    print(f"{len(results)} utterances ({positives} emergencies)")
+    print(f"{'label':<12}{'EMERGENCY':>11}{'AMBIGUOUS':>11}{'ROUTINE':>9}")
+    for label, name in ((1, "emergency"), (0, "other")):
+        print(f"{name:<12}" + "".join(f"{counts[(label, d)]:>{w}}" for d, w in
+                                      ((EMERGENCY, 11), (AMBIGUOUS, 11), (ROUTINE, 9))))
+    print(f"\nrule precision  {counts[(1, EMERGENCY)] / max(1, flagged):.3f}")
+    print(f"rule recall     {counts[(1, EMERGENCY)] / max(1, positives):.3f}")
+    print(f"safety recall   {(positives - counts[(1, ROUTINE)]) / max(1, positives):.3f}")
+    print(f"LLM calls       {sum(1 for _, _, m in results if m.decision == AMBIGUOUS) / len(results):.3f} of turns")
+
+    for label, text, match in results:
+        if label and match.decision == ROUTINE:
+            print(f"  missed:         {text!r}")
+        elif not label and match.decision == EMERGENCY:
+            print(f"  false positive: {text!r} -> {match.symptom} ({match.text!r})")
+        elif args.verbose:
+            print(f"  {match.decision:<10} {text!r} {match.text or ''!r}")
+
+    latency_us = []
+    for _ in range(args.rounds):
+        for _, text in labelled:
+            start = time.perf_counter()
+            matcher.match(text)
+            latency_us.append((time.perf_counter() - start) * 1e6)
+    print(f"\nlatency (us)    p50 {pct(latency_us, 0.5):.1f}  p95 {pct(latency_us, 0.95):.1f}  "
+          f"max {max(latency_us):.1f}  over {len(latency_us)} matches")
+    return 1 if counts[(1, ROUTINE)] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labels", help="tab-separated '<0|1>\\t<utterance>' file instead of the built-in set")
+    parser.add_argument("--rounds", type=int, default=200, help="latency passes over the set")
+    parser.add_argument("--verbose", action="store_true")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,133 @@
+
+"""
+Offline evaluation: end-of-speech detection delay, legacy fixed VAD vs AdaptiveEndpointer.
+
+Recorded audio:
+    python eval_endpointer.py --wav-dir recordings/
+    recordings/ holds 8kHz mono 16-bit WAV files (or raw Twilio mu-law as .ulaw) and
+    labels.json: {"file.wav": <true end of speech in seconds, or null for no speech>, ...}
+
+Without --wav-dir a synthetic set is generated: voiced bursts followed by
+silence at several speaker loudness / line-noise levels, plus noise-only clips.
+
+Reports per config: median / p95 delay after true end of speech, early cuts
+(ended before the caller finished), misses (never ended) and false turns
+opened on noise-only clips.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import wave
+
+import webrtcvad
+
+from voice_server.audio.codec import mulaw_to_pcm16, pcm16_rms
+from voice_server.audio.endpointer import AdaptiveEndpointer, EndpointerConfig, END, TIMEOUT
+
+FRAME_SAMPLES = 160
+FRAME_SEC = 0.02
+
+
+def load_audio(path):
+    if path.endswith(".ulaw"):
+        with open(path, "rb") as f:
+            return mulaw_to_pcm16(f.read())
+    with wave.open(path, "rb") as w:
+        assert w.getframerate() == 8000 and w.getnchannels() == 1 and w.getsampwidth() == 2, \
+            f"{path}: need 8kHz mono 16-bit"
+        return w.readframes(w.getnframes())
+
+
+def synth_utterance(speech_rms, noise_rms, speech_sec, seed):
+    """Voiced bursts (harmonic 'syllables' with short gaps) then 1.5s of line noise."""
+    rnd = random.Random(seed)
+    f0 = rnd.uniform(110, 220)
+    samples = []
+    t = 0
+    lead = int(0.5 * 8000)
+    for _ in range(lead):
+        samples.append(rnd.gauss(0, noise_rms))
+    while t < speech_sec * 8000:
+        syl = int(rnd.uniform(0.12, 0.3) * 8000)
+        for i in range(syl):
+            env = math.sin(math.pi * i / syl)
+            v = sum(math.sin(2 * math.pi * f0 * h * (t + i) / 8000) / h for h in range(1, 6))
+            samples.append(speech_rms * 1.6 * env * v + rnd.gauss(0, noise_rms))
+        t += syl
+        gap = int(rnd.uniform(0.03, 0.09) * 8000)
+        for _ in range(gap):
+            samples.append(rnd.gauss(0, noise_rms))
+        t += gap
+    true_end = len(samples) / 8000 if speech_sec else None
+    for _ in range(int(1.5 * 8000)):
+        samples.append(rnd.gauss(0, noise_rms))
+    pcm = b"".join(int(max(-32768, min(32767, s))).to_bytes(2, "little", signed=True) for s in samples)
+    return pcm, true_end
+
+
+def detect_end(pcm, config):
+    """Returns (turn opened, end-of-speech time in seconds or None)."""
+    vad = webrtcvad.Vad(2)
+    ep = AdaptiveEndpointer(config)
+    started = False
+    for n in range(len(pcm) // (2 * FRAME_SAMPLES)):
+        frame = pcm[n * 2 * FRAME_SAMPLES:(n + 1) * 2 * FRAME_SAMPLES]
+        event = ep.process(vad.is_speech(frame, 8000), pcm16_rms(frame))
+        started = started or ep.is_speaking
+        if event in (END, TIMEOUT):
+            return True, (n + 1) * FRAME_SEC
+    return started, None
+
+
+def evaluate(name, config, cases):
+    delays, early, missed, false_turns = [], 0, 0, 0
+    for pcm, true_end in cases:
+        started, detected = detect_end(pcm, config)
+        if true_end is None:
+            false_turns += started
+        elif detected is None:
+            missed += 1
+        elif detected < true_end - 0.1:
+            early += 1
+        else:
+            delays.append((detected - true_end) * 1000)
+    delays.sort()
+    p50 = statistics.median(delays) if delays else float("nan")
+    p95 = delays[int(0.95 * (len(delays) - 1))] if delays else float("nan")
+    print(f"{name:<12}{p50:>10.0f}{p95:>10.0f}{early:>8}{missed:>8}{false_turns:>8}{len(cases):>8}")
+
+
+def synthetic_cases():
+    cases = []
+    seed = 0
+    for speech_rms in (400, 1200, 3000):        # quiet / normal / loud speaker
+        for noise_rms in (20, 120, 400):        # clean / typical / noisy line
+            for speech_sec in (0.6, 1.5, 3.0):
+                cases.append(synth_utterance(speech_rms, noise_rms, speech_sec, seed))
+                seed += 1
+    for noise_rms in (20, 120, 400, 800):
+        for _ in range(3):
+            cases.append(synth_utterance(0, noise_rms, 0, seed))
+            seed += 1
+    return cases
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wav-dir")
+    args = parser.parse_args()
+
+    if args.wav_dir:
+        with open(os.path.join(args.wav_dir, "labels.json")) as f:
+            labels = json.load(f)
+        cases = [(load_audio(os.path.join(args.wav_dir, name)), end) for name, end in labels.items()]
+    else:
+        print("No --wav-dir given: using synthetic utterances")
+        cases = synthetic_cases()
+
+    print(f"{'config':<12}{'p50 ms':>10}{'p95 ms':>10}{'early':>8}{'missed':>8}{'false':>8}{'cases':>8}")
+    evaluate("legacy", EndpointerConfig.legacy(), cases)
+    evaluate("adaptive", EndpointerConfig(), cases)
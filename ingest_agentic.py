@@ -1,8 +1,13 @@
-
+import argparse
 import chromadb
+import hashlib
+import json
 import os
 import re
-# from pypdf import PdfReader 
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+# from pypdf import PdfReader
 # Updating import to follow requirements (pypdf might need install, but user has verify_env.py)
 # If pypdf is missing, this script will fail. We added it to requirements.txt
 try:
@@ -11,109 +16,231 @@ except ImportError:
     print("pypdf not installed. Please run: pip install pypdf")
     exit(1)
 
-from typing import List, Dict, Any
-from uuid import uuid4
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from voice_server.agent.nodes.retrieval_cache import bump_version
 
 # --- CONFIGURATION ---
 # We assume data is in c:\docai_calling_agent\data
-DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "nhsrc_guidelines.pdf")
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data")  # A guideline PDF or a directory of them
 DB_PATH = os.path.join(os.path.dirname(__file__), "chroma_db_new")
+COLLECTIONS = ["protocol_summaries", "decision_rules", "reference_info"]
+BATCH_SIZE = 128  # Chunks per embedding call and per upsert
+WORKERS = os.cpu_count() or 1  # Page extraction processes
+PAGES_PER_TASK = 8  # Pages a worker extracts per task
+MAX_CHUNK_LINES = 20  # Forced split of a chunk past this many lines
+
+# --- PAGE EXTRACTION ---
+
+def iter_documents(path: str) -> Iterator[str]:
+    """The PDF itself, or every PDF under the directory (sorted, recursive)."""
+    if os.path.isfile(path):
+        yield path
+        return
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                yield os.path.join(root, name)
+
+def _extract_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    # Runs in a worker process: each opens the PDF itself (readers don't pickle)
+    reader = PdfReader(pdf_path)
+    return [(reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+def _page_tasks(paths: Iterable[str], failed: Dict[str, str]) -> Iterator[Tuple[str, int, int]]:
+    for path in paths:
+        try:
+            n_pages = len(PdfReader(path).pages)
+        except Exception as e:
+            failed[path] = f"{type(e).__name__}: {e}"
+            print(f"⚠️ {path}: cannot open ({failed[path]}), document skipped")
+            continue
+        for start in range(0, n_pages, PAGES_PER_TASK):
+            yield path, start, min(start + PAGES_PER_TASK, n_pages)
+
+def iter_pages(paths: Iterable[str], workers: int = WORKERS, root: Optional[str] = None,
+               failed: Optional[Dict[str, str]] = None) -> Iterator[Tuple[str, str]]:
+    """
+    (source, page text) for every page of every document, in order. The source is the
+    path relative to `root` (default: the file name).
+    Pages are extracted by `workers` processes, PAGES_PER_TASK at a time, with at most
+    2 x workers tasks in flight: memory does not grow with the corpus.
+    A document that fails to open or extract is skipped from that page on, and recorded
+    in `failed` (path -> error) so callers know its chunks are incomplete.
+    """
+    failed = {} if failed is None else failed
+    tasks = _page_tasks(paths, failed)
+
+    def source(path):
+        return os.path.relpath(path, root) if root else os.path.basename(path)
+
+    def pages(path, extract):
+        if path in failed:
+            return []
+        try:
+            return extract()
+        except Exception as e:
+            failed[path] = f"{type(e).__name__}: {e}"
+            print(f"⚠️ {source(path)}: page extraction failed ({failed[path]}), document skipped")
+            return []
+
+    if workers <= 1:
+        for path, start, stop in tasks:
+            for text in pages(path, lambda: _extract_range(path, start, stop)):
+                yield source(path), text
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        inflight = deque()
+        for path, start, stop in tasks:
+            inflight.append((path, pool.submit(_extract_range, path, start, stop)))
+            if len(inflight) >= 2 * workers:
+                path, future = inflight.popleft()
+                for text in pages(path, future.result):
+                    yield source(path), text
+        while inflight:
+            path, future = inflight.popleft()
+            for text in pages(path, future.result):
+                yield source(path), text
 
 # --- PARSER LOGIC ---
 
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    One regex for many literal words, shaped as a trie ("d(?:anger signs|iagnosis)").
+    Python's re checks a plain alternation word by word at every position. The trie
+    shares prefixes, so most positions fail on their first character.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if "" in node:
+            return f"(?:{'|'.join(branches)})?"
+        return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+    return build(trie)
+
 class SmartChunker:
     """
     Parses NHSRC Guidelines into semantic chunks.
+    Streaming: pages -> lines -> chunks, one document after another.
     """
-    def __init__(self):
+    def __init__(self, verbose: bool = True):
+        self.verbose = verbose
+        self.pages = 0  # Stats since creation
+        self.lines = 0
         # We define "Topics" that we expect to find in the manual
         self.TOPICS = [
-            "Fever", "Cough", "Diarrhoea", "Diarrhea", "Vomiting", 
+            "Fever", "Cough", "Diarrhoea", "Diarrhea", "Vomiting",
             "Skin Infection", "Burns", "Wounds", "Bites", "Poisoning",
-            "Epilepsy", "Seizures", "Unconsciousness", "Hypertension", 
+            "Epilepsy", "Seizures", "Unconsciousness", "Hypertension",
             "Diabetes", "Chest Pain", "Stroke", "First Aid"
         ]
-        
+
         self.SECTION_MARKERS = {
             "RED_FLAGS": ["danger signs", "referral", "when to refer", "emergency", "immediate check"],
             "MANAGEMENT": ["management", "treatment", "action plan", "first aid measures"],
             "ASSESSMENT": ["assessment", "signs and symptoms", "clinical features", "diagnosis"]
         }
 
-    def chunk_pdf(self, pdf_path: str) -> List[Dict]:
-        if not os.path.exists(pdf_path):
-            print(f"❌ PDF not found at {pdf_path}")
-            return []
+        # One pass per (lowercased) line for all topics, one for all section keywords
+        # (re.IGNORECASE is ~4x slower). When a line holds several, the earlier entry of
+        # TOPICS / SECTION_MARKERS wins.
+        self._topic_order = {topic.lower(): i for i, topic in reversed(list(enumerate(self.TOPICS)))}
+        self._topic_pattern = re.compile(trie_pattern(self._topic_order))
+        self._section_of_keyword = {kw.lower(): (i, section) for i, (section, keywords)
+                                    in reversed(list(enumerate(self.SECTION_MARKERS.items()))) for kw in keywords}
+        self._section_pattern = re.compile(trie_pattern(self._section_of_keyword))
+
+    def topic_of(self, line: str) -> Optional[str]:
+        """The topic this (short, heading-like) line starts, if any."""
+        if len(line) >= 50 or not (line.isupper() or "Unit" in line or "Module" in line):
+            return None
+        found = self._topic_pattern.findall(line.lower())
+        return self.TOPICS[min(self._topic_order[t] for t in found)] if found else None
 
-        reader = PdfReader(pdf_path)
-        full_text = ""
-        
-        print("📖 Reading PDF...")
-        for page in reader.pages:
-            full_text += page.extract_text() + "\n"
-            
-        print(f"✅ Extracted {len(full_text)} characters.")
-        
-        # 1. Split into Broad Topics
-        chunks = []
-        lines = full_text.split('\n')
-        
+    def section_of(self, line: str) -> Optional[str]:
+        """The section this (short) line starts, if any."""
+        if len(line) >= 60:
+            return None
+        found = self._section_pattern.findall(line.lower())
+        return min(self._section_of_keyword[kw] for kw in found)[1] if found else None
+
+    def iter_lines(self, pages: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+        """(source, stripped non-empty line), one page in memory at a time."""
+        for source, text in pages:
+            self.pages += 1
+            for line in text.split("\n"):
+                clean_line = line.strip()
+                if clean_line:
+                    self.lines += 1
+                    yield source, clean_line
+
+    def iter_chunks(self, pages: Iterable[Tuple[str, str]]) -> Iterator[Dict]:
+        """Chunks of every document in `pages` ((source, page text) pairs)."""
+        current_source = None
         current_topic = "General Introduction"
         current_chunk_buffer = []
         current_section_type = "REFERENCE" # Default
-        
-        for line in lines:
-            clean_line = line.strip()
-            if not clean_line:
-                continue
+
+        for source, clean_line in self.iter_lines(pages):
+            # 0. A new document starts from scratch
+            if source != current_source:
+                if current_chunk_buffer:
+                    yield self._create_chunk(current_topic, current_section_type, current_chunk_buffer, current_source)
+                    current_chunk_buffer = []
+                current_source = source
+                current_topic = "General Introduction"
+                current_section_type = "REFERENCE"
 
             # 1. Detect New Topic Switch
-            is_new_topic = False
-            for topic in self.TOPICS:
-                if len(clean_line) < 50 and topic.upper() in clean_line.upper():
-                    if clean_line.isupper() or "Unit" in clean_line or "Module" in clean_line:
-                        if current_chunk_buffer:
-                            chunks.append(self._create_chunk(current_topic, current_section_type, current_chunk_buffer))
-                            current_chunk_buffer = []
-                        
-                        current_topic = topic
-                        current_section_type = "REFERENCE"
-                        is_new_topic = True
-                        print(f"  -> Found Topic: {current_topic}")
-                        break
-            
-            if is_new_topic:
+            topic = self.topic_of(clean_line)
+            if topic:
+                if current_chunk_buffer:
+                    yield self._create_chunk(current_topic, current_section_type, current_chunk_buffer, current_source)
+                    current_chunk_buffer = []
+                current_topic = topic
+                current_section_type = "REFERENCE"
+                if self.verbose:
+                    print(f"  -> Found Topic: {current_topic} ({source})")
                 continue
 
             # 2. Detect Section Switch
-            is_new_section = False
-            for section_type, keywords in self.SECTION_MARKERS.items():
-                for kw in keywords:
-                    if kw in clean_line.lower() and len(clean_line) < 60:
-                        if current_chunk_buffer:
-                            chunks.append(self._create_chunk(current_topic, current_section_type, current_chunk_buffer))
-                            current_chunk_buffer = []
-                        
-                        current_section_type = section_type
-                        is_new_section = True
-                        break
-                if is_new_section: break
-            
+            section_type = self.section_of(clean_line)
+            if section_type:
+                if current_chunk_buffer:
+                    yield self._create_chunk(current_topic, current_section_type, current_chunk_buffer, current_source)
+                    current_chunk_buffer = []
+                current_section_type = section_type
+
             # 3. Add Line to Buffer
             current_chunk_buffer.append(clean_line)
-            
+
             # 4. forced split if too long (fallback)
-            if len(current_chunk_buffer) > 20: 
-                 chunks.append(self._create_chunk(current_topic, current_section_type, current_chunk_buffer))
-                 current_chunk_buffer = []
+            if len(current_chunk_buffer) > MAX_CHUNK_LINES:
+                yield self._create_chunk(current_topic, current_section_type, current_chunk_buffer, current_source)
+                current_chunk_buffer = []
 
         # Flush final
         if current_chunk_buffer:
-            chunks.append(self._create_chunk(current_topic, current_section_type, current_chunk_buffer))
-            
-        return chunks
+            yield self._create_chunk(current_topic, current_section_type, current_chunk_buffer, current_source)
+
+    def chunk_pdf(self, pdf_path: str, workers: int = WORKERS) -> List[Dict]:
+        """All chunks of one PDF as a list (small documents; ingest() streams instead)."""
+        if not os.path.exists(pdf_path):
+            print(f"❌ PDF not found at {pdf_path}")
+            return []
+        return list(self.iter_chunks(iter_pages([pdf_path], workers)))
 
-    def _create_chunk(self, topic, section_type, lines):
+    def _create_chunk(self, topic, section_type, lines, source=None):
         text = "\n".join(lines)
         db_type = "reference_info"
         if section_type == "RED_FLAGS" or section_type == "MANAGEMENT":
@@ -124,58 +251,175 @@ class SmartChunker:
             else:
                 db_type = "reference_info"
 
-        return {
-            "content": text,
-            "metadata": {
-                "protocol": topic,
-                "section": section_type,
-                "type": db_type, 
-                "symptoms": topic 
-            }
+        metadata = {
+            "protocol": topic,
+            "section": section_type,
+            "type": db_type,
+            "symptoms": topic
         }
+        if source:
+            metadata["source"] = source
+        return {"content": text, "metadata": metadata}
+
+def iter_batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 # --- INGESTION MAIN ---
 
-def ingest():
+def chunk_document(chunk: Dict) -> str:
+    return f"PROTOCOL: {chunk['metadata']['protocol']}\nSECTION: {chunk['metadata']['section']}\nCONTENT:\n{chunk['content']}"
+
+def chunk_id(document: str, metadata: Dict) -> str:
+    """Content hash: the same chunk gets the same id on every run."""
+    digest = hashlib.sha256(json.dumps([document, metadata], sort_keys=True).encode()).hexdigest()
+    return f"chunk_{digest[:24]}"
+
+class CollectionSync:
+    """
+    Streams chunk batches into the collections, incrementally.
+    Ids already stored are skipped, new chunks are embedded and upserted per batch, and
+    `finish()` deletes the stored ids no batch produced, among the chunks of the documents
+    this run read completely (or every chunk, after a complete run over the whole corpus).
+    Only the ids are kept for the whole run, never documents or embeddings.
+    """
+    def __init__(self, collections: Dict[str, Any], batch_size: int = BATCH_SIZE):
+        self.collections = collections
+        self.batch_size = batch_size
+        self.seen = {name: set() for name in collections}
+        self.stats = {name: {"added": 0, "deleted": 0, "unchanged": 0} for name in collections}
+
+    def plan(self, chunks: List[Dict]) -> Dict[str, List[tuple]]:
+        """New (id, document, metadata) per collection for this batch."""
+        candidates = {name: {} for name in self.collections}
+        for chunk in chunks:
+            name = chunk['metadata']['type']
+            document = chunk_document(chunk)
+            id_ = chunk_id(document, chunk['metadata'])
+            if id_ not in self.seen[name]:  # Identical chunks collapse into one record
+                self.seen[name].add(id_)
+                candidates[name][id_] = (document, chunk['metadata'])
+        new = {}
+        for name, records in candidates.items():
+            if not records:
+                continue
+            stored = set(self.collections[name].get(ids=list(records), include=[])["ids"])
+            self.stats[name]["unchanged"] += len(stored)
+            new[name] = [(id_, doc, meta) for id_, (doc, meta) in records.items() if id_ not in stored]
+        return new
+
+    def embed(self, new: Dict[str, List[tuple]]) -> Dict[str, tuple]:
+        """One embedding call for the whole batch (the collections share the embedding function)."""
+        documents = [doc for records in new.values() for _, doc, _ in records]
+        if not documents:
+            return {}
+        embeddings = list(self.collections[COLLECTIONS[0]]._embed(input=documents))
+        out, start = {}, 0
+        for name, records in new.items():
+            out[name] = (records, embeddings[start:start + len(records)])
+            start += len(records)
+        return out
+
+    def write(self, embedded: Dict[str, tuple]):
+        for name, (records, embeddings) in embedded.items():
+            if records:
+                self.collections[name].upsert(ids=[r[0] for r in records], embeddings=embeddings,
+                                              documents=[r[1] for r in records], metadatas=[r[2] for r in records])
+                self.stats[name]["added"] += len(records)
+
+    def finish(self, sources: Optional[List[str]] = None):
+        """Delete unseen ids of the given sources (their `source` metadata); None = every unseen id."""
+        for name, col in self.collections.items():
+            if sources is None:
+                stored = col.get(include=[])["ids"]
+            elif sources:
+                stored = col.get(where={"source": {"$in": sources}}, include=[])["ids"]
+            else:
+                stored = []
+            stale = [id_ for id_ in stored if id_ not in self.seen[name]]
+            for start in range(0, len(stale), self.batch_size):
+                col.delete(ids=stale[start:start + self.batch_size])
+            self.stats[name]["deleted"] = len(stale)
+
+    def changed(self) -> bool:
+        return any(s["added"] or s["deleted"] for s in self.stats.values())
+
+def ingest(data_path: str = DATA_PATH, db_path: str = DB_PATH, workers: int = WORKERS, batch_size: int = BATCH_SIZE):
     print("🚀 Starting Semantic Ingestion...")
-    
+    start = time.perf_counter()
+
+    documents = list(iter_documents(data_path))
+    # Sources are relative to DATA_PATH whenever the run is inside it, so one PDF or
+    # subfolder re-ingested alone keeps the source its chunks got from a full run
+    def root_of(path):
+        return os.path.abspath(path if os.path.isdir(path) else os.path.dirname(path))
+    full_corpus = os.path.abspath(data_path) == os.path.abspath(DATA_PATH)
+    root = root_of(DATA_PATH)
+    if not (full_corpus or os.path.abspath(data_path).startswith(root + os.sep)):
+        root = root_of(data_path)
+    if not documents:
+        print(f"❌ No PDF found at {data_path}")
+        return
+    print(f"📖 Streaming {len(documents)} document(s) with {workers} extraction process(es)...")
+
     # 1. Initialize Clients
-    chroma_client = chromadb.PersistentClient(path=DB_PATH)
-    # In strict mode, get_collection errors if not found. Let's use get_or_create_collection
-    col_summaries = chroma_client.get_or_create_collection("protocol_summaries")
-    col_rules = chroma_client.get_or_create_collection("decision_rules")
-    col_refs = chroma_client.get_or_create_collection("reference_info")
-    
+    chroma_client = chromadb.PersistentClient(path=db_path)
     # In strict mode, get_collection errors if not found. Let's use get_or_create_collection
-    col_summaries = chroma_client.get_or_create_collection("protocol_summaries")
-    col_rules = chroma_client.get_or_create_collection("decision_rules")
-    col_refs = chroma_client.get_or_create_collection("reference_info")
+    collections = {name: chroma_client.get_or_create_collection(name) for name in COLLECTIONS}
+    sync = CollectionSync(collections, min(batch_size, chroma_client.get_max_batch_size()))
 
-    # 2. Parse PDF
+    # 2. Pages -> lines -> chunks -> batches, synced as they come:
+    #    batch N is embedded in the background while batch N+1 is being extracted and chunked
     chunker = SmartChunker()
-    chunks = chunker.chunk_pdf(DATA_PATH)
-    print(f"📦 Generated {len(chunks)} semantic chunks.")
-    
-    # 3. Upload to Chroma
-    for i, chunk in enumerate(chunks):
-        target_col = col_refs
-        if chunk['metadata']['type'] == 'protocol_summaries':
-            target_col = col_summaries
-        elif chunk['metadata']['type'] == 'decision_rules':
-            target_col = col_rules
-            
-        final_text = f"PROTOCOL: {chunk['metadata']['protocol']}\nSECTION: {chunk['metadata']['section']}\nCONTENT:\n{chunk['content']}"
-        
-        target_col.add(
-            documents=[final_text],
-            metadatas=[chunk['metadata']],
-            ids=[f"chunk_{i}_{uuid4().hex[:8]}"]
-        )
-        
-        if i % 10 == 0:
-            print(f"   Indexed {i}/{len(chunks)} chunks...", end='\r')
-            
-    print(f"\n✅ Ingestion Complete! DB is ready at {DB_PATH}")
+    n_chunks = 0
+    failed: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = None
+        for batch in iter_batches(chunker.iter_chunks(iter_pages(documents, workers, root, failed)), sync.batch_size):
+            n_chunks += len(batch)
+            new = sync.plan(batch)
+            if pending is not None:
+                sync.write(pending.result())
+            pending = pool.submit(sync.embed, new)
+            print(f"   {chunker.pages} pages, {n_chunks} chunks...", end='\r')
+        if pending is not None:
+            sync.write(pending.result())
+    print()
+
+    # 3. Chunks the documents read in full no longer produce. Chunks of other documents
+    #    (outside data_path, or failed to extract) are kept; a complete run over
+    #    DATA_PATH also drops those of deleted documents (and chunks without a source).
+    for path, error in failed.items():
+        print(f"⚠️ {os.path.relpath(path, root)}: not read completely ({error}), its stored chunks are kept")
+    if full_corpus and not failed:
+        sync.finish()
+    else:
+        sync.finish([os.path.relpath(path, root) for path in documents if path not in failed])
+    for name, stats in sync.stats.items():
+        print(f"   {name}: {stats['added']} added, {stats['deleted']} deleted, {stats['unchanged']} unchanged" + " " * 20)
+
+    # Running servers drop their cached retrievals and reload the in-memory index
+    if sync.changed():
+        for col in collections.values():
+            bump_version(col)
+
+    seconds = max(time.perf_counter() - start, 1e-9)
+    print(f"⏱️ {len(documents)} document(s), {chunker.pages} pages, {n_chunks} chunks in {seconds:.1f}s: "
+          f"{chunker.pages / seconds:.1f} pages/sec, {n_chunks / seconds:.1f} chunks/sec")
+    print(f"\n✅ Ingestion Complete! DB is ready at {db_path}" if sync.changed() else
+          f"\n✅ Nothing changed. DB at {db_path} is up to date")
 
 if __name__ == "__main__":
-    ingest()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default=DATA_PATH, help="a guideline PDF or a directory of them")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="page extraction processes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="chunks per embedding call / upsert")
+    args = parser.parse_args()
+    ingest(args.data, args.db, args.workers, args.batch_size)
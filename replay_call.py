@@ -0,0 +1,113 @@
+
+"""
+Offline replay of a recorded media-stream call (regression benchmark for turn latency).
+
+Record live calls by setting CALL_RECORDING_DIR; each call is written as
+<session_id>.mscall. Then:
+
+    python replay_call.py recordings/call_<id>.mscall --speed 2
+    python replay_call.py --synthetic 5 --runs 3          # no recording needed
+
+Deepgram ASR/TTS are answered by the local stub server (ASR returns the
+transcripts captured with the recording), the Groq LLMs and the rules
+collection by the stand-ins in voice_server/replay/standins.py. Nothing
+leaves the machine.
+
+Reports per-turn p50 / p95 / max in ms for: end of speech -> first outbound
+audio, ASR, graph (full run and to the first speakable sentence) and TTS
+time to first audio.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Stand-in credentials: nothing is sent to the real providers
+for key, value in (("GROQ_API_KEY", "replay"), ("DEEPGRAM_API_KEY", "replay"),
+                   ("TWILIO_ACCOUNT_SID", "ACreplay"), ("TWILIO_AUTH_TOKEN", "replay")):
+    os.environ.setdefault(key, value)
+os.environ["CALL_RECORDING_DIR"] = ""  # Never re-record a replay
+
+from stub_provider_server import StubProviderServer
+from voice_server.replay.recording import read_recording, recorded_transcripts, TRANSCRIPT
+from voice_server.replay.replayer import replay_session, turn_latencies, summarize, synthetic_call
+
+SYNTHETIC_SCRIPT = [
+    "I have had a headache and a sore throat since yesterday",
+    "about two days",
+    "yes a little bit",
+    "no it is about the same",
+    "okay",
+    "yes please",
+    "the morning slot",
+]
+
+
+async def run(args):
+    if args.recording:
+        events = list(read_recording(args.recording))
+        transcripts = recorded_transcripts(args.recording)
+    else:
+        events = synthetic_call((SYNTHETIC_SCRIPT * 3)[:args.synthetic])
+        transcripts = [e.payload.decode("utf-8") for e in events if e.kind == TRANSCRIPT]
+
+    import voice_server.main as server
+    from voice_server.audio import tts, tts_cache as cache_module
+    from voice_server.audio.asr import ScriptedRecognizerFactory, set_recognizer_factory
+    from voice_server.core.config import settings
+    from voice_server.core.http_clients import provider_clients, _deepgram_config
+    from voice_server.replay.standins import install_standins
+
+    install_standins(llm_ms=args.llm_ms, diagnostician_ms=args.diagnostician_ms,
+                     retrieval_ms=None if args.real_retrieval else 50)
+    # Prompt cache in memory only, so replays never write audio to disk
+    tts.tts_cache = cache_module.TTSAudioCache(None, settings.TTS_CACHE_MAX_MB * 1024 * 1024, cache_module.load_manifest())
+    settings.ASR_MODE = args.asr_mode
+    if args.speed != 1:
+        # Playback clock is scaled by the fake Twilio side; don't pace TTS at 1x
+        settings.TTS_LEAD_MS = 3_600_000
+
+    all_turns = []
+    for n in range(args.runs):
+        stub = await StubProviderServer(latency_ms=args.asr_ms, handshake_ms=0, transcripts=transcripts,
+                                        chunk_ms=args.tts_chunk_ms).start()
+        provider_clients.configs["deepgram"] = _deepgram_config(stub.url)
+        set_recognizer_factory(ScriptedRecognizerFactory(transcripts, latency=args.asr_ms / 1000))
+        try:
+            session = await replay_session(server.CallSession, events, speed=args.speed, align=not args.no_align)
+        finally:
+            await provider_clients.aclose()
+            await stub.stop()
+        print(f"run {n + 1}: {len(session.trace.turns)} turns, {session.websocket.outbound_frames} audio frames out")
+        all_turns.extend(session.trace.turns)
+
+    report = summarize(turn_latencies(all_turns))
+    print(f"\n{'stage':<22}{'turns':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, row in report.items():
+        fmt = lambda v: f"{v:>10.0f}" if v is not None else f"{'-':>10}"
+        print(f"{name:<22}{row['turns']:>7}{fmt(row['p50_ms'])}{fmt(row['p95_ms'])}{fmt(row['max_ms'])}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return all_turns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recording", nargs="?", help=".mscall file (omit to replay a synthetic call)")
+    parser.add_argument("--synthetic", type=int, default=5, help="caller turns in the synthetic call")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay faster than real time (e.g. 4)")
+    parser.add_argument("--no-align", action="store_true", help="keep recorded timing even if the agent is still talking")
+    parser.add_argument("--asr-mode", choices=["batch", "streaming"], default=os.getenv("ASR_MODE", "batch"))
+    parser.add_argument("--asr-ms", type=float, default=150, help="stand-in ASR / TTS first-byte latency")
+    parser.add_argument("--tts-chunk-ms", type=float, default=0)
+    parser.add_argument("--llm-ms", type=float, default=300)
+    parser.add_argument("--diagnostician-ms", type=float, default=600)
+    parser.add_argument("--real-retrieval", action="store_true", help="query the real Chroma collection")
+    parser.add_argument("--json", help="write the percentile report here")
+    args = parser.parse_args()
+    if args.recording and not os.path.exists(args.recording):
+        sys.exit(f"No such recording: {args.recording}")
+    asyncio.run(run(args))
@@ -0,0 +1,111 @@
+"""
+Soak test: checkpoint memory over thousands of simulated calls.
+
+Each simulated call runs the real triage graph turn by turn, switches to the
+booking graph the way CallSession does, then ends (the retention hook a
+`stop` event triggers). LLMs and retrieval are the replay stand-ins with
+zero latency, so only the graphs and the checkpointer do work.
+
+Every --report calls it prints the threads kept, checkpoint bytes held and
+process RSS. With retention, all three level off once CHECKPOINT_MAX_THREADS
+is reached. With --no-retention they grow with every call.
+
+    python soak_checkpoints.py --calls 3000 --max-threads 400
+    python soak_checkpoints.py --calls 3000 --no-retention
+    python soak_checkpoints.py --backend sqlite
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import os
+import resource
+import sys
+import tempfile
+import time
+
+for key, value in (("GROQ_API_KEY", "soak"), ("DEEPGRAM_API_KEY", "soak")):
+    os.environ.setdefault(key, value)
+
+SCRIPT = [
+    "I have had a headache and a sore throat since yesterday",
+    "about two days",
+    "yes a little bit",
+    "no it is about the same",
+    "okay",
+    "yes please",
+    "the morning slot",
+]
+
+
+def rss_mib() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Peak, not current (non-Linux)
+
+
+async def simulate_call(n, agent_graph, booking_graph, HumanMessage):
+    thread_id = f"call_soak_{n}"
+    config = {"configurable": {"thread_id": thread_id}}
+    booking_config = {"configurable": {"thread_id": f"booking_{thread_id}"}}
+    booking = False
+    for text in SCRIPT:
+        message = {"messages": [HumanMessage(content=text)]}
+        if booking:
+            await booking_graph.ainvoke(message, config=booking_config)
+            continue
+        result = await agent_graph.ainvoke(message, config=config)
+        if result.get("triage_decision") == "EMERGENCY" or result.get("assessment_complete"):
+            booking = True
+            await booking_graph.ainvoke({**message, "triage_decision": result.get("triage_decision", "PENDING"),
+                                         "medical_summary": result.get("final_response", ""),
+                                         "booking_stage": "initial", "doctor_name": "Dr. Smith"},
+                                        config=booking_config)
+    return [thread_id, f"booking_{thread_id}"]
+
+
+async def main(args):
+    from langchain_core.messages import HumanMessage
+    from voice_server.agent.graph import agent_graph
+    from voice_server.booking_agent.graph import booking_graph
+    from voice_server.core.checkpointer import retention
+    from voice_server.replay.standins import install_standins
+
+    install_standins(llm_ms=0, diagnostician_ms=0, token_ms=0, retrieval_ms=0)
+    print(f"{args.calls} calls, backend={args.backend}, "
+          + ("no retention" if args.no_retention else f"max_threads={retention.max_threads} ttl={retention.ttl_seconds:g}s"))
+    print(f"{'calls':>7}{'threads':>9}{'ckpt KiB':>11}{'RSS MiB':>10}{'calls/s':>9}")
+
+    start = time.perf_counter()
+    devnull = open(os.devnull, "w")
+    for n in range(1, args.calls + 1):
+        with contextlib.redirect_stdout(devnull):  # The nodes' per-turn debug prints
+            threads = await simulate_call(n, agent_graph, booking_graph, HumanMessage)
+            if not args.no_retention:
+                await retention.end_call(threads)
+        if n % args.report == 0 or n == args.calls:
+            gc.collect()
+            kept = retention.threads()
+            print(f"{n:>7}{kept:>9}{retention.stored_bytes() / 1024:>11.0f}{rss_mib():>10.1f}"
+                  f"{n / (time.perf_counter() - start):>9.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=3000)
+    parser.add_argument("--report", type=int, default=250, help="print a sample every N calls")
+    parser.add_argument("--max-threads", type=int, default=400)
+    parser.add_argument("--ttl", type=float, default=3600)
+    parser.add_argument("--no-retention", action="store_true")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    args = parser.parse_args()
+
+    # Settings are read when the graphs are compiled, so set them before importing
+    os.environ["CHECKPOINT_BACKEND"] = args.backend
+    os.environ["CHECKPOINT_MAX_THREADS"] = str(args.max_threads)
+    os.environ["CHECKPOINT_TTL_SECONDS"] = str(args.ttl)
+    if args.backend == "sqlite":
+        os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="soak_"), "checkpoints.sqlite")
+    sys.exit(asyncio.run(main(args)))
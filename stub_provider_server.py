@@ -0,0 +1,126 @@
+
+"""
+Local stand-in for the Deepgram REST endpoints (HTTP/1.1 keep-alive).
+
+- POST /v1/speak  -> mu-law silence, ~60ms of audio per character, sent in chunks
+- POST /v1/listen -> Deepgram-shaped JSON transcript (X-Stub-Transcript header, else the next of
+                     `transcripts`, else "stub transcript")
+- HEAD /          -> 200
+
+`handshake_ms` is charged once per new TCP connection to stand in for the
+TLS handshake, so connection reuse shows up in latency numbers.
+
+Run standalone:  python stub_provider_server.py --port 8765
+"""
+import argparse
+import asyncio
+import json
+from typing import List, Optional
+
+
+class StubProviderServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, handshake_ms: float = 30.0,
+                 latency_ms: float = 5.0, chunk_ms: float = 0.0, chunk_bytes: int = 1600,
+                 transcripts: Optional[List[str]] = None):
+        self.host = host
+        self.port = port
+        self.handshake = handshake_ms / 1000
+        self.latency = latency_ms / 1000
+        self.chunk_delay = chunk_ms / 1000
+        self.chunk_bytes = chunk_bytes
+        self.transcripts = list(transcripts or [])
+        self.connections = 0
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode().partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                await self._respond(writer, method, target.split("?")[0], headers, body)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, method, path, headers, body):
+        if path == "/v1/speak" and method == "POST":
+            text = json.loads(body or b"{}").get("text", "")
+            audio = b"\xff" * (len(text) * 480)
+            writer.write(self._head(200, "audio/basic", len(audio)))
+            for i in range(0, len(audio), self.chunk_bytes):
+                writer.write(audio[i:i + self.chunk_bytes])
+                await writer.drain()
+                if self.chunk_delay:
+                    await asyncio.sleep(self.chunk_delay)
+            return
+        if path == "/v1/listen" and method == "POST":
+            if "x-stub-transcript" in headers:
+                transcript = headers["x-stub-transcript"]
+            else:
+                transcript = self.transcripts.pop(0) if self.transcripts else "stub transcript"
+            payload = json.dumps({"results": {"channels": [{"alternatives": [{"transcript": transcript}]}]}}).encode()
+            writer.write(self._head(200, "application/json", len(payload)) + payload)
+        elif method == "HEAD":
+            writer.write(self._head(200, "text/plain", 0))
+        else:
+            writer.write(self._head(404, "text/plain", 0))
+        await writer.drain()
+
+    @staticmethod
+    def _head(status: int, content_type: str, length: int) -> bytes:
+        reason = {200: "OK", 404: "Not Found"}.get(status, "OK")
+        return (
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {length}\r\nConnection: keep-alive\r\n\r\n"
+        ).encode()
+
+
+async def _serve(args):
+    server = await StubProviderServer(args.host, args.port, args.handshake_ms, args.latency_ms, args.chunk_ms).start()
+    print(f"Stub provider listening on {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--chunk-ms", type=float, default=0.0)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,40 @@
+import argparse
+import asyncio
+
+import replay_call
+from voice_server.audio.codec import FRAME_BYTES
+from voice_server.audio.ring_buffer import AudioRingBuffer
+
+
+def test_clamp_utterance_longer_than_ring():
+    print("TEST: An utterance longer than the ring is trimmed, not an error...")
+    ring = AudioRingBuffer(capacity=100 * FRAME_BYTES, max_backlog=10 * FRAME_BYTES)
+    start = 0
+    for _ in range(250):  # 2.5x the capacity
+        ring.write(bytes(FRAME_BYTES))
+        ring.read_frame()
+    try:
+        ring.view(start, ring.read_pos)
+        raise AssertionError("view() should refuse audio that was overwritten")
+    except ValueError:
+        pass
+    lo, hi = ring.clamp(start, ring.read_pos)
+    assert (lo, hi) == (ring.write_pos - ring.capacity, ring.read_pos)
+    assert len(ring.view(lo, hi)) == ring.capacity
+    print("✅ Clamped to the newest audio.")
+
+
+def test_long_utterance_call():
+    print("TEST: Replaying a call with a ~13.5s utterance...")
+    replay_call.SYNTHETIC_SCRIPT = [" ".join(["word"] * 45), "okay"]  # ~0.3s of speech per word
+    args = argparse.Namespace(recording=None, synthetic=2, runs=1, speed=4, no_align=False, asr_mode="batch",
+                              asr_ms=150, tts_chunk_ms=0, llm_ms=300, diagnostician_ms=600, real_retrieval=False,
+                              json=None)
+    turns = asyncio.run(replay_call.run(args))
+    assert len(turns) == 2, f"{len(turns)} turns (the VAD task died on the long utterance?)"
+    print("✅ Both turns processed.")
+
+
+if __name__ == "__main__":
+    test_clamp_utterance_longer_than_ring()
+    test_long_utterance_call()
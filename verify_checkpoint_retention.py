@@ -0,0 +1,90 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+for key, value in (("GROQ_API_KEY", "verify"), ("DEEPGRAM_API_KEY", "verify")):
+    os.environ.setdefault(key, value)
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from voice_server.core.checkpointer import CheckpointRetention, SqliteCheckpointSaver
+
+
+def put(saver, thread_id, ts=None):
+    checkpoint = empty_checkpoint()
+    if ts:
+        checkpoint["ts"] = ts
+    saver.put({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}, checkpoint, {}, {})
+
+
+def set_last_put(path, thread_id, at):
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE threads SET last_put = ? WHERE thread_id = ?", (at, thread_id))
+    conn.commit()
+    conn.close()
+
+
+def test_cap_is_shared_between_workers():
+    print("TEST: Two workers on one file share the max-threads cap...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoints.sqlite")
+        a, b = SqliteCheckpointSaver(path), SqliteCheckpointSaver(path)
+        for i in range(3):
+            put(a, f"a{i}")
+            put(b, f"b{i}")
+        retention = CheckpointRetention(ttl_seconds=0, max_threads=4)
+        retention.register(a)
+        evicted = asyncio.run(retention.sweep())
+        assert evicted == 2 and a.thread_count() == b.thread_count() == 4, (evicted, a.thread_count())
+        assert b.get_tuple({"configurable": {"thread_id": "a0"}}) is None  # Oldest write, gone for both
+        assert b.get_tuple({"configurable": {"thread_id": "b2"}}) is not None
+        a.close()
+        b.close()
+    print("✅ Cap applied to the union of both workers' threads.")
+
+
+def test_ttl_survives_restart():
+    print("TEST: An idle thread written by another worker expires after a restart...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoints.sqlite")
+        other = SqliteCheckpointSaver(path)
+        put(other, "idle")
+        put(other, "fresh")
+        other.close()
+        set_last_put(path, "idle", time.time() - 3600)
+
+        restarted = SqliteCheckpointSaver(path)  # Must not reset "idle" to now
+        retention = CheckpointRetention(ttl_seconds=600, max_threads=100)
+        retention.register(restarted)
+        assert asyncio.run(retention.sweep()) == 1
+        assert restarted.get_tuple({"configurable": {"thread_id": "idle"}}) is None
+        assert restarted.get_tuple({"configurable": {"thread_id": "fresh"}}) is not None
+        restarted.close()
+    print("✅ TTL measured from the stored last write.")
+
+
+def test_backfill_uses_checkpoint_time():
+    print("TEST: Files without the threads table are backfilled from checkpoint ts...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoints.sqlite")
+        saver = SqliteCheckpointSaver(path)
+        put(saver, "old", ts="2020-01-01T00:00:00+00:00")
+        saver.close()
+        conn = sqlite3.connect(path)
+        conn.execute("DROP TABLE threads")
+        conn.commit()
+        conn.close()
+
+        saver = SqliteCheckpointSaver(path)
+        at = saver._read(lambda conn: conn.execute("SELECT last_put FROM threads WHERE thread_id = 'old'").fetchone()[0])
+        assert at == 1577836800.0, at  # Not the restart time
+        saver.close()
+    print("✅ Backfilled.")
+
+
+if __name__ == "__main__":
+    test_cap_is_shared_between_workers()
+    test_ttl_survives_restart()
+    test_backfill_uses_checkpoint_time()
@@ -0,0 +1,67 @@
+from voice_server.agent.nodes.emergency_matcher import (AMBIGUOUS, EMERGENCY, ROUTINE, EmergencyMatcher, is_bare_answer,
+                                                        is_negated)
+
+# Emergencies the matcher once classified ROUTINE (no LLM call)
+MISSED_BEFORE = [
+    "he has no pulse and is not breathing",
+    "no one can wake him up",
+    "I have no idea why he is unconscious",
+    "without warning I had crushing chest pain",
+    "my baby is not waking up",
+    "I took a whole bottle of sleeping tablets",
+    "I want to hurt myself",
+    "my child swallowed bleach",
+    "he is not responding",
+    "I was bitten by a snake",
+    "I can't feel my legs",
+]
+
+BARE_ANSWERS = ["yes", "no", "okay", "yes a little bit", "about two days", "for 3 weeks", "since yesterday", "Nope."]
+
+# Statements without any rule phrase or risk term still go to the LLM
+UNLISTED = ["I have a cold", "my arm went a strange colour", "he is acting really weird", "no it is about the same"]
+
+matcher = EmergencyMatcher()
+
+
+def test_missed_emergencies_reach_the_llm():
+    print("TEST: Former misses are never ROUTINE...")
+    for text in MISSED_BEFORE:
+        decision = matcher.match(text).decision
+        assert decision in (EMERGENCY, AMBIGUOUS), f"{text!r} -> {decision}"
+    print("✅ All flagged or sent to the LLM.")
+
+
+def test_only_bare_answers_are_routine():
+    print("TEST: ROUTINE only for bare yes/no/duration answers...")
+    for text in BARE_ANSWERS:
+        assert matcher.match(text).decision == ROUTINE, text
+    for text in UNLISTED:
+        assert matcher.match(text).decision == AMBIGUOUS, text
+    print("✅ Bare answers skip the LLM, statements don't.")
+
+
+def test_bare_answer_is_the_whole_turn():
+    print("TEST: A yes/no or duration followed by a statement is not a bare answer...")
+    for text in ("yes but now chest pain", "no, it moved to my left arm", "2 days and now a rash", "yes I also feel dizzy"):
+        assert not is_bare_answer(text), text
+    print("✅ Whole-turn match only.")
+
+
+def test_negation_is_the_word_before():
+    print("TEST: Negation only from the word directly before a match...")
+    text = "no one can wake him up"
+    assert not is_negated(text, text.index("wake"))
+    text = "without warning i had crushing chest pain"
+    assert not is_negated(text, text.index("crushing"))
+    text = "no chest pain"
+    assert is_negated(text, text.index("chest"))
+    assert matcher.match("without warning I had crushing chest pain").decision == EMERGENCY
+    print("✅ Negation scope correct.")
+
+
+if __name__ == "__main__":
+    test_missed_emergencies_reach_the_llm()
+    test_only_bare_answers_are_routine()
+    test_bare_answer_is_the_whole_turn()
+    test_negation_is_the_word_before()
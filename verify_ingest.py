@@ -0,0 +1,50 @@
+import itertools
+import os
+import tempfile
+
+import chromadb
+
+from ingest_agentic import DATA_PATH, CollectionSync, iter_documents, iter_pages
+
+
+def stored(col, ids, source):
+    col.upsert(ids=ids, embeddings=[[float(i), 1.0] for i in range(len(ids))], documents=ids,
+               metadatas=[{"source": source}] * len(ids))
+
+
+def test_partial_run_keeps_other_documents():
+    print("TEST: Re-ingesting one document prunes only that document's stale chunks...")
+    client = chromadb.EphemeralClient()
+    col = client.get_or_create_collection("verify_ingest_partial")
+    stored(col, ["a_kept", "a_stale"], "a.pdf")
+    stored(col, ["b_1", "b_2"], "guides/b.pdf")
+    sync = CollectionSync({"decision_rules": col})
+    sync.seen["decision_rules"].add("a_kept")  # What this run produced for a.pdf
+    sync.finish(["a.pdf"])
+    assert sorted(col.get(include=[])["ids"]) == ["a_kept", "b_1", "b_2"]
+    assert sync.stats["decision_rules"]["deleted"] == 1
+
+    sync.finish([])  # Every document failed: nothing pruned
+    assert len(col.get(include=[])["ids"]) == 3
+    sync.finish()  # Complete run over the whole corpus
+    assert col.get(include=[])["ids"] == ["a_kept"]
+    print("✅ Other documents untouched.")
+
+
+def test_failed_document_is_reported():
+    print("TEST: A PDF that fails to extract is recorded, the others still stream...")
+    with tempfile.TemporaryDirectory() as directory:
+        broken = os.path.join(directory, "broken.pdf")
+        with open(broken, "wb") as f:
+            f.write(b"%PDF-1.4 not really a pdf")
+        failed = {}
+        good = next(iter_documents(DATA_PATH))
+        pages = list(itertools.islice(iter_pages([broken, good], workers=1, failed=failed), 2))
+        assert list(failed) == [broken], failed
+        assert pages and all(source == os.path.basename(good) for source, _ in pages)
+    print("✅ Failure recorded.")
+
+
+if __name__ == "__main__":
+    test_partial_run_keeps_other_documents()
+    test_failed_document_is_reported()
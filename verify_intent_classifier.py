@@ -0,0 +1,37 @@
+from voice_server.agent.nodes.intent_classifier import IntentClassifier
+
+# Symptom descriptions that must never be taken as a reset (RESTART wipes the checklist and profile)
+SYMPTOMS = [
+    "the pain goes from the top of my head down to my neck",
+    "it has been there from the beginning of the week",
+    "I had to reset my insulin pump",
+    "my heart had to restart",
+    "it started again this morning",
+    "the itching starts over my whole back",
+]
+
+COMMANDS = ["start over", "let's start over", "can we start over please", "Start again.", "let's begin again",
+            "forget everything I said", "restart the triage"]
+
+classifier = IntentClassifier()
+
+
+def test_symptoms_are_not_restart():
+    print("TEST: Symptom descriptions are never classified RESTART locally...")
+    for text in SYMPTOMS:
+        intent = classifier.classify(text)
+        assert intent is None or intent.intent != "RESTART", f"{text!r} -> {intent}"
+    print("✅ No false resets.")
+
+
+def test_reset_commands():
+    print("TEST: Whole-utterance reset commands...")
+    for text in COMMANDS:
+        intent = classifier.classify(text)
+        assert intent is not None and intent.intent == "RESTART" and intent.source == "rules", f"{text!r} -> {intent}"
+    print("✅ Reset commands recognised.")
+
+
+if __name__ == "__main__":
+    test_symptoms_are_not_restart()
+    test_reset_commands()
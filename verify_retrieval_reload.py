@@ -0,0 +1,113 @@
+import asyncio
+import os
+import threading
+import time
+
+import numpy as np
+
+for key, value in (("GROQ_API_KEY", "verify"), ("DEEPGRAM_API_KEY", "verify")):
+    os.environ.setdefault(key, value)
+
+from voice_server.agent.nodes.hybrid_retrieval import HybridRetriever
+from voice_server.agent.nodes.retrieval_cache import RetrievalCache
+from voice_server.core.config import settings
+
+
+class FakeCollection:
+    """Just enough of a Chroma collection for the in-memory indexes."""
+
+    metadata = {"hnsw:space": "l2"}
+    configuration_json = {}
+
+    def __init__(self, documents, name="decision_rules", section="DANGER_SIGNS"):
+        self.documents = documents
+        self.name = name
+        self.section = section
+        self.gate = threading.Event()
+        self.gate.set()
+        self.load_threads = []
+
+    def get(self, include):
+        self.load_threads.append(threading.get_ident())
+        self.gate.wait()
+        rng = np.random.default_rng(len(self.documents))
+        return {"ids": [f"id{i}" for i in range(len(self.documents))], "documents": list(self.documents),
+                "metadatas": [{"protocol": "Fever", "section": self.section}] * len(self.documents),
+                "embeddings": rng.standard_normal((len(self.documents), 8)).astype(np.float32)}
+
+
+def test_reload_runs_off_the_loop():
+    print("TEST: Re-ingestion reloads the index in a worker thread, then swaps it in...")
+    collection = FakeCollection(["high fever and stiff neck", "fever with rash"])
+    hybrid = HybridRetriever([collection])
+    version, version_threads = [1], []
+
+    def version_source():
+        version_threads.append(threading.get_ident())
+        return version[0]
+
+    cache = RetrievalCache(16, version_source, check_interval=0)
+    cache.indexes = [hybrid]
+
+    async def run():
+        loop_thread = threading.get_ident()
+        cache.put("fever", 3, {"ids": [["id0"]]}, 0.01)
+        collection.documents = collection.documents + ["burns from boiling water"]
+        collection.gate.clear()  # Slow load: the loop must not wait for it
+        version[0] = 2
+        start = time.perf_counter()
+        cache.get("fever", 3)  # Only schedules the version read
+        assert time.perf_counter() - start < 0.05
+        await cache._check_task
+        assert version_threads[-1] != loop_thread
+        assert cache.get("fever", 3) is None  # Dropped with the old version
+        assert len(hybrid) == 2  # Old index still serving
+        assert hybrid.rank("fever", 3, None, None)
+        cache.put("fever", 3, {"ids": [["stale"]]}, 0.01)  # Computed from the old index mid-reload
+        collection.gate.set()
+        await cache._reload_task
+        assert collection.load_threads[-1] != loop_thread
+        assert len(hybrid) == 3 and len(hybrid.bm25.scores("burns")) == 3
+        assert hybrid.rank("boiling water burns", 1, None, None)[0]["id"] == "id2"
+        assert cache.get("fever", 3) is None  # Stale entry dropped after the swap
+
+    asyncio.run(run())
+    print("✅ Loaded in a thread, swapped on the loop.")
+
+
+def test_all_collections_searchable():
+    print("TEST: The default section filter keeps protocol_summaries (REFERENCE-only) searchable...")
+    hybrid = HybridRetriever([
+        FakeCollection(["Introduction to snake bites: stay calm and keep the limb still"], "protocol_summaries", "REFERENCE"),
+        FakeCollection(["refer snake bite with swelling immediately"], "decision_rules", "RED_FLAGS"),
+        FakeCollection(["assessment of the bite site and swelling"], "reference_info", "ASSESSMENT"),
+    ])
+    hits = hybrid.rank("snake bite introduction", 3, {"section": settings.RETRIEVAL_SECTIONS.split(",")}, None)
+    collections = {hit["collection"] for hit in hits}
+    assert "protocol_summaries" in collections and "decision_rules" in collections, collections
+    print("✅ Summary chunks can come back.")
+
+
+def test_bucket_bits_on_hybrid_path():
+    print("TEST: Hybrid retrieval shares cache entries between near-identical phrasings...")
+    from voice_server.agent.nodes import retrieval
+    if retrieval.hybrid is None or not len(retrieval.hybrid):
+        print("⚠️ Skipped: hybrid index not built")
+        return
+    cache = retrieval.retrieval_cache
+    cache.bucket_bits = 8
+    vectors = retrieval.hybrid.vectors
+    vector = vectors.matrix[0]
+    for text in ("my child has a high fever", "my kid has a high fever"):
+        vectors._embeddings[" ".join(text.split())] = vector + np.float32(1e-4) * len(text)  # No model needed
+    first = asyncio.run(retrieval.search_rules("my child has a high fever"))
+    hits = cache.hits
+    assert asyncio.run(retrieval.search_rules("my kid has a high fever")) == first
+    assert cache.hits == hits + 1
+    print("✅ Bucket hit on the hybrid path.")
+
+
+if __name__ == "__main__":
+    test_reload_runs_off_the_loop()
+    test_all_collections_searchable()
+    test_bucket_bits_on_hybrid_path()
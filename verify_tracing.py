@@ -0,0 +1,42 @@
+import asyncio
+import os
+import tempfile
+import threading
+
+for key, value in (("GROQ_API_KEY", "verify"), ("DEEPGRAM_API_KEY", "verify")):
+    os.environ.setdefault(key, value)
+
+from voice_server.core.tracing import Tracer
+
+
+def test_active_calls_are_never_evicted():
+    print("TEST: More concurrent calls than TRACE_HISTORY...")
+    tracer = Tracer(history=5)
+    traces = [tracer.start_call(f"call-{i}") for i in range(20)]
+    assert all(tracer.get(t.call_id) is t for t in traces)
+    for trace in traces[:12]:
+        asyncio.run(tracer.end_call(trace))
+    assert len(tracer.calls) == 5 + 8, len(tracer.calls)  # Last 5 finished + 8 still active
+    assert tracer.get("call-0") is None and tracer.get("call-11") is not None and tracer.get("call-19") is not None
+    print("✅ Only finished traces evicted.")
+
+
+def test_dump_runs_off_the_loop():
+    print("TEST: JSON dump written from a worker thread...")
+    with tempfile.TemporaryDirectory() as directory:
+        tracer = Tracer(history=5, directory=directory)
+        trace = tracer.start_call("call-dump")
+        trace.mark("speech_end")
+        loop_thread = threading.get_ident()
+        writers = []
+        dump = tracer._dump
+        tracer._dump = lambda t: (writers.append(threading.get_ident()), dump(t))
+        asyncio.run(tracer.end_call(trace))
+        assert writers and writers[0] != loop_thread
+        assert os.path.exists(os.path.join(directory, "call-dump.json"))
+    print("✅ Dumped in a thread.")
+
+
+if __name__ == "__main__":
+    test_active_calls_are_never_evicted()
+    test_dump_runs_off_the_loop()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+from unittest import mock
+
+for key, value in (("GROQ_API_KEY", "verify"), ("DEEPGRAM_API_KEY", "verify")):
+    os.environ.setdefault(key, value)
+
+from voice_server.audio.tts_cache import TTSAudioCache, load_manifest
+
+PROMPTS = load_manifest()
+MODEL = "aura-asteria-en"
+
+
+def test_llm_output_is_never_stored():
+    print("TEST: Only manifest prompts are cached...")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TTSAudioCache(directory, 1024 * 1024, PROMPTS)
+        cache.put("Okay, so your headache started two days ago.", MODEL, b"\xff" * 800)
+        assert cache.get("Okay, so your headache started two days ago.", MODEL) is None
+        assert os.listdir(directory) == []
+        cache.put(PROMPTS[0], MODEL, b"\xff" * 800)
+        assert cache.get(PROMPTS[0], MODEL) == b"\xff" * 800
+        assert len(os.listdir(directory)) == 1
+    print("✅ Free text kept off disk and out of memory.")
+
+
+def test_disk_tier_is_bounded():
+    print("TEST: Disk tier trimmed to its bound, oldest first...")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TTSAudioCache(directory, 1024 * 1024, PROMPTS, max_disk_bytes=2500)
+        for i, text in enumerate(PROMPTS[:5]):
+            cache.put(text, f"model-{i}", b"\xff" * 1000)
+        sizes = [os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)]
+        assert sum(sizes) <= 2500 and len(sizes) == 2, sizes
+        assert os.path.exists(cache._path(cache.key(PROMPTS[4], "model-4")))
+    print("✅ Bounded.")
+
+
+def test_write_failure_is_not_fatal():
+    print("TEST: A failing rename never raises out of put()...")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TTSAudioCache(directory, 1024 * 1024, PROMPTS)
+        with mock.patch("voice_server.audio.tts_cache.os.replace", side_effect=OSError("disk full")):
+            cache.put(PROMPTS[0], MODEL, b"\xff" * 800)
+        assert cache.stats["disk_errors"] == 1
+        assert os.listdir(directory) == []  # Temp file cleaned up
+        assert cache.get(PROMPTS[0], MODEL) == b"\xff" * 800  # Still served from memory
+    print("✅ Non-fatal.")
+
+
+def test_temp_names_are_unique():
+    print("TEST: Concurrent writers use distinct temp files...")
+    with tempfile.TemporaryDirectory() as directory:
+        a, b = TTSAudioCache(directory, 1024, PROMPTS), TTSAudioCache(directory, 1024, PROMPTS)
+        seen = []
+        real_replace = os.replace
+
+        def record(src, dst):
+            seen.append(src)
+            real_replace(src, dst)
+
+        with mock.patch("voice_server.audio.tts_cache.os.replace", side_effect=record):
+            a.put(PROMPTS[0], MODEL, b"\x01" * 100)
+            b._write(a._path(a.key(PROMPTS[0], MODEL)), b"\x02" * 100)
+        assert len(set(seen)) == 2, seen
+    print("✅ Unique.")
+
+
+if __name__ == "__main__":
+    test_llm_output_is_never_stored()
+    test_disk_tier_is_bounded()
+    test_write_failure_is_not_fatal()
+    test_temp_names_are_unique()
@@ -1,45 +1,85 @@
 
+import asyncio
+
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 
 from voice_server.agent.state import TriageState
 from voice_server.agent.nodes.retrieval import retrieval_node
 from voice_server.agent.nodes.diagnostician import diagnostician_node
 from voice_server.agent.nodes.strategist import strategist_node
 from voice_server.agent.nodes.emergency import emergency_scan_node
+from voice_server.agent.nodes.compaction import compaction_node
+from voice_server.core.checkpointer import make_checkpointer
+from voice_server.core.config import settings
+from voice_server.core.tracing import traced_node
+
+# (traced: per-node latency histograms + the call's timeline)
+traced_scan = traced_node("emergency_scan", emergency_scan_node)
+traced_retrieval = traced_node("retrieval", retrieval_node)
+
+async def scan_and_retrieve_node(state):
+    """
+    Emergency scan and retrieval side by side: the Chroma query only needs the
+    caller's last message and the compacted profile, not the scan's verdict.
+    On EMERGENCY the retrieval is cancelled (an in-flight query finishes in its
+    worker thread, unused). Compaction runs before this node, as it runs before
+    retrieval in the sequential graph, so both build the same retrieval query.
+    """
+    retrieval = asyncio.create_task(traced_retrieval(state))
+    try:
+        scan = await traced_scan(state)
+    except BaseException:
+        retrieval.cancel()
+        raise
+    if scan.get("triage_decision") == "EMERGENCY":
+        retrieval.cancel()
+        return scan
+    return {**scan, **await retrieval}
 
-def build_graph():
+def build_graph(parallel_scan=None):
+    if parallel_scan is None:
+        parallel_scan = settings.PARALLEL_SCAN_RETRIEVAL
     workflow = StateGraph(TriageState)
     
     # Add Nodes
-    workflow.add_node("emergency_scan", emergency_scan_node)
-    workflow.add_node("retrieval", retrieval_node)
-    workflow.add_node("diagnostician", diagnostician_node)
-    workflow.add_node("strategist", strategist_node)
+    if parallel_scan:
+        workflow.add_node("scan_and_retrieve", traced_node("scan_and_retrieve", scan_and_retrieve_node))
+    else:
+        workflow.add_node("emergency_scan", traced_scan)
+        workflow.add_node("retrieval", traced_retrieval)
+    workflow.add_node("compaction", traced_node("compaction", compaction_node))
+    workflow.add_node("diagnostician", traced_node("diagnostician", diagnostician_node))
+    workflow.add_node("strategist", traced_node("strategist", strategist_node))
     
     # Define Edges
-    workflow.set_entry_point("emergency_scan")
+    # Compaction first (local, no I/O): retrieval plans its query from this turn's profile
+    workflow.set_entry_point("compaction")
+    scan = "scan_and_retrieve" if parallel_scan else "emergency_scan"
+    workflow.add_edge("compaction", scan)
+    after_scan = "diagnostician" if parallel_scan else "retrieval"
     
     def decide_after_scan(state):
         if state.get("triage_decision") == "EMERGENCY":
             return END
-        return "retrieval"
+        return after_scan
 
     workflow.add_conditional_edges(
-        "emergency_scan",
+        scan,
         decide_after_scan,
         {
             END: END,
-            "retrieval": "retrieval"
+            after_scan: after_scan
         }
     )
     
-    workflow.add_edge("retrieval", "diagnostician")
+    # Parallel:   compaction -> scan_and_retrieve -> diagnostician
+    # Sequential: compaction -> emergency_scan -> retrieval -> diagnostician
+    if not parallel_scan:
+        workflow.add_edge("retrieval", "diagnostician")
     workflow.add_edge("diagnostician", "strategist")
     workflow.add_edge("strategist", END)
     
-    # Memory
-    memory = MemorySaver()
-    return workflow.compile(checkpointer=memory)
+    # Memory (MemorySaver or SQLite, per settings.CHECKPOINT_BACKEND)
+    return workflow.compile(checkpointer=make_checkpointer())
 
 agent_graph = build_graph()
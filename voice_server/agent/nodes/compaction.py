@@ -0,0 +1,188 @@
+
+"""
+Rolling conversation compaction.
+
+Runs once per turn before retrieval. New messages are folded into the
+running PatientProfile (symptoms, denials, duration, age, ...) with cheap
+rules, no LLM call. Messages older than the recent window are removed from
+the state, so the history, the checkpoints and the de-duplication scans stay
+the same size however long the call runs.
+
+The node also precomputes `conversation_context`: the profile plus as much
+of the recent window as fits in CONTEXT_TOKEN_BUDGET. The diagnostician and
+strategist put that in their prompts instead of re-stringifying history.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, RemoveMessage
+
+from voice_server.core.config import settings
+
+CHARS_PER_TOKEN = 4  # Rough estimate for English prompt text (no tokenizer dependency)
+
+SYMPTOMS = [
+    "headache", "migraine", "fever", "chills", "cough", "sore throat", "runny nose", "congestion", "sneezing",
+    "ear pain", "earache", "chest pain", "chest tightness", "shortness of breath", "difficulty breathing",
+    "wheezing", "palpitations", "dizziness", "fainting", "nausea", "vomiting", "diarrhea", "constipation",
+    "abdominal pain", "stomach pain", "stomach ache", "back pain", "neck pain", "stiff neck", "joint pain",
+    "body aches", "muscle aches", "fatigue", "tiredness", "weakness", "numbness", "tingling", "rash", "itching",
+    "swelling", "bleeding", "blurred vision", "sensitivity to light", "confusion", "loss of appetite",
+    "weight loss", "insomnia", "anxiety", "burning urination", "frequent urination",
+]
+CONDITIONS = [
+    "diabetes", "asthma", "hypertension", "high blood pressure", "heart disease", "heart attack", "stroke",
+    "copd", "cancer", "kidney disease", "liver disease", "thyroid", "epilepsy", "depression", "pregnant",
+    "allergies", "allergy",
+]
+MEDICATIONS = [
+    "ibuprofen", "advil", "paracetamol", "acetaminophen", "tylenol", "aspirin", "antibiotics", "amoxicillin",
+    "insulin", "metformin", "inhaler", "antihistamine", "blood thinners", "warfarin", "statins", "lisinopril",
+    "birth control", "steroids", "prednisone",
+]
+
+
+def _terms(words: List[str]) -> "re.Pattern":
+    return re.compile(r"\b(" + "|".join(sorted((re.escape(w) for w in words), key=len, reverse=True)) + r")\b")
+
+
+_SYMPTOM_RE = _terms(SYMPTOMS)
+_CONDITION_RE = _terms(CONDITIONS)
+_MEDICATION_RE = _terms(MEDICATIONS)
+# Clause boundaries for negation scope ("a headache but no fever", "a cough and no fever")
+_CLAUSE_SPLIT = re.compile(r"[,.;!?]|\b(?:but|however|although|though)\b|\band\b(?=\s+(?:no|not|never|i don't|i haven't)\b)")
+_NEGATION = re.compile(r"\b(no|not|never|without|none|don't|dont|do not|haven't|havent|didn't|didnt|isn't|denies?)\b")
+_YES = re.compile(r"^\s*(yes|yeah|yep|yup|i do|i have|a little|sometimes|correct|right)\b")
+_NO = re.compile(r"^\s*(no|nope|nah|not really|i don't|i dont|i haven't|none|never)\b")
+_NUMBER = r"(?:\d+|a|an|one|two|three|four|five|six|seven|eight|nine|ten|few|couple of|several)"
+_DURATION = re.compile(
+    rf"\b(?:for|since|about|around|past|last|over)?\s*({_NUMBER}\s+(?:hours?|days?|weeks?|months?|years?)"
+    rf"|yesterday|last night|this morning|today|a while)\b")
+_AGE = re.compile(r"\b(\d{1,3})\s*(?:years?\s*old|yrs?\s*old|y/?o)\b|\bi(?: am|'m)\s+(\d{1,3})\b")
+_GENDER = re.compile(r"\b(male|female|man|woman|boy|girl)\b")
+_GENDER_NAMES = {"man": "male", "boy": "male", "woman": "female", "girl": "female"}
+
+
+def empty_profile() -> Dict[str, Any]:
+    return {"age": None, "gender": None, "symptoms": [], "denied_symptoms": [], "duration": None,
+            "medical_history": [], "current_meds": []}
+
+
+def _add(items: List[str], value: str):
+    if value not in items:
+        items.append(value)
+
+
+def _set_symptom(profile: Dict[str, Any], symptom: str, present: bool):
+    # A later answer overrides an earlier one ("no fever" ... "actually I do have a fever")
+    keep, drop = ("symptoms", "denied_symptoms") if present else ("denied_symptoms", "symptoms")
+    if symptom in profile[drop]:
+        profile[drop].remove(symptom)
+    _add(profile[keep], symptom)
+
+
+def symptom_mentions(text: str) -> List[Tuple[str, bool]]:
+    """(symptom, present) for each lexicon symptom in the text; absent when negated in its clause."""
+    mentions = []
+    for clause in _CLAUSE_SPLIT.split(text.lower()):
+        negated = bool(_NEGATION.search(clause))
+        mentions.extend((match.group(1), not negated) for match in _SYMPTOM_RE.finditer(clause))
+    return mentions
+
+
+def update_profile(profile: Dict[str, Any], question: Optional[str], answer: str) -> Dict[str, Any]:
+    """Fold one caller message (and the agent question it answers) into the profile."""
+    text = answer.lower()
+    mentions = symptom_mentions(text)
+    for symptom, present in mentions:
+        _set_symptom(profile, symptom, present=present)
+    mentioned = bool(mentions)
+
+    # Bare yes/no: attribute it to the symptoms the agent just asked about
+    if question and "?" in question and not mentioned:
+        asked = [m.group(1) for m in _SYMPTOM_RE.finditer(question.lower())]
+        if asked and (_YES.match(text) or _NO.match(text)):
+            for symptom in asked:
+                _set_symptom(profile, symptom, present=bool(_YES.match(text)))
+
+    if match := _DURATION.search(text):
+        profile["duration"] = match.group(1)
+    if match := _AGE.search(text):
+        age = int(match.group(1) or match.group(2))
+        if 0 < age < 120:
+            profile["age"] = age
+    if match := _GENDER.search(text):
+        profile["gender"] = _GENDER_NAMES.get(match.group(1), match.group(1))
+    for match in _CONDITION_RE.finditer(text):
+        _add(profile["medical_history"], match.group(1))
+    for match in _MEDICATION_RE.finditer(text):
+        _add(profile["current_meds"], match.group(1))
+    return profile
+
+
+def format_profile(profile: Dict[str, Any]) -> str:
+    lines = []
+    if profile.get("age") or profile.get("gender"):
+        lines.append(f"- Patient: {' '.join(str(v) for v in (profile.get('age'), profile.get('gender')) if v)}")
+    for key, label in (("symptoms", "Reported symptoms"), ("denied_symptoms", "Denied symptoms"),
+                       ("medical_history", "Medical history"), ("current_meds", "Current medications")):
+        if profile.get(key):
+            lines.append(f"- {label}: {', '.join(profile[key])}")
+    if profile.get("duration"):
+        lines.append(f"- Duration: {profile['duration']}")
+    return "\n".join(lines) or "- Nothing recorded yet"
+
+
+def build_context(profile: Dict[str, Any], messages: List[BaseMessage], token_budget: Optional[int] = None) -> str:
+    """Profile plus the newest messages that fit in the token budget (older ones first to go)."""
+    budget = (token_budget or settings.CONTEXT_TOKEN_BUDGET) * CHARS_PER_TOKEN
+    head = f"PATIENT PROFILE:\n{format_profile(profile)}\nRECENT CONVERSATION:"
+    budget -= len(head)
+    lines: List[str] = []
+    for m in reversed(messages):
+        line = f"{m.type}: {m.content}"
+        if len(line) > budget:
+            if not lines and budget > 40:
+                lines.append(line[:budget - 3] + "...")  # Always show (the start of) the latest message
+            break
+        lines.append(line)
+        budget -= len(line) + 1
+    return "\n".join([head] + lines[::-1])
+
+
+def conversation_context(state: Dict[str, Any]) -> str:
+    """The precomputed context, or one built on the spot (nodes invoked outside the graph)."""
+    return state.get("conversation_context") or build_context(
+        state.get("patient_profile") or empty_profile(), state.get("messages", [])[-settings.CONTEXT_WINDOW_MESSAGES:])
+
+
+async def compaction_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    messages = state.get("messages", [])
+    profile = state.get("patient_profile") or empty_profile()
+    profile = {**empty_profile(), **profile}
+    profile = {k: list(v) if isinstance(v, list) else v for k, v in profile.items()}  # Don't mutate the checkpoint
+
+    # Only the messages added since the last compaction (the whole list on the first turn)
+    ids = [m.id for m in messages]
+    last = state.get("compacted_until")
+    start = ids.index(last) + 1 if last in ids else 0
+    question = None
+    for m in messages[:start][::-1]:
+        if m.type == "ai":
+            question = m.content
+            break
+    for m in messages[start:]:
+        if m.type == "ai":
+            question = m.content
+        elif m.type == "human":
+            update_profile(profile, question, m.content)
+
+    window = max(1, settings.CONTEXT_WINDOW_MESSAGES)
+    kept, dropped = messages[-window:], messages[:-window]
+    return {
+        "patient_profile": profile,
+        "conversation_context": build_context(profile, kept),
+        "compacted_until": messages[-1].id if messages else None,
+        # Folded into the profile: drop them from the state (and from every later checkpoint)
+        "messages": [RemoveMessage(id=m.id) for m in dropped],
+    }
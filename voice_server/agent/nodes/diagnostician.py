@@ -4,20 +4,27 @@ from voice_server.core.config import settings
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from voice_server.agent.nodes.compaction import conversation_context
+from voice_server.core.llm_cache import llm_cache
 import difflib
 
 # Using OpenAI Client for GPT-OSS-120b (as per original successful config)
 from groq import AsyncGroq
 client = AsyncGroq(api_key=settings.GROQ_API_KEY)
 
+DIAGNOSTICIAN_MODEL = "openai/gpt-oss-120b"
+
 async def simple_invoke(prompt):
-    completion = await client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[{"role": "user", "content": prompt}],
-        response_format={"type": "json_object"},
-        temperature=0
-    )
-    return completion.choices[0].message.content
+    async def call():
+        completion = await client.chat.completions.create(
+            model=DIAGNOSTICIAN_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            temperature=0
+        )
+        return completion.choices[0].message.content
+
+    return await llm_cache.get_or_call("diagnostician", DIAGNOSTICIAN_MODEL, prompt, call)
 
 
 def is_similar(a, b, threshold=0.6):
@@ -30,9 +37,8 @@ async def diagnostician_node(state: Dict[str, Any]) -> Dict[str, Any]:
     protocols = state.get("retrieved_protocols", [])
     current_checklist = state.get("safety_checklist", [])
     
-    # Context
-    history_list = [f"{m.type}: {m.content}" for m in messages[-20:]]
-    history_str = "\n".join(history_list)
+    # Context (patient profile + recent window, precomputed by the compaction node)
+    history_str = conversation_context(state)
     knowledge = "\n\n".join(protocols)
     
     # Gather Investigated Symptoms (Known persistence)
@@ -72,7 +78,7 @@ async def diagnostician_node(state: Dict[str, Any]) -> Dict[str, Any]:
                 cleaned.append(q)
         return cleaned
 
-    # Gather History for prohibition
+    # Gather History for prohibition (earlier questions live on in investigated_symptoms)
     message_history_texts = [m.content for m in messages if m.type == 'ai']
     forbidden_list = investigated + message_history_texts
 
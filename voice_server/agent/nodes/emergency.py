@@ -4,6 +4,8 @@ import json
 import os
 from langchain_groq import ChatGroq
 from voice_server.core.config import settings
+from voice_server.core.llm_cache import cached_ainvoke
+from voice_server.agent.nodes.emergency_matcher import emergency_matcher, EMERGENCY, ROUTINE
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 
 llm_scanner = ChatGroq(
@@ -20,9 +22,19 @@ async def emergency_scan_node(state: Dict[str, Any]) -> Dict[str, Any]:
             
         last_user_msg = messages[-1].content
         
-        # Load Rules (Simplified Path)
-        emergency_rules = []
-        # ... logic to load rules ...
+        # Local rules first (compiled from emergency_rules.json, microseconds).
+        # They never clear a statement: only bare yes/no/duration answers skip the LLM.
+        if settings.EMERGENCY_SCAN_MODE == "hybrid":
+            match = emergency_matcher.match(last_user_msg)
+            if match.decision == EMERGENCY:
+                print(f"🚨 Emergency rule matched: {match.symptom} ('{match.text}')")
+                return {
+                    "triage_decision": "EMERGENCY",
+                    "final_response": "",
+                    "messages": []
+                }
+            if match.decision == ROUTINE:
+                return {"triage_decision": "ROUTINE"}
 
         prompt = f"""
         You are EMERGENCY TRIAGE.
@@ -31,7 +43,7 @@ async def emergency_scan_node(state: Dict[str, Any]) -> Dict[str, Any]:
         OUTPUT JSON: {{ "is_emergency": bool, "reason": "str", "final_response": "str(optional)" }}
         """
         
-        response = await llm_scanner.ainvoke([
+        response = await cached_ainvoke("emergency_scan", llm_scanner, [
             SystemMessage(content="You are a strict JSON output bot."),
             HumanMessage(content=prompt)
         ])
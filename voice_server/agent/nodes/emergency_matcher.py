@@ -0,0 +1,186 @@
+
+"""
+Local emergency-rule matcher compiled from emergency_rules.json.
+
+Every symptom in the rules (its name before any parenthesis) and its lay
+`synonyms` are compiled into anchored patterns, indexed by the first three
+letters of their first word. Each category's `risk_terms` ("breath*",
+"chest", ...) get a second index. Matching looks up each word of the turn
+and only tries the few patterns that can start there, so a turn costs a
+handful of dict lookups rather than one scan per phrase.
+
+A turn is classified as:
+
+    EMERGENCY  a rule phrase that is not negated ("my lips are turning blue")
+    ROUTINE    a bare yes/no or duration answer ("yes", "about two days"):
+               no LLM call
+    AMBIGUOUS  anything else, with or without a risk term ("my chest feels
+               a bit odd"): the LLM scanner decides
+
+The lists can never be complete, so an unmatched statement is not taken as
+safe. Risk terms only label what the LLM is asked about.
+
+A match is negated when the word directly before it is a cue ("no chest
+pain", "never fainted"). Cues further back don't count: "no one can wake
+him up", "without warning I had crushing chest pain". Neither do cues
+inside the phrase itself ("not breathing").
+
+The file is re-read when its mtime changes (checked at most once a second),
+so rules and synonyms can be edited on a running server. A file that fails
+to compile leaves the previous rules in place.
+"""
+import json
+import os
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+EMERGENCY = "EMERGENCY"
+AMBIGUOUS = "AMBIGUOUS"
+ROUTINE = "ROUTINE"
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "emergency_rules.json")
+
+# Risk signals outside the rule categories that should still reach the LLM
+GENERAL_RISK_TERMS = ["bleed*", "blood", "faint*", "passed out", "collapse*", "suicid*", "kill myself", "end my life",
+                      "self harm", "overdose*", "pills", "poison*", "hit my head", "head injur*", "rigid",
+                      "unbearable", "stiff neck", "neck is stiff", "doesn't fade", "press* a glass", "emergency",
+                      "ambulance", "911", "tablets", "sleeping pills", "hurt myself", "harm myself", "swallow*",
+                      "bleach", "bitten", "bite", "snake*", "can't feel", "paraly*", "wake him", "wake her",
+                      "waking up", "responding", "no pulse"]
+
+# Word variants so one synonym covers the common phrasings
+_VARIANTS = {
+    "can't": ["can't", "cant", "cannot", "can not"],
+    "won't": ["won't", "wont", "will not"],
+    "isn't": ["isn't", "isnt", "is not"],
+    "doesn't": ["doesn't", "doesnt", "does not"],
+    "hasn't": ["hasn't", "hasnt", "has not"],
+    "my": ["my", "his", "her", "their", "your", "the"],
+    "is": ["is", "are", "was", "'s"],
+}
+_NEGATION = {"no", "not", "never", "without", "deny", "denies", "don't", "dont", "doesn't", "doesnt", "didn't",
+             "didnt", "haven't", "havent", "hasn't", "hasnt", "isn't", "isnt", "aren't", "arent", "wasn't", "wasnt"}
+_WORD = re.compile(r"[\w']+")
+# The only turns classified ROUTINE locally: the whole turn is a yes/no or a duration
+_NUMBER = r"(?:\d+|a|an|one|two|three|four|five|six|seven|eight|nine|ten|few|a few|couple of|a couple of|several)"
+_BARE_ANSWER = re.compile(
+    r"(?:(?:yes|yeah|yep|yup|no|nope|nah|not really|ok|okay|sure|correct|right)"
+    r"(?: (?:please|thanks|thank you|a little|a little bit|a bit|sometimes))?"
+    rf"|(?:(?:for|since|about|around|maybe|over|the past|the last) )*{_NUMBER} (?:hours?|days?|weeks?|months?|years?)"
+    r"(?: ago| now)?"
+    r"|(?:since )?(?:yesterday|last night|this morning|today))")
+
+# first 3 letters of a first word -> [(anchored pattern, rule info)], longest pattern first
+Index = Dict[str, List[Tuple["re.Pattern", tuple]]]
+
+
+class RuleMatch(NamedTuple):
+    decision: str
+    symptom: Optional[str] = None  # Rule symptom (EMERGENCY) or risk term (AMBIGUOUS)
+    category: Optional[str] = None
+    action: Optional[str] = None
+    text: Optional[str] = None     # The words that matched
+
+
+def _word_pattern(word: str) -> str:
+    options = _VARIANTS.get(word, [word])
+    return "(?:" + "|".join(r"\s+".join(map(re.escape, o.split())).replace(r"\*", r"\w*") for o in options) + ")"
+
+
+def _first_keys(phrase: str) -> List[str]:
+    first = phrase.split()[0]
+    return sorted({option.split()[0].rstrip("*")[:3] for option in _VARIANTS.get(first, [first])})
+
+
+def _symptom_name(symptom: str) -> str:
+    # "Central cyanosis (blue lips/tongue)" -> "central cyanosis", "Anaphylaxis: Sudden ..." -> "anaphylaxis"
+    return re.split(r"[(:]| - ", symptom)[0].strip().lower()
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().replace("’", "'").split())
+
+
+def compile_rules(rules: List[dict]) -> Tuple[Index, Index]:
+    """Phrase index (-> EMERGENCY) and risk-term index (-> AMBIGUOUS)."""
+    phrases: Dict[str, tuple] = {}
+    terms: Dict[str, tuple] = {}
+    for category in rules:
+        for symptom in category.get("symptoms", []):
+            info = (symptom, category.get("category"), category.get("action"))
+            for phrase in [_symptom_name(symptom)] + category.get("synonyms", {}).get(symptom, []):
+                phrases.setdefault(_normalize(phrase), info)
+        for term in category.get("risk_terms", []):
+            terms.setdefault(_normalize(term), (term, category.get("category"), category.get("action")))
+    for term in GENERAL_RISK_TERMS:
+        terms.setdefault(_normalize(term), (term, None, None))
+
+    def index(entries: Dict[str, tuple]) -> Index:
+        out: Index = {}
+        # Longest first, so "crushing chest pain" wins over "chest pain" at the same word
+        for phrase in sorted(entries, key=len, reverse=True):
+            pattern = re.compile(r"\s+".join(_word_pattern(w) for w in phrase.split()) + r"(?!\w)")
+            for key in _first_keys(phrase):
+                out.setdefault(key, []).append((pattern, entries[phrase]))
+        return out
+
+    return index(phrases), index(terms)
+
+
+def is_negated(text: str, start: int) -> bool:
+    """True when the word directly before `start` is a negation cue."""
+    before = _WORD.findall(text[max(0, start - 16):start])
+    return bool(before) and before[-1] in _NEGATION
+
+
+def is_bare_answer(text: str) -> bool:
+    """The whole turn is a yes/no or a duration ("about two days"), with nothing else said."""
+    return bool(_BARE_ANSWER.fullmatch(" ".join(_WORD.findall(_normalize(text)))))
+
+
+class EmergencyMatcher:
+    def __init__(self, path: str = RULES_PATH, reload_interval: float = 1.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.version = 0  # Bumped on every successful (re)load
+        self._mtime = None
+        self._checked = 0.0
+        self._phrases: Index = {}
+        self._terms: Index = {}
+        self._load()
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, encoding="utf-8") as f:
+            self._phrases, self._terms = compile_rules(json.load(f))
+        self._mtime = mtime
+        self.version += 1
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        try:
+            if os.stat(self.path).st_mtime != self._mtime:
+                self._load()
+                print(f"🔁 Emergency rules reloaded (version {self.version})")
+        except (OSError, ValueError, re.error) as e:
+            print(f"⚠️ Emergency rules not reloaded, keeping previous version: {e}")
+            self._mtime = None if isinstance(e, OSError) else os.stat(self.path).st_mtime
+
+    def match(self, text: str) -> RuleMatch:
+        self._maybe_reload()
+        text = _normalize(text)
+        starts = [(w.start(), w.group()[:3]) for w in _WORD.finditer(text)]
+        for index, decision in ((self._phrases, EMERGENCY), (self._terms, AMBIGUOUS)):
+            for start, key in starts:
+                for pattern, (name, category, action) in index.get(key, ()):
+                    m = pattern.match(text, start)
+                    if m and not is_negated(text, start):
+                        return RuleMatch(decision, name, category, action, m.group(0))
+        return RuleMatch(ROUTINE) if is_bare_answer(text) else RuleMatch(AMBIGUOUS)
+
+
+emergency_matcher = EmergencyMatcher()
@@ -0,0 +1,206 @@
+
+"""
+Hybrid lexical + vector retrieval over all three knowledge collections.
+
+protocol_summaries, decision_rules and reference_info are loaded together:
+- one VectorIndex: one matrix, so one product searches all three
+- one BM25 index over the same chunks, built once at startup from a sparse
+  BM25 weight matrix; a query is one sparse product
+
+Each query takes the top RETRIEVAL_CANDIDATES of both rankings. It keeps
+only chunks whose `section` / `protocol` metadata pass the filter, and fuses
+the two rankings:
+
+    rrf        sum of 1 / (RRF_K + rank) over the rankings a chunk is in
+    weighted   w * BM25 + (1 - w) * vector similarity, each min-max scaled
+
+The lexical side costs well under a millisecond. The vector side needs the
+query embedding, and that is given up to RETRIEVAL_BUDGET_MS.
+If it is late or the model is unavailable, the turn goes ahead lexical-only.
+A late embedding still lands in the index's cache for the next turn. After
+a failure the model is not tried again for VECTOR_RETRY_SECONDS.
+"""
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, CountVectorizer
+
+from voice_server.agent.nodes.vector_index import VectorIndex
+
+RRF_K = 60
+VECTOR_RETRY_SECONDS = 60  # After an embedding failure, lexical only for this long
+_TOKEN = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ing", "edly", "ed", "es", "ly", "s")
+
+
+def _stem(token: str) -> str:
+    # Light suffix stripping so "coughing"/"coughs" meet "cough" (no stemmer dependency)
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def analyze(text: str) -> List[str]:
+    return [_stem(t) for t in _TOKEN.findall(text.lower()) if t not in ENGLISH_STOP_WORDS]
+
+
+class BM25Index:
+    """Okapi BM25 with the per-(chunk, term) weights precomputed."""
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.vectorizer = CountVectorizer(analyzer=analyze)
+        counts = sparse.csr_matrix(self.vectorizer.fit_transform(documents), dtype=np.float32) if documents else None
+        if counts is None:
+            self.weights = None
+            return
+        n_docs = counts.shape[0]
+        doc_len = np.asarray(counts.sum(axis=1)).ravel()
+        doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+        idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        # tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len)), times idf, on the non-zeros only
+        norm = k1 * (1 - b + b * doc_len / max(doc_len.mean(), 1e-9))
+        rows = np.repeat(np.arange(n_docs), np.diff(counts.indptr))
+        tf = counts.data
+        counts.data = idf[counts.indices] * tf * (k1 + 1) / (tf + norm[rows])
+        self.weights = counts.T.tocsr()  # term x chunk: a query sums a few rows
+        self.vocabulary = self.vectorizer.vocabulary_
+
+    def scores(self, query: str) -> np.ndarray:
+        if self.weights is None:
+            return np.zeros(0, dtype=np.float32)
+        terms = sorted({self.vocabulary[t] for t in analyze(query) if t in self.vocabulary})
+        scores = np.zeros(self.weights.shape[1], dtype=np.float32)
+        for term in terms:
+            start, end = self.weights.indptr[term], self.weights.indptr[term + 1]
+            scores[self.weights.indices[start:end]] += self.weights.data[start:end]
+        return scores
+
+
+class HybridRetriever:
+    def __init__(self, collections: Sequence[Any], candidates: int = 20, fusion: str = "rrf",
+                 lexical_weight: float = 0.5, embedding_cache_size: int = 1024):
+        self.candidates = candidates
+        self.fusion = fusion
+        self.lexical_weight = lexical_weight
+        self.vectors = VectorIndex(list(collections), embedding_cache_size=embedding_cache_size)
+        self.embedding_timeouts = 0
+        self._vector_retry_at = 0.0
+        self._masks: Dict[tuple, np.ndarray] = {}
+        self._swap_lexical(*self._build_lexical(self.vectors.documents, self.vectors.metadatas))
+
+    @staticmethod
+    def _build_lexical(documents: Sequence[str], metadatas: Sequence[dict]) -> tuple:
+        protocols = sorted({(m or {}).get("protocol", "") for m in metadatas} - {""})
+        return BM25Index(documents), protocols
+
+    def _swap_lexical(self, bm25: BM25Index, protocols: List[str]):
+        self.bm25, self.protocols, self._masks = bm25, protocols, {}
+
+    def reload(self):
+        self.swap(self.load())
+
+    def load(self) -> tuple:
+        """New vector and BM25 state from the collections (blocking; run it off the event loop)."""
+        state = self.vectors.load()
+        return state, self._build_lexical(state["documents"], state["metadatas"])
+
+    def swap(self, loaded: tuple):
+        """Install a load() result: vectors and BM25 rows change together."""
+        state, lexical = loaded
+        self.vectors.swap(state)
+        self._swap_lexical(*lexical)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def mask(self, where: Optional[Dict[str, Sequence[str]]]) -> Optional[np.ndarray]:
+        """Rows whose metadata matches every {field: allowed values} entry."""
+        if not where:
+            return None
+        key = tuple(sorted((field, tuple(sorted(allowed))) for field, allowed in where.items()))
+        if key not in self._masks:
+            self._masks[key] = np.array([all((m or {}).get(field) in allowed for field, allowed in where.items())
+                                         for m in self.vectors.metadatas], dtype=bool)
+        return self._masks[key]
+
+    def protocols_in(self, text: str) -> List[str]:
+        text = text.lower()
+        return [p for p in self.protocols if p.lower() in text]
+
+    def vector_ready(self) -> bool:
+        """False while backing off after an embedding failure."""
+        return time.monotonic() >= self._vector_retry_at
+
+    def vector_failed(self, error: BaseException):
+        self._vector_retry_at = time.monotonic() + VECTOR_RETRY_SECONDS
+        print(f"⚠️ Hybrid retrieval: query embedding failed ({type(error).__name__}), "
+              f"lexical only for {VECTOR_RETRY_SECONDS}s")
+
+    def _embedding_done(self, task: "asyncio.Future"):
+        if not task.cancelled() and task.exception() is not None:
+            self.vector_failed(task.exception())
+
+    async def embedding(self, query: str, budget_ms: Optional[float] = None) -> Optional[np.ndarray]:
+        """The query embedding if cached or computed within the budget, else None (it keeps computing)."""
+        embedding = self.vectors.cached_embedding(query)
+        try:
+            if embedding is None and self.vector_ready():
+                task = asyncio.ensure_future(self.vectors.aembed(query))
+                task.add_done_callback(self._embedding_done)
+                embedding = await asyncio.wait_for(asyncio.shield(task), None if budget_ms is None else budget_ms / 1000)
+        except asyncio.TimeoutError:
+            self.embedding_timeouts += 1  # Still running: cached for the next turn
+        except Exception:
+            pass  # Reported by _embedding_done
+        return embedding
+
+    async def search(self, query: str, k: int = 3, where: Optional[Dict[str, Sequence[str]]] = None,
+                     budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Fused top-k chunks as {id, collection, document, metadata, score, lexical_rank, vector_rank}."""
+        return self.rank(query, k, where, await self.embedding(query, budget_ms))
+
+    def rank(self, query: str, k: int, where: Optional[Dict[str, Sequence[str]]],
+             embedding: Optional[np.ndarray]) -> List[Dict[str, Any]]:
+        """search() once the embedding is known (None = lexical only). No await, so a swap() never lands mid-rank."""
+        mask = self.mask(where)
+        if mask is not None and not mask.any():
+            mask = None  # Filter matched nothing: search everything rather than return nothing
+
+        lexical = self.bm25.scores(query)
+        if mask is not None:
+            lexical = np.where(mask, lexical, 0.0)
+        lexical_top = [int(i) for i in np.argsort(-lexical)[:self.candidates] if lexical[i] > 0]
+
+        vector_top: List[tuple] = []
+        if embedding is not None:
+            vector_top = self.vectors.search(embedding, self.candidates, mask)[0]
+
+        fused: Dict[int, float] = {}
+        if self.fusion == "weighted":
+            for rows, values, weight in ((lexical_top, [lexical[i] for i in lexical_top], self.lexical_weight),
+                                         ([i for i, _ in vector_top], [-d for _, d in vector_top], 1 - self.lexical_weight)):
+                if rows:
+                    low, high = min(values), max(values)
+                    for row, value in zip(rows, values):
+                        fused[row] = fused.get(row, 0.0) + weight * ((value - low) / (high - low) if high > low else 1.0)
+        else:
+            for rows in (lexical_top, [i for i, _ in vector_top]):
+                for rank, row in enumerate(rows):
+                    fused[row] = fused.get(row, 0.0) + 1 / (RRF_K + rank + 1)
+
+        lexical_rank = {row: rank for rank, row in enumerate(lexical_top)}
+        vector_rank = {row: rank for rank, (row, _) in enumerate(vector_top)}
+        return [{
+            "id": self.vectors.ids[row],
+            "collection": self.vectors.sources[row],
+            "document": self.vectors.documents[row],
+            "metadata": self.vectors.metadatas[row],
+            "score": score,
+            "lexical_rank": lexical_rank.get(row),
+            "vector_rank": vector_rank.get(row),
+        } for row, score in sorted(fused.items(), key=lambda item: -item[1])[:k]]
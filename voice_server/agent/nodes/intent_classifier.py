@@ -0,0 +1,124 @@
+
+"""
+Local intent classifier for the strategist (ANSWER / RESTART / CLARIFY / IRRELEVANT).
+
+Two stages, both in-process:
+
+1. Lexicon rules for the replies that make up most turns: bare yes/no/unsure
+   answers ("no", "not really", "a little"), reset commands that are the
+   whole utterance ("let's start over") and clarification requests ("what
+   do you mean"). Confidence 1.0.
+2. A small scikit-learn model (char + word TF-IDF, logistic regression)
+   trained at startup from intent_examples.json. Its prediction is used only
+   when its probability reaches INTENT_CONFIDENCE_THRESHOLD, and never for
+   RESTART: a symptom described with "from the top" or "restart" must not
+   wipe the call, so those go to the LLM.
+
+`classify` returns None when neither stage is confident. The strategist
+then asks the LLM as before and calls `record_llm`, so the counters show
+the local hit rate and how many LLM calls were saved.
+"""
+import json
+import os
+import re
+import threading
+from typing import NamedTuple, Optional
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline, make_union
+
+from voice_server.core.config import settings
+from voice_server.core.tracing import metrics
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_examples.json")
+
+# RESTART wipes the checklist and profile: only a short command that is the whole utterance
+_RESTART = re.compile(r"^(?:(?:ok|okay|so|please|sorry|actually|no)[\s,]+)?"
+                      r"(?:(?:can|could) (?:we|you|i) |let'?s |let me |i'?d like to |i would like to |i want to |we should )?"
+                      r"(?:start (?:over|again|afresh|fresh|from (?:the beginning|scratch))|begin again"
+                      r"|forget everything(?: i said)?|re-?(?:set|start) (?:the |this )?(?:conversation|triage|assessment|questions)"
+                      r"|start a new assessment)(?:[\s,]+please)?[\s,.!?]*$")
+_CLARIFY = re.compile(r"^(?:what|huh|pardon|sorry|sorry what|come again|why)\W*$|\bwhat do(?:es)? (?:you|that|it) mean\b"
+                      r"|\bwhat you mean\b|\b(?:don't|do not|didn't) (?:understand|get|catch)(?: (?:that|it|the question))?\W*$"
+                      r"|\b(?:repeat|rephrase|say (?:that|it) again)\b|\b(?:can|could) you explain\b|\bexplain (?:that|it)\b"
+                      r"|\bwhy (?:do|are|would) you ask")
+_ANSWER = re.compile(r"^(?:(?:yes|yeah|yep|yup|no|nope|nah|okay|ok|sure|correct|right|maybe|sometimes|a little(?: bit)?"
+                     r"|a bit|not really|not at all|i do|i don't|i dont|i have|i haven't|i did|i didn't|it does"
+                     r"|it doesn't|i'm not sure|not sure|i don't think so|i think so|i guess so|not that i know of"
+                     r"|none|never|(?:yes|no|okay) please)\b[\s,.!]*)+$")
+
+
+class Intent(NamedTuple):
+    intent: str
+    confidence: float
+    source: str  # "rules" or "model"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().replace("’", "'").split())
+
+
+class IntentClassifier:
+    def __init__(self, path: str = EXAMPLES_PATH, threshold: Optional[float] = None):
+        self.threshold = settings.INTENT_CONFIDENCE_THRESHOLD if threshold is None else threshold
+        with open(path, encoding="utf-8") as f:
+            examples = json.load(f)
+        texts = [_normalize(t) for label in examples for t in examples[label]]
+        labels = [label for label in examples for _ in examples[label]]
+        self.model = make_pipeline(
+            make_union(TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True),
+                       TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)),
+            LogisticRegression(C=10.0, max_iter=1000))
+        self.model.fit(texts, labels)
+        self.rule_hits = 0
+        self.model_hits = 0
+        self.llm_calls = 0
+        self._lock = threading.Lock()
+
+    def rules(self, text: str) -> Optional[str]:
+        if _RESTART.match(text):
+            return "RESTART"
+        if _CLARIFY.search(text):
+            return "CLARIFY"
+        if _ANSWER.match(text):
+            return "ANSWER"
+        return None
+
+    def predict(self, text: str) -> Intent:
+        """Model prediction regardless of the threshold."""
+        probs = self.model.predict_proba([_normalize(text)])[0]
+        best = probs.argmax()
+        return Intent(self.model.classes_[best], float(probs[best]), "model")
+
+    def classify(self, text: str) -> Optional[Intent]:
+        text = _normalize(text)
+        if intent := self.rules(text):
+            with self._lock:
+                self.rule_hits += 1
+            return Intent(intent, 1.0, "rules")
+        prediction = self.predict(text)
+        if prediction.confidence >= self.threshold and prediction.intent != "RESTART":
+            with self._lock:
+                self.model_hits += 1
+            return prediction
+        return None
+
+    def record_llm(self):
+        with self._lock:
+            self.llm_calls += 1
+
+    def local(self) -> int:
+        return self.rule_hits + self.model_hits
+
+    def hit_rate(self) -> float:
+        total = self.local() + self.llm_calls
+        return self.local() / total if total else 0.0
+
+
+intent_classifier = IntentClassifier()
+metrics.gauge("voice_intent_local_total", "Strategist intents classified locally (LLM calls saved).",
+              intent_classifier.local)
+metrics.gauge("voice_intent_llm_total", "Strategist intents that fell back to the LLM.", lambda: intent_classifier.llm_calls)
+metrics.gauge("voice_intent_local_ratio", "Share of strategist intents classified without the LLM.",
+              intent_classifier.hit_rate)
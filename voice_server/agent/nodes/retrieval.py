@@ -1,36 +1,154 @@
 
 import os
+import time
 import chromadb
-from typing import Dict, Any, List
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_groq import ChatGroq
 from voice_server.core.config import settings
+from voice_server.agent.nodes.vector_index import VectorIndex
+from voice_server.agent.nodes.hybrid_retrieval import HybridRetriever
+from voice_server.agent.nodes.retrieval_cache import RetrievalCache, collection_version
+from voice_server.agent.nodes.compaction import symptom_mentions
+from voice_server.agent.nodes.emergency_matcher import is_bare_answer
+from voice_server.core.tracing import metrics
+
+COLLECTIONS = ["protocol_summaries", "decision_rules", "reference_info"]  # As written by ingest_agentic.py
 
 chroma_client = chromadb.PersistentClient(path=settings.DB_PATH)
 # Use get_or_create to avoid errors if ingestion hasn't run
-col_rules = chroma_client.get_or_create_collection("decision_rules")
+collections = {name: chroma_client.get_or_create_collection(name) for name in COLLECTIONS}
+col_rules = collections["decision_rules"]
 
-async def retrieval_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    messages = state.get("messages", [])
-    last_msg = messages[-1].content
-    
-    print(f"🔎 Retrieving for: {last_msg}")
-    
-    # Chroma query is sync, but we can wrap it or just leave it if fast.
-    # ideally await asyncio.to_thread
+# In-memory copies for search without a thread hop (Chroma stays the source of truth):
+# hybrid = BM25 + vectors over all three collections, rules_index = vectors over decision_rules only
+hybrid = None
+rules_index = None
+if settings.RETRIEVAL_INDEX:
+    try:
+        if settings.HYBRID_RETRIEVAL:
+            hybrid = HybridRetriever(list(collections.values()), candidates=settings.RETRIEVAL_CANDIDATES,
+                                     fusion=settings.RETRIEVAL_FUSION, lexical_weight=settings.RETRIEVAL_LEXICAL_WEIGHT,
+                                     embedding_cache_size=settings.QUERY_EMBEDDING_CACHE_SIZE)
+            print(f"📚 Hybrid index: {len(hybrid)} chunks from {len(COLLECTIONS)} collections (BM25 + vectors)")
+        else:
+            rules_index = VectorIndex(col_rules, embedding_cache_size=settings.QUERY_EMBEDDING_CACHE_SIZE)
+            print(f"📚 Rules index: {len(rules_index)} chunks in memory ({rules_index.space})")
+    except Exception as e:
+        print(f"⚠️ Retrieval index not built, querying Chroma: {e}")
+
+# Results shared across calls; dropped when ingestion bumps the collections' versions
+retrieval_cache = RetrievalCache(
+    max_entries=settings.RETRIEVAL_CACHE_MAX_ENTRIES,
+    version_source=lambda: tuple(collection_version(chroma_client.get_collection(name)) for name in COLLECTIONS),
+    check_interval=settings.RETRIEVAL_VERSION_CHECK_SECONDS,
+    bucket_bits=settings.RETRIEVAL_CACHE_BUCKET_BITS,
+)
+retrieval_cache.indexes = [index for index in (hybrid, rules_index) if index is not None]
+metrics.gauge("voice_retrieval_cache_hit_ratio", "Share of retrievals answered from the cross-call cache.",
+              retrieval_cache.hit_ratio)
+metrics.gauge("voice_retrieval_cache_saved_seconds_total", "Retrieval time saved by cache hits.",
+              lambda: retrieval_cache.saved_seconds)
+metrics.gauge("voice_retrieval_cache_entries", "Retrieval results held by the cache.", lambda: len(retrieval_cache))
+
+retrieval_stats = {"queried": 0, "reused": 0}
+metrics.gauge("voice_retrieval_reused_total", "Turns that kept the protocols already retrieved (topic unchanged).",
+              lambda: retrieval_stats["reused"])
+
+async def search_rules(query_text: str, n_results: int = 3) -> Dict[str, Any]:
+    """Top rules for the query: cross-call cache, then the in-memory index (or Chroma)."""
     import asyncio
-    
+
     def query():
         return col_rules.query(
-            query_texts=[last_msg],
-            n_results=3
+            query_texts=[query_text],
+            n_results=n_results
         )
-        
-    results = await asyncio.to_thread(query)
+
+    results = retrieval_cache.get(query_text, n_results) if settings.RETRIEVAL_CACHE_ENABLED else None
+    if results is None:
+        start = time.perf_counter()
+        if hybrid is not None and len(hybrid):
+            vector = await hybrid.embedding(query_text, settings.RETRIEVAL_BUDGET_MS)
+            if settings.RETRIEVAL_CACHE_ENABLED and vector is not None:
+                results = retrieval_cache.get(query_text, n_results, vector)  # Same embedding bucket (if enabled)
+            if results is None:
+                where = {"section": settings.RETRIEVAL_SECTIONS.split(",")}
+                if protocols := hybrid.protocols_in(query_text):
+                    where["protocol"] = protocols
+                hits = hybrid.rank(query_text, n_results, where, vector)
+                results = {key: [[hit[field] for hit in hits]]
+                           for key, field in (("ids", "id"), ("documents", "document"), ("metadatas", "metadata"))}
+                # Lexical-only answers (embedding late or unavailable) are not cached: the next turn may do better
+                if settings.RETRIEVAL_CACHE_ENABLED and vector is not None:
+                    retrieval_cache.put(query_text, n_results, results, time.perf_counter() - start, vector)
+        elif rules_index is not None and len(rules_index):
+            vector = await rules_index.aembed(query_text)
+            if settings.RETRIEVAL_CACHE_ENABLED:
+                results = retrieval_cache.get(query_text, n_results, vector)  # Same embedding bucket (if enabled)
+            if results is None:
+                results = rules_index.query(query_embeddings=[vector], n_results=n_results)
+                if settings.RETRIEVAL_CACHE_ENABLED:
+                    retrieval_cache.put(query_text, n_results, results, time.perf_counter() - start, vector)
+        else:
+            results = await asyncio.to_thread(query)
+            if settings.RETRIEVAL_CACHE_ENABLED:
+                retrieval_cache.put(query_text, n_results, results, time.perf_counter() - start)
+    return results
+
+def plan_retrieval(state: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    """
+    (query, reason) for this turn; query None = keep the protocols already in the state.
+    The query rolls up the caller's recent symptoms with their latest message.
+    """
+    text = state["messages"][-1].content
+    previous = (state.get("retrieval_query") or "").lower()
+    present = [symptom for symptom, is_present in symptom_mentions(text) if is_present]
+    known = (state.get("patient_profile") or {}).get("symptoms", [])
+    symptoms = list(dict.fromkeys(known + present))[-settings.RETRIEVAL_QUERY_SYMPTOMS:]
+    query = f"{', '.join(symptoms)}. {text}" if symptoms else text
+
+    if not settings.RETRIEVAL_REUSE or not state.get("retrieved_protocols"):
+        return query, "first retrieval"
+    new = [symptom for symptom in present if symptom not in previous]
+    if new:
+        return query, f"new symptoms: {', '.join(new)}"
+    if len(text.split()) <= settings.RETRIEVAL_SHORT_ANSWER_WORDS and is_bare_answer(text):
+        return None, "short answer"
+    if state.get("safety_checklist"):
+        return None, "checklist pending"
+    return query, "topic check"
+
+async def retrieval_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    messages = state.get("messages", [])
+    last_msg = messages[-1].content
+
+    query_text, reason = plan_retrieval(state)
+    index = hybrid.vectors if hybrid is not None and hybrid.vector_ready() else rules_index
+    if reason == "topic check" and index is not None and len(index):
+        # Long answer, no new symptom: re-query only if it reads like a different topic
+        try:
+            current, previous = await index.aembed(last_msg), await index.aembed(state["retrieval_query"])
+            similarity = float(current @ previous / ((np.linalg.norm(current) * np.linalg.norm(previous)) or 1.0))
+            if similarity >= settings.RETRIEVAL_TOPIC_SIMILARITY:
+                query_text, reason = None, f"same topic ({similarity:.2f})"
+        except Exception as e:
+            if hybrid is not None:
+                hybrid.vector_failed(e)
+            print(f"⚠️ Topic check skipped ({type(e).__name__}), re-querying")
+
+    if query_text is None:
+        retrieval_stats["reused"] += 1
+        print(f"🔎 Keeping retrieved protocols ({reason}): {last_msg}")
+        return {}
+
+    retrieval_stats["queried"] += 1
+    print(f"🔎 Retrieving for: {query_text} ({reason})")
+    results = await search_rules(query_text, n_results=settings.RETRIEVAL_TOP_K)
     
     docs = []
     if results['documents']:
         for i, doc in enumerate(results['documents'][0]):
             docs.append(doc)
             
-    return {"retrieved_protocols": docs}
-
+    return {"retrieved_protocols": docs, "retrieval_query": query_text}
@@ -0,0 +1,182 @@
+
+"""
+Process-wide cache of retrieval results, invalidated by re-ingestion.
+
+Callers describe the same few complaints all day. Results are cached across
+calls, keyed by the normalized query text. Optionally they are also keyed by
+an embedding bucket: a SimHash of the query embedding over
+RETRIEVAL_CACHE_BUCKET_BITS random hyperplanes, so near-identical phrasings
+share an entry (whenever the caller has the embedding: always on the
+vector path, on the hybrid path when it arrived within the budget). The
+least recently used entries are evicted.
+
+`ingest_agentic.ingest()` bumps an `ingest_version` stamp in each
+collection's metadata (`bump_version`). The cache re-reads the stamp at most
+every RETRIEVAL_VERSION_CHECK_SECONDS, in a worker thread (a lookup only
+compares against the last value read). When it changes, every entry is
+dropped and the registered in-memory `indexes` reload: `load()` runs in a
+worker thread, `swap()` installs the result on the event loop, and entries
+cached meanwhile (from the old index) are dropped again. Turns keep using
+the old index until then. This also covers ingestion run from another
+process.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+VERSION_KEY = "ingest_version"
+
+
+def collection_version(collection: Any) -> int:
+    return int((collection.metadata or {}).get(VERSION_KEY, 0))
+
+
+def bump_version(collection: Any) -> int:
+    """Mark the collection's content as changed (call after ingestion)."""
+    version = collection_version(collection) + 1
+    # hnsw:* keys can't be modified after creation
+    metadata = {k: v for k, v in (collection.metadata or {}).items() if not k.startswith("hnsw:")}
+    collection.modify(metadata={**metadata, VERSION_KEY: version})
+    return version
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class RetrievalCache:
+    def __init__(self, max_entries: int, version_source: Callable[[], Any], check_interval: float = 5.0,
+                 bucket_bits: int = 0):
+        self.max_entries = max_entries
+        self.version_source = version_source
+        self.check_interval = check_interval
+        self.bucket_bits = bucket_bits
+        self.indexes: List[Any] = []  # In-memory indexes (load() / swap()) rebuilt on a version change
+        self._reload_task: Optional["asyncio.Task"] = None
+        self._check_task: Optional["asyncio.Task"] = None
+        self._reload_again = False
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (results, seconds the miss took)
+        self._planes: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self.version = self._read_version()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    # --- VERSION ---
+
+    def _read_version(self) -> Any:
+        try:
+            return self.version_source()
+        except Exception as e:
+            print(f"⚠️ Retrieval cache: version check failed: {e}")
+            return getattr(self, "version", None)
+
+    def check_version(self):
+        """Re-read the version at most every check_interval: in a worker thread when an event loop runs."""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # No event loop (scripts): read inline
+            self._apply_version(self._read_version())
+            return
+        if self._check_task is None or self._check_task.done():
+            self._check_task = loop.create_task(self._check())
+
+    async def _check(self):
+        self._apply_version(await asyncio.to_thread(self._read_version))
+
+    def _apply_version(self, version: Any):
+        if version == self.version:
+            return
+        print(f"🔄 Knowledge base re-ingested (version {self.version} -> {version}), dropping cached retrievals")
+        with self._lock:
+            self._entries.clear()
+            self.version = version
+        if not self.indexes:
+            return
+        if self._reload_task is not None and not self._reload_task.done():
+            self._reload_again = True  # Re-ingested again mid-reload: load once more when it finishes
+            return
+        try:
+            self._reload_task = asyncio.get_running_loop().create_task(self._reload())
+        except RuntimeError:  # No event loop (scripts): reload inline
+            for index in self.indexes:
+                index.reload()
+
+    async def _reload(self):
+        """Rebuild the indexes off the event loop, then swap them in."""
+        while True:
+            self._reload_again = False
+            for index in self.indexes:
+                try:
+                    loaded = await asyncio.to_thread(index.load)
+                except Exception as e:
+                    print(f"⚠️ Retrieval cache: reload after re-ingestion failed: {e}")
+                    continue
+                index.swap(loaded)
+            with self._lock:
+                self._entries.clear()  # Computed from the old index while loading
+            if not self._reload_again:
+                break
+
+    # --- KEYS ---
+
+    def _bucket(self, vector: np.ndarray) -> Optional[int]:
+        if not self.bucket_bits:
+            return None
+        if self._planes is None or self._planes.shape[1] != len(vector):
+            self._planes = np.random.default_rng(0).standard_normal((self.bucket_bits, len(vector))).astype(np.float32)
+        return sum(1 << i for i, above in enumerate(self._planes @ vector > 0) if above)
+
+    def _key(self, text: str, n_results: int, vector: Optional[np.ndarray]) -> Optional[tuple]:
+        if vector is None:
+            return ("text", n_results, _normalize(text))
+        bucket = self._bucket(vector)
+        return None if bucket is None else ("bucket", n_results, bucket)
+
+    # --- LOOKUP ---
+
+    def get(self, text: str, n_results: int, vector: Optional[np.ndarray] = None) -> Optional[dict]:
+        """Cached results for the text (or, given its embedding, for its bucket)."""
+        self.check_version()
+        key = self._key(text, n_results, vector)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[1]
+            return entry[0]
+
+    def put(self, text: str, n_results: int, results: dict, seconds: float, vector: Optional[np.ndarray] = None):
+        keys = [self._key(text, n_results, None)]
+        if vector is not None and self.bucket_bits:
+            keys.append(self._key(text, n_results, vector))
+        with self._lock:
+            self.misses += 1
+            for key in keys:
+                self._entries[key] = (results, seconds)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # --- STATS ---
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,9 +1,12 @@
 
 from typing import Dict, Any
 from voice_server.core.config import settings
+from voice_server.core.llm_cache import cached_ainvoke
 from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_groq import ChatGroq
+from voice_server.agent.nodes.compaction import conversation_context, empty_profile
+from voice_server.agent.nodes.intent_classifier import intent_classifier
 
 # Initialize LLM for Strategist (Using the same model as others or a specific one)
 # Llama-3.3-70b is good for summarization
@@ -14,6 +17,10 @@ llm_strategist = ChatGroq(
     temperature=0.2
 )
 
+# Calls tagged "speakable" are streamed sentence-by-sentence to TTS by the voice server
+SPEAKABLE_TAG = "speakable"
+SPEAKABLE = {"tags": [SPEAKABLE_TAG]}
+
 # Initialize Fast LLM for Intent Classification (User preference: gpt-oss-120b)
 llm_fast = ChatGroq(
     model="openai/gpt-oss-120b",
@@ -32,8 +39,7 @@ async def strategist_node(state: Dict[str, Any]) -> Dict[str, Any]:
         # Assessment complete - generate detailed summary using LLM
         
         # 1. Prepare Context
-        history_list = [f"{m.type}: {m.content}" for m in messages[-20:]]
-        history_str = "\n".join(history_list)
+        history_str = conversation_context(state)
         diagnosis_str = ", ".join(diagnosis) if diagnosis else "Undetermined routine condition"
         knowledge_str = "\n\n".join(protocols)
         
@@ -69,7 +75,7 @@ async def strategist_node(state: Dict[str, Any]) -> Dict[str, Any]:
         """
         
         try:
-            response = await llm_strategist.ainvoke(prompt)
+            response = await cached_ainvoke("summary", llm_strategist, prompt, config=SPEAKABLE)
 
             final_text = response.content.strip()
             
@@ -109,6 +115,14 @@ async def strategist_node(state: Dict[str, Any]) -> Dict[str, Any]:
         }
 
     # 2. INTENT CLASSIFICATION
+    # Local rules + model first; the LLM only when they are not confident
+    intent = None
+    if settings.LOCAL_INTENT:
+        local = intent_classifier.classify(last_user_msg)
+        if local:
+            intent = local.intent
+            print(f"🧠 Strategist Intent: {intent} (local {local.source}, {local.confidence:.2f})")
+
     # We ask the LLM: What is the user trying to do?
     intent_prompt = f"""
     Analyze the User's last message in the context of a medical triage.
@@ -127,30 +141,32 @@ async def strategist_node(state: Dict[str, Any]) -> Dict[str, Any]:
     
 
     
-    try:
-        import json
-        import re
-        # Use Fast LLM for Intent
-        intent_response = await llm_fast.ainvoke(intent_prompt)
-        content = intent_response.content
+    if intent is None:
+        intent_classifier.record_llm()
+        try:
+            import json
+            import re
+            # Use Fast LLM for Intent
+            intent_response = await cached_ainvoke("intent", llm_fast, intent_prompt)
+            content = intent_response.content
 
         
-        # Robust Parsing: Find first { and last }
-        match = re.search(r"\{.*\}", content, re.DOTALL)
-        if match:
-            json_str = match.group(0)
-            intent_data = json.loads(json_str)
-            intent = intent_data.get("intent", "ANSWER")
-        else:
-            # Fallback simple check if JSON fails
-            if "RESTART" in content.upper(): intent = "RESTART"
-            elif "CLARIFY" in content.upper(): intent = "CLARIFY"
-            else: intent = "ANSWER"
+            # Robust Parsing: Find first { and last }
+            match = re.search(r"\{.*\}", content, re.DOTALL)
+            if match:
+                json_str = match.group(0)
+                intent_data = json.loads(json_str)
+                intent = intent_data.get("intent", "ANSWER")
+            else:
+                # Fallback simple check if JSON fails
+                if "RESTART" in content.upper(): intent = "RESTART"
+                elif "CLARIFY" in content.upper(): intent = "CLARIFY"
+                else: intent = "ANSWER"
             
-        print(f"🧠 Strategist Intent: {intent}")
-    except Exception as e:
-        print(f"Intent Error: {e} | Content: {intent_response.content[:50]}...")
-        intent = "ANSWER" # Fallback
+            print(f"🧠 Strategist Intent: {intent}")
+        except Exception as e:
+            print(f"Intent Error: {e} | Content: {intent_response.content[:50]}...")
+            intent = "ANSWER" # Fallback
 
     # 3. HANDLE INTENTS
     
@@ -159,7 +175,9 @@ async def strategist_node(state: Dict[str, Any]) -> Dict[str, Any]:
             "triage_decision": "PENDING",
             "safety_checklist": [], # Clear checklist
             "investigated_symptoms": [], # Clear history
+            "patient_profile": empty_profile(),
             "differential_diagnosis": [],
+            "retrieved_protocols": [], # Next complaint is retrieved afresh
             "messages": [AIMessage(content="Okay, I have reset the session. Please tell me, what is your main symptom today?")],
             "final_response": "Okay, I have reset the session. Please tell me, what is your main symptom today?"
         }
@@ -173,7 +191,7 @@ async def strategist_node(state: Dict[str, Any]) -> Dict[str, Any]:
             f'User is confused about this question: "{last_question}". '
             'Explain it simply in 1 sentence, then politely ask it again.'
         )
-        explanation = (await llm_strategist.ainvoke(explanation_prompt)).content
+        explanation = (await cached_ainvoke("clarify", llm_strategist, explanation_prompt, config=SPEAKABLE)).content
 
         
         return {
@@ -0,0 +1,147 @@
+
+"""
+Read-only in-memory copy of Chroma collections for exact top-k search.
+
+The collections' few hundred chunks are loaded once (ids, documents,
+metadatas and embeddings) into one contiguous float32 matrix, so several
+collections are searched with a single product. A query is one
+matrix-vector product plus an argpartition, in-process, with no thread hop
+and no SQLite read. Scores follow the collection's distance space (l2 =
+squared L2 like Chroma's HNSW index, cosine, ip), so results match what
+`collection.query` would return. Collections searched together must share
+their embedding function and space.
+
+Query texts are embedded with the (first) collection's embedding function.
+The vectors are kept in an LRU cache keyed by the normalized text, so
+repeated complaints ("fever", "chest pain") skip the embedding model too.
+
+Chroma stays the source of truth. Call `reload()` after re-ingestion, or
+`load()` in a worker thread and `swap()` its result in on the event loop.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class VectorIndex:
+    def __init__(self, collection: Any, embedding_cache_size: int = 1024):
+        """`collection`: one Chroma collection, or a list searched as one."""
+        self.collections = list(collection) if isinstance(collection, (list, tuple)) else [collection]
+        self.collection = self.collections[0]
+        self.embedding_cache_size = embedding_cache_size
+        self._embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+        self.reload()
+
+    def reload(self):
+        """(Re)load every record of the collections."""
+        self.swap(self.load())
+
+    def load(self) -> Dict[str, Any]:
+        """Read the collections into a new index state (blocking; safe off the event loop)."""
+        ids, documents, metadatas, sources, rows = [], [], [], [], []
+        for collection in self.collections:
+            data = collection.get(include=["documents", "metadatas", "embeddings"])
+            ids += data["ids"]
+            documents += data["documents"]
+            metadatas += data["metadatas"]
+            sources += [collection.name] * len(data["ids"])
+            if data.get("embeddings") is not None and len(data["embeddings"]):
+                rows.append(np.asarray(data["embeddings"], dtype=np.float32))
+        configuration = getattr(self.collection, "configuration_json", None) or {}
+        space = (configuration.get("hnsw") or {}).get("space") or (self.collection.metadata or {}).get("hnsw:space", "l2")
+        matrix = np.ascontiguousarray(np.concatenate(rows) if rows else np.zeros((0, 0), dtype=np.float32))
+        if space == "cosine" and len(matrix):
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        norms = np.einsum("ij,ij->i", matrix, matrix) if len(matrix) else matrix
+        return {"ids": ids, "documents": documents, "metadatas": metadatas, "sources": sources,
+                "space": space, "matrix": matrix, "norms": norms}
+
+    def swap(self, state: Dict[str, Any]):
+        """Install a state from load(). Only attribute stores: nothing to interleave with on the event loop."""
+        self.ids, self.documents, self.metadatas, self.sources = \
+            state["ids"], state["documents"], state["metadatas"], state["sources"]
+        self.space, self.matrix, self.norms = state["space"], state["matrix"], state["norms"]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- EMBEDDING ---
+
+    def cached_embedding(self, text: str) -> Optional[np.ndarray]:
+        key = _normalize(text)
+        with self._lock:
+            vector = self._embeddings.get(key)
+            if vector is not None:
+                self._embeddings.move_to_end(key)
+                self.embedding_hits += 1
+            return vector
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = self.cached_embedding(text)
+        if vector is not None:
+            return vector
+        # Same embedding function (and query mode) Chroma itself would use
+        vector = np.asarray(self.collection._embed(input=[text], is_query=True)[0], dtype=np.float32)
+        with self._lock:
+            self.embedding_misses += 1
+            self._embeddings[_normalize(text)] = vector
+            while len(self._embeddings) > self.embedding_cache_size:
+                self._embeddings.popitem(last=False)
+        return vector
+
+    async def aembed(self, text: str) -> np.ndarray:
+        """Embedding without blocking the event loop (the model runs only on a cache miss)."""
+        vector = self.cached_embedding(text)
+        return vector if vector is not None else await asyncio.to_thread(self.embed, text)
+
+    # --- SEARCH ---
+
+    def search(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> List[List[tuple]]:
+        """Exact top-k (row, distance) per query row, closest first; `mask` limits the rows considered."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(self.matrix):
+            return [[] for _ in queries]
+        dots = queries @ self.matrix.T  # One batched product for every query
+        if self.space == "l2":
+            distances = self.norms[None, :] + np.einsum("ij,ij->i", queries, queries)[:, None] - 2 * dots
+        elif self.space == "cosine":
+            distances = 1 - dots / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        else:  # "ip"
+            distances = 1 - dots
+        allowed = len(self.matrix)
+        if mask is not None:
+            distances[:, ~mask] = np.inf
+            allowed = int(mask.sum())
+        k = min(k, allowed)
+        if not k:
+            return [[] for _ in queries]
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k] if k < len(self.matrix) else \
+            np.tile(np.arange(len(self.matrix)), (len(queries), 1))
+        results = []
+        for row, cols in zip(distances, top):
+            cols = cols[np.argsort(row[cols])]
+            results.append([(int(c), float(row[c])) for c in cols])
+        return results
+
+    def query(self, query_texts: Optional[Sequence[str]] = None, query_embeddings: Optional[Sequence] = None,
+              n_results: int = 10, **kwargs) -> Dict[str, list]:
+        """`collection.query` look-alike (ids, documents, metadatas, distances)."""
+        if query_embeddings is None:
+            query_embeddings = [self.embed(text) for text in query_texts]
+        out: Dict[str, list] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for hits in self.search(np.asarray(query_embeddings), n_results):
+            out["ids"].append([self.ids[i] for i, _ in hits])
+            out["documents"].append([self.documents[i] for i, _ in hits])
+            out["metadatas"].append([self.metadatas[i] for i, _ in hits])
+            out["distances"].append([d for _, d in hits])
+        return out
@@ -17,10 +17,13 @@ class TriageState(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]
     
     # Patient Data
-    patient_profile: PatientProfile
+    patient_profile: PatientProfile # Running summary of everything compacted out of `messages`
+    conversation_context: str # Profile + recent window, token-budgeted (see nodes/compaction.py)
+    compacted_until: Optional[str] # Id of the last message folded into the profile
     
     # Agent Reasoning State
     retrieved_protocols: List[str] # Raw text chunks
+    retrieval_query: Optional[str] # Query that produced them (kept until the topic shifts)
     differential_diagnosis: List[str] # Hypotheses
     safety_checklist: List[str] # The "Plan"
     investigated_symptoms: List[str] # Memory of what has been asked
@@ -0,0 +1 @@
+# Audio Processing Module
@@ -0,0 +1,203 @@
+
+"""
+Streaming speech recognition for the media stream.
+
+A recognizer is opened when the caller starts speaking, fed 20ms mu-law
+frames while they talk, and folds partial / final TranscriptEvents into
+its transcript as they arrive. `finish()` flushes it and returns the full utterance text, so by the
+time our own silence detector fires most of the ASR work is already done.
+"""
+import abc
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+from voice_server.core.config import settings
+
+
+@dataclass
+class TranscriptEvent:
+    text: str
+    is_final: bool = False      # This segment will not be revised
+    speech_final: bool = False  # Recognizer thinks the caller finished the utterance
+
+
+class StreamingRecognizer(abc.ABC):
+    """
+    Base interface for streaming recognizers.
+    Subclasses implement `_run`, which drains `self._outbox` (audio bytes,
+    None = end of utterance) and reports results through `self._emit`.
+    """
+
+    def __init__(self):
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._finals: List[str] = []
+        self.partial = ""
+        self.endpointed = False
+
+    def start(self):
+        """Start the recognizer in the background. Never blocks the caller."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._guarded_run())
+
+    def feed(self, audio: bytes):
+        """Queue a chunk of mu-law audio (non-blocking)."""
+        if self._task is None:
+            self.start()
+        self._outbox.put_nowait(bytes(audio))
+
+    async def finish(self, timeout: float = 3.0) -> str:
+        """Signal end of utterance and wait for the final transcript."""
+        if self._task is None:
+            return ""
+        self._outbox.put_nowait(None)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            print(f"ASR finish timed out after {timeout}s, using partial transcript")
+            self._task.cancel()
+        return self.transcript
+
+    async def close(self):
+        """Abandon the utterance (call ended / barge-in)."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    @property
+    def transcript(self) -> str:
+        parts = self._finals + ([self.partial] if self.partial else [])
+        return " ".join(p for p in parts if p).strip()
+
+    def _emit(self, event: TranscriptEvent):
+        if event.is_final:
+            if event.text:
+                self._finals.append(event.text)
+            self.partial = ""
+        else:
+            self.partial = event.text
+        if event.speech_final:
+            self.endpointed = True
+
+    async def _guarded_run(self):
+        try:
+            await self._run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Streaming ASR Error: {e}")
+
+    @abc.abstractmethod
+    async def _run(self):
+        """Stream `self._outbox` to the recognizer until None, reporting through `self._emit`."""
+
+
+class DeepgramStreamingRecognizer(StreamingRecognizer):
+    """Deepgram live transcription over websocket (interim results + endpointing)."""
+
+    URL = (
+        "wss://api.deepgram.com/v1/listen?model=nova-2&encoding=mulaw&sample_rate=8000"
+        "&channels=1&interim_results=true&endpointing={endpointing}"
+    )
+
+    def __init__(self, api_key: Optional[str] = None, endpointing_ms: Optional[int] = None):
+        super().__init__()
+        self.api_key = api_key or settings.DEEPGRAM_API_KEY
+        self.endpointing_ms = endpointing_ms or settings.ASR_ENDPOINTING_MS
+
+    async def _run(self):
+        from websockets.asyncio.client import connect
+
+        url = self.URL.format(endpointing=self.endpointing_ms)
+        headers = {"Authorization": f"Token {self.api_key}"}
+        async with connect(url, additional_headers=headers) as ws:
+            reader = asyncio.create_task(self._read(ws))
+            try:
+                while True:
+                    chunk = await self._outbox.get()
+                    if chunk is None:
+                        break
+                    await ws.send(chunk)
+                # Flush whatever is buffered server-side, then let Deepgram close the socket
+                await ws.send(json.dumps({"type": "Finalize"}))
+                await ws.send(json.dumps({"type": "CloseStream"}))
+                await reader
+            finally:
+                reader.cancel()
+
+    async def _read(self, ws):
+        async for message in ws:
+            data = json.loads(message)
+            if data.get("type") != "Results":
+                continue
+            alternatives = data.get("channel", {}).get("alternatives") or [{}]
+            self._emit(TranscriptEvent(
+                text=alternatives[0].get("transcript", ""),
+                is_final=bool(data.get("is_final")),
+                speech_final=bool(data.get("speech_final")),
+            ))
+
+
+class LocalRecognizer(StreamingRecognizer):
+    """
+    Offline stand-in recognizer.
+    Reveals one more word of a scripted transcript for every `bytes_per_word`
+    of audio received, and returns the whole text as final on `finish()`.
+    """
+
+    def __init__(self, text: str, bytes_per_word: int = 1600, latency: float = 0.0):
+        super().__init__()
+        self.words = text.split()
+        self.bytes_per_word = bytes_per_word
+        self.latency = latency
+
+    async def _run(self):
+        received = 0
+        shown = 0
+        while True:
+            chunk = await self._outbox.get()
+            if chunk is None:
+                break
+            received += len(chunk)
+            target = min(len(self.words), received // self.bytes_per_word)
+            if target > shown:
+                shown = target
+                self._emit(TranscriptEvent(text=" ".join(self.words[:shown])))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._emit(TranscriptEvent(text=" ".join(self.words), is_final=True, speech_final=True))
+
+
+class ScriptedRecognizerFactory:
+    """Hands out LocalRecognizers that answer with the next line of a script, one per utterance."""
+
+    def __init__(self, transcripts: Sequence[str], **kwargs):
+        self.transcripts = list(transcripts)
+        self.kwargs = kwargs
+        self.turn = 0
+
+    def __call__(self) -> StreamingRecognizer:
+        text = self.transcripts[self.turn] if self.turn < len(self.transcripts) else ""
+        self.turn += 1
+        return LocalRecognizer(text, **self.kwargs)
+
+
+# --- FACTORY ---
+recognizer_factory: Callable[[], StreamingRecognizer] = DeepgramStreamingRecognizer
+
+
+def set_recognizer_factory(factory: Callable[[], StreamingRecognizer]):
+    """Swap the recognizer used by the media stream (e.g. a ScriptedRecognizerFactory offline)."""
+    global recognizer_factory
+    recognizer_factory = factory
+
+
+def create_recognizer() -> StreamingRecognizer:
+    recognizer = recognizer_factory()
+    recognizer.start()
+    return recognizer
@@ -0,0 +1,152 @@
+
+"""
+G.711 mu-law helpers for the Twilio media stream.
+
+Twilio sends 8 kHz mu-law, one byte per sample, so every possible input
+value can be decoded ahead of time. All functions here accept bytes,
+bytearray or memoryview and work on whole buffers instead of per-sample
+struct calls.
+"""
+import bisect
+import math
+from array import array
+from typing import Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy ships with chromadb, but keep a pure-stdlib path
+    np = None
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+SAMPLE_RATE = 8000
+FRAME_BYTES = 160  # 20ms of 8kHz mu-law
+
+
+def _decode_byte(b: int) -> int:
+    # Same expansion the voice loop has always used, so RMS thresholds keep their meaning
+    b = ~b & 0xFF
+    sign = b & 0x80
+    exponent = (b >> 4) & 0x07
+    mantissa = b & 0x0F
+    sample = ((2 * mantissa + 33) << (exponent + 2)) - 33
+    if sign == 0:
+        sample = -sample
+    return max(-32768, min(32767, sample))
+
+
+# --- LOOKUP TABLES (built once at import) ---
+MULAW_DECODE_TABLE = array("h", (_decode_byte(i) for i in range(256)))
+MULAW_ENERGY_TABLE = array("d", (float(s * s) for s in MULAW_DECODE_TABLE))
+
+# bytes.translate tables for the stdlib path: low and high byte of each sample
+_LOW_BYTES = bytes(s & 0xFF for s in MULAW_DECODE_TABLE)
+_HIGH_BYTES = bytes((s >> 8) & 0xFF for s in MULAW_DECODE_TABLE)
+
+if np is not None:
+    _DECODE_NP = np.frombuffer(MULAW_DECODE_TABLE.tobytes(), dtype="<i2").copy()
+    _ENERGY_NP = np.frombuffer(MULAW_ENERGY_TABLE.tobytes(), dtype=np.float64).copy()
+
+
+def decode_mulaw(data: Buffer, out=None):
+    """
+    Decode mu-law to int16 samples.
+    Returns a numpy array (written into `out` if given) or an array('h') without numpy.
+    """
+    if np is not None:
+        codes = np.frombuffer(data, dtype=np.uint8)
+        if out is None:
+            return _DECODE_NP[codes]
+        if len(out) != len(codes):
+            out = out[:len(codes)]
+        return _DECODE_NP.take(codes, out=out)
+
+    pcm = array("h")
+    pcm.frombytes(mulaw_to_pcm16(data))
+    return pcm
+
+
+def mulaw_to_pcm16(data: Buffer) -> bytes:
+    """Decode mu-law to little-endian PCM16 bytes (the format webrtcvad expects)."""
+    if np is not None:
+        return _DECODE_NP[np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+    raw = bytes(data)
+    res = bytearray(2 * len(raw))
+    res[0::2] = raw.translate(_LOW_BYTES)
+    res[1::2] = raw.translate(_HIGH_BYTES)
+    return bytes(res)
+
+
+def mulaw_energy(data: Buffer) -> float:
+    """Mean square amplitude of mu-law audio, computed straight from the codes."""
+    if not data:
+        return 0.0
+    if np is not None:
+        codes = np.frombuffer(data, dtype=np.uint8)
+        return float(_ENERGY_NP[codes].sum()) / len(codes)
+    return math.fsum(map(MULAW_ENERGY_TABLE.__getitem__, bytes(data))) / len(data)
+
+
+def mulaw_rms(data: Buffer) -> float:
+    """Root Mean Square amplitude of mu-law audio (same scale as pcm16_rms on the decoded frame)."""
+    return math.sqrt(mulaw_energy(data))
+
+
+def pcm16_rms(pcm_data: Buffer) -> float:
+    """Calculate Root Mean Square amplitude of PCM16 data"""
+    if len(pcm_data) < 2:
+        return 0.0
+    if np is not None:
+        samples = np.frombuffer(pcm_data, dtype="<i2", count=len(pcm_data) // 2).astype(np.float64)
+        return math.sqrt(float(np.dot(samples, samples)) / len(samples))
+
+    samples = array("h")
+    samples.frombytes(bytes(pcm_data[:len(pcm_data) & ~1]))
+    return math.sqrt(math.fsum(s * s for s in samples) / len(samples))
+
+
+def frame_rms(data: Buffer, frame_bytes: int = FRAME_BYTES) -> list:
+    """
+    RMS of every whole frame in a mu-law buffer in one pass.
+    Trailing bytes that don't fill a frame are ignored.
+    """
+    n_frames = len(data) // frame_bytes
+    if n_frames == 0:
+        return []
+    if np is not None:
+        codes = np.frombuffer(data, dtype=np.uint8, count=n_frames * frame_bytes)
+        energy = _ENERGY_NP[codes].reshape(n_frames, frame_bytes).mean(axis=1)
+        return np.sqrt(energy).tolist()
+
+    view = memoryview(data)
+    return [mulaw_rms(view[i:i + frame_bytes]) for i in range(0, n_frames * frame_bytes, frame_bytes)]
+
+
+# Encoding picks the code whose decoded value is nearest, so encode -> decode round-trips exactly
+_ENCODE_ORDER = sorted(range(256), key=MULAW_DECODE_TABLE.__getitem__)
+_ENCODE_VALUES = [MULAW_DECODE_TABLE[c] for c in _ENCODE_ORDER]
+
+
+def encode_mulaw(pcm_data: Buffer) -> bytes:
+    """Encode little-endian PCM16 to mu-law (used to build synthetic call audio)."""
+    if np is not None:
+        samples = np.frombuffer(pcm_data, dtype="<i2", count=len(pcm_data) // 2)
+        values = np.asarray(_ENCODE_VALUES)
+        idx = np.clip(np.searchsorted(values, samples), 1, 255)
+        nearer_low = (samples - values[idx - 1]) <= (values[idx] - samples)
+        return np.asarray(_ENCODE_ORDER, dtype=np.uint8)[idx - nearer_low].tobytes()
+
+    samples = array("h")
+    samples.frombytes(bytes(pcm_data[:len(pcm_data) & ~1]))
+    out = bytearray(len(samples))
+    for i, s in enumerate(samples):
+        j = min(max(bisect.bisect_left(_ENCODE_VALUES, s), 1), 255)
+        if s - _ENCODE_VALUES[j - 1] <= _ENCODE_VALUES[j] - s:
+            j -= 1
+        out[i] = _ENCODE_ORDER[j]
+    return bytes(out)
+
+
+def has_numpy() -> bool:
+    return np is not None
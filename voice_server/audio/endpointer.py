@@ -0,0 +1,145 @@
+
+"""
+Per-call adaptive endpointing for the media-stream VAD loop.
+
+The endpointer sees one 20ms frame at a time: the webrtcvad decision and
+the frame RMS. It tracks the line's noise floor from non-speech frames,
+derives the RMS gate from it, and shortens the trailing-silence window when
+the utterance was clearly above the noise (high confidence the caller is done).
+"""
+from typing import Optional
+
+from voice_server.core.config import settings
+
+START = "start"
+END = "end"
+TIMEOUT = "timeout"
+
+
+class EndpointerConfig:
+    def __init__(self, min_gate: float = 150.0, max_gate: float = 2000.0, snr_ratio: float = 2.0,
+                 start_frames: int = 5, strict_start_frames: int = 10,
+                 end_frames: int = 20, min_end_frames: int = 10, max_speech_frames: int = 750,
+                 initial_noise: float = 100.0, adaptive: bool = True):
+        self.min_gate = min_gate                        # RMS gate never drops below this
+        self.max_gate = max_gate                        # ...or rises above this on very noisy lines
+        self.snr_ratio = snr_ratio                      # Gate = noise floor * ratio (2x ~ +6dB)
+        self.start_frames = start_frames                # Speech frames needed to open a turn
+        self.strict_start_frames = strict_start_frames  # ...while the agent is talking (barge-in)
+        self.end_frames = end_frames                    # Trailing silence for a low-confidence end (400ms)
+        self.min_end_frames = min_end_frames            # ...and for a high-confidence end (200ms)
+        self.max_speech_frames = max_speech_frames      # Forced cut (~15s)
+        self.initial_noise = initial_noise
+        self.adaptive = adaptive                        # False = fixed gate / fixed window (legacy loop)
+
+    @classmethod
+    def from_settings(cls) -> "EndpointerConfig":
+        return cls(
+            min_gate=settings.VAD_MIN_GATE,
+            snr_ratio=settings.VAD_SNR_RATIO,
+            start_frames=settings.VAD_START_FRAMES,
+            strict_start_frames=settings.BARGE_IN_MIN_FRAMES,
+            end_frames=settings.VAD_END_FRAMES,
+            min_end_frames=settings.VAD_MIN_END_FRAMES,
+            max_speech_frames=settings.VAD_MAX_SPEECH_FRAMES,
+            adaptive=settings.VAD_ADAPTIVE,
+        )
+
+    @classmethod
+    def legacy(cls) -> "EndpointerConfig":
+        """The constants the VAD loop used before endpointing was adaptive."""
+        return cls(min_gate=300.0, start_frames=5, end_frames=20, min_end_frames=20, adaptive=False)
+
+
+class AdaptiveEndpointer:
+    NOISE_DOWN = 0.2   # Floor follows quieter frames quickly...
+    NOISE_UP = 0.02    # ...and louder ones slowly, so speech tails don't drag it up
+
+    def __init__(self, config: Optional[EndpointerConfig] = None):
+        self.config = config or EndpointerConfig.from_settings()
+        self.noise_floor = self.config.initial_noise
+        self.reset()
+
+    def reset(self):
+        """Forget the current utterance (the noise floor is kept for the whole call)."""
+        self.is_speaking = False
+        self.speech_frames = 0
+        self.silence_frames = 0
+        self.total_speaking_frames = 0
+        self._speech_energy = 0.0
+        self._voiced = 0
+
+    @property
+    def gate(self) -> float:
+        if not self.config.adaptive:
+            return self.config.min_gate
+        return min(self.config.max_gate, max(self.config.min_gate, self.noise_floor * self.config.snr_ratio))
+
+    @property
+    def confidence(self) -> float:
+        """0..1: how clearly the current utterance stood out from the noise."""
+        if not self._voiced:
+            return 0.0
+        snr = (self._speech_energy / self._voiced) / max(self.noise_floor, 1.0)
+        loudness = min(1.0, max(0.0, (snr - self.config.snr_ratio) / (4 * self.config.snr_ratio)))
+        duration = min(1.0, self._voiced / 25)  # Half a second of voiced audio
+        return loudness * duration
+
+    @property
+    def end_frames(self) -> int:
+        cfg = self.config
+        if not cfg.adaptive:
+            return cfg.end_frames
+        return round(cfg.end_frames - (cfg.end_frames - cfg.min_end_frames) * self.confidence)
+
+    def process(self, is_speech_vad: bool, rms: float, strict: bool = False) -> Optional[str]:
+        """
+        Feed one frame. Returns START when a turn opens, END / TIMEOUT when it
+        closes, None otherwise. `strict` = agent is speaking (barge-in detection).
+        """
+        cfg = self.config
+        # Only count as speech if VAD says Yes AND Energy is above the gate
+        is_speech = is_speech_vad and rms > self.gate
+
+        if is_speech:
+            self.speech_frames += 1
+            self.silence_frames = 0
+            if self.is_speaking:
+                self._speech_energy += rms
+                self._voiced += 1
+        else:
+            self.silence_frames += 1
+            if not self.is_speaking:
+                self._track_noise(rms)
+                # Leaky start counter: scattered blips don't add up to a turn (none at all when strict)
+                self.speech_frames = 0 if strict else max(0, self.speech_frames - 1)
+
+        if not self.is_speaking:
+            start_frames = cfg.strict_start_frames if strict else cfg.start_frames
+            if self.speech_frames > start_frames:
+                self.is_speaking = True
+                self.silence_frames = 0
+                self.total_speaking_frames = 0
+                self._speech_energy, self._voiced = rms, 1
+                return START
+            return None
+
+        self.total_speaking_frames += 1
+        if self.total_speaking_frames > cfg.max_speech_frames:
+            self.reset()
+            return TIMEOUT
+        if self.silence_frames > self.end_frames:
+            self.reset()
+            return END
+        return None
+
+    def force_end(self) -> Optional[str]:
+        """End the utterance now (e.g. the streaming recognizer already endpointed)."""
+        if not self.is_speaking:
+            return None
+        self.reset()
+        return END
+
+    def _track_noise(self, rms: float):
+        alpha = self.NOISE_DOWN if rms < self.noise_floor else self.NOISE_UP
+        self.noise_floor += alpha * (rms - self.noise_floor)
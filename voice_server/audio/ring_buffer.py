@@ -0,0 +1,93 @@
+
+"""
+Fixed-capacity ring buffer for a call's inbound mu-law audio.
+
+The backing store is allocated once per call and holds every byte twice
+(at p % capacity and p % capacity + capacity). Because of that mirror, any
+window of up to `capacity` bytes is one contiguous slice, so VAD frames and
+the whole utterance can be handed out as memoryviews with no copying and
+no per-frame allocations.
+
+Positions are absolute byte offsets in the call's stream. A view stays
+valid until `capacity` more bytes have been written.
+"""
+from typing import Optional
+
+from voice_server.audio.codec import FRAME_BYTES, Buffer
+
+
+class AudioRingBuffer:
+    def __init__(self, capacity: int, max_backlog: Optional[int] = None):
+        self.capacity = capacity
+        self.max_backlog = max_backlog or capacity  # Unread bytes kept before the oldest are skipped
+        self._buf = bytearray(2 * capacity)
+        self._view = memoryview(self._buf)
+        self.write_pos = 0  # Absolute offset of the next byte written
+        self.read_pos = 0   # Absolute offset of the next byte the VAD reads
+        self.dropped = 0    # Bytes skipped because the reader fell behind
+
+    @property
+    def readable(self) -> int:
+        return self.write_pos - self.read_pos
+
+    @property
+    def oldest(self) -> int:
+        """Absolute offset of the oldest byte still held."""
+        return max(0, self.write_pos - self.capacity)
+
+    def write(self, data: Buffer):
+        n = len(data)
+        cap = self.capacity
+        i = self.write_pos % cap
+        if i + n <= cap:
+            # Common case (one media packet, no wrap): two memcpys, no temporaries
+            view = self._view
+            view[i:i + n] = data
+            view[i + cap:i + cap + n] = data
+        else:
+            data = memoryview(data)
+            if n > cap:
+                self.dropped += n - cap
+                self.write_pos += n - cap
+                data, n = data[-cap:], cap
+                i = self.write_pos % cap
+            first = min(n, cap - i)
+            self._copy(i, data[:first])
+            self._copy(0, data[first:])
+        self.write_pos += n
+
+        # Real-time audio: a lagging reader loses the oldest audio, the writer never waits
+        overflow = self.write_pos - self.read_pos - self.max_backlog
+        if overflow > 0:
+            self.read_pos += overflow
+            self.dropped += overflow
+
+    def read_frame(self, size: int = FRAME_BYTES) -> Optional[memoryview]:
+        """Next `size` unread bytes as a view, or None until a whole frame is buffered."""
+        pos = self.read_pos
+        if self.write_pos - pos < size:
+            return None
+        self.read_pos = pos + size
+        i = pos % self.capacity
+        return self._view[i:i + size]
+
+    def clamp(self, start: int, end: int) -> tuple:
+        """[start, end) narrowed to the bytes still (and already) held."""
+        end = min(end, self.write_pos)
+        return min(max(start, self.oldest), end), end
+
+    def view(self, start: int, end: int) -> memoryview:
+        """Contiguous view of stream bytes [start, end)."""
+        if end - start > self.capacity or start < self.write_pos - self.capacity or end > self.write_pos:
+            raise ValueError(f"Audio [{start}, {end}) is no longer (or not yet) in the buffer")
+        i = start % self.capacity
+        return self._view[i:i + end - start]
+
+    def skip_unread(self):
+        """Drop everything not read yet (e.g. audio captured while the agent was talking)."""
+        self.read_pos = self.write_pos
+
+    def _copy(self, i: int, chunk: memoryview):
+        n = len(chunk)
+        self._view[i:i + n] = chunk
+        self._view[i + self.capacity:i + self.capacity + n] = chunk
@@ -0,0 +1,81 @@
+
+"""
+Cuts streamed LLM tokens into speakable chunks for TTS.
+
+A chunk is released as soon as a sentence (or line) is complete, so the
+first sentence can be synthesized while the rest is still being generated.
+Markdown emphasis and list markers are stripped because TTS would read them.
+"""
+import re
+from typing import List
+
+# Sentence end: . ! ? (optionally followed by quotes/brackets) and whitespace
+_SENTENCE_END = re.compile(r"""[.!?]["')\]]*\s+""")
+_ABBREVIATIONS = ("dr.", "mr.", "mrs.", "ms.", "e.g.", "i.e.", "etc.", "vs.", "approx.", "no.")
+_MARKDOWN = re.compile(r"[*_#`]+")
+_LIST_MARKER = re.compile(r"^\s*(?:[-•]|\d+[.)])\s+")
+
+
+def clean_for_speech(text: str) -> str:
+    text = _LIST_MARKER.sub("", text)
+    text = _MARKDOWN.sub("", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class SentenceSegmenter:
+    def __init__(self, min_chars: int = 20, max_chars: int = 250):
+        self.min_chars = min_chars  # Shorter sentences are merged with the next one
+        self.max_chars = max_chars  # Longer runs are cut at a comma/semicolon
+        self._buffer = ""
+        self._carry = ""
+
+    def push(self, token: str) -> List[str]:
+        self._buffer += token
+        chunks = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            piece, self._buffer = self._buffer[:cut], self._buffer[cut:]
+            chunks.extend(self._emit(piece))
+        return chunks
+
+    def flush(self) -> List[str]:
+        piece, self._buffer = self._buffer, ""
+        chunks = self._emit(piece, final=True)
+        if self._carry:
+            chunks.append(self._carry)
+            self._carry = ""
+        return chunks
+
+    def _find_cut(self):
+        newline = self._buffer.find("\n")
+        for match in _SENTENCE_END.finditer(self._buffer):
+            if newline != -1 and newline < match.start():
+                break
+            words = self._buffer[:match.start() + 1].split()
+            if words and words[-1].lower() in _ABBREVIATIONS:
+                continue
+            if re.fullmatch(r"\d+\.", words[-1] if words else ""):
+                continue  # "1." list numbering, not a sentence end
+            return match.end()
+        if newline != -1:
+            return newline + 1
+        if len(self._buffer) > self.max_chars:
+            soft = max(self._buffer.rfind(", ", 0, self.max_chars), self._buffer.rfind("; ", 0, self.max_chars))
+            return soft + 2 if soft > 0 else self.max_chars
+        return None
+
+    def _emit(self, piece: str, final: bool = False) -> List[str]:
+        text = clean_for_speech(piece)
+        if not text:
+            return []
+        if self._carry:
+            # Keep a pause between a carried line (e.g. a short list item) and what follows
+            joiner = " " if self._carry[-1] in ".!?:;," else ". "
+            text = f"{self._carry}{joiner}{text}"
+        if len(text) < self.min_chars and not final:
+            self._carry = text
+            return []
+        self._carry = ""
+        return [text]
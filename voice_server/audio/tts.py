@@ -0,0 +1,212 @@
+
+"""
+Text-to-speech playback for the media stream.
+
+Audio from Deepgram /v1/speak is forwarded to Twilio as soon as the first
+bytes arrive, and a RealtimePacer releases it on the 8kHz mu-law clock
+(with a small lead so Twilio's jitter buffer never runs dry).
+"""
+import asyncio
+import base64
+import json
+import statistics
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from voice_server.core.config import settings
+from voice_server.core.http_clients import provider_clients
+from voice_server.audio.codec import SAMPLE_RATE
+from voice_server.audio.tts_cache import tts_cache
+
+TTS_PATH = "/v1/speak?model={model}&encoding=mulaw&sample_rate=8000"
+
+
+class TTSError(Exception):
+    pass
+
+
+async def stream_synthesis(text: str, model: Optional[str] = None) -> AsyncIterator[bytes]:
+    """Yield mu-law audio chunks as Deepgram produces them."""
+    url = TTS_PATH.format(model=model or settings.TTS_MODEL)
+    headers = {"Authorization": f"Token {settings.DEEPGRAM_API_KEY}", "Content-Type": "application/json"}
+    async with provider_clients.stream("deepgram", "POST", url, headers=headers, json={"text": text}) as resp:
+        if resp.status_code != 200:
+            body = await resp.aread()
+            raise TTSError(f"Deepgram Error: {resp.status_code} - {body.decode(errors='replace')}")
+        async for chunk in resp.aiter_bytes():
+            if chunk:
+                yield chunk
+
+
+async def synthesize(text: str, model: Optional[str] = None) -> bytes:
+    """Fetch the complete utterance in one response."""
+    url = TTS_PATH.format(model=model or settings.TTS_MODEL)
+    headers = {"Authorization": f"Token {settings.DEEPGRAM_API_KEY}", "Content-Type": "application/json"}
+    resp = await provider_clients.request("deepgram", "POST", url, headers=headers, json={"text": text})
+    if resp.status_code != 200:
+        raise TTSError(f"Deepgram Error: {resp.status_code} - {resp.text}")
+    return resp.content
+
+
+# --- PACING ---
+
+class PlaybackStats:
+    def __init__(self):
+        # time.monotonic() timestamps, comparable with the call trace
+        self.started = 0.0
+        self.first_byte: Optional[float] = None   # first audio from the provider (or the cache)
+        self.first_audio: Optional[float] = None  # first frame sent to Twilio
+        self.audio_seconds = 0.0
+        self.frames = 0
+        self.jitter: List[float] = []  # |actual - scheduled| send time per frame, seconds
+        self.underruns = 0             # frames sent after Twilio's buffer would have drained
+        self.cache_hit = False
+
+    @property
+    def ttfa_ms(self) -> Optional[float]:
+        if self.first_audio is None:
+            return None
+        return (self.first_audio - self.started) * 1000
+
+    @property
+    def jitter_p95_ms(self) -> float:
+        if not self.jitter:
+            return 0.0
+        ordered = sorted(self.jitter)
+        return ordered[int(0.95 * (len(ordered) - 1))] * 1000
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "ttfa_ms": self.ttfa_ms,
+            "audio_seconds": round(self.audio_seconds, 3),
+            "frames": self.frames,
+            "jitter_mean_ms": statistics.fmean(self.jitter) * 1000 if self.jitter else 0.0,
+            "jitter_p95_ms": self.jitter_p95_ms,
+            "underruns": self.underruns,
+            "cache_hit": self.cache_hit,
+        }
+
+
+class RealtimePacer:
+    """
+    Sends mu-law audio to Twilio at playback speed.
+    Frame n is due at t0 + n * frame_duration - lead, so Twilio always holds
+    about `lead_ms` of audio but never a whole utterance.
+    """
+
+    def __init__(self, send_text: Callable[[str], Awaitable[None]], stream_sid: str,
+                 frame_ms: int = 20, lead_ms: int = 200, stats: Optional[PlaybackStats] = None):
+        self.send_text = send_text
+        self.stream_sid = stream_sid
+        self.frame_bytes = SAMPLE_RATE * frame_ms // 1000
+        self.lead = lead_ms / 1000
+        self.stats = stats or PlaybackStats()
+        self._pending = bytearray()
+        self._loop = asyncio.get_running_loop()
+        self._t0: Optional[float] = None
+        self._queued = 0.0  # seconds of audio already handed to Twilio
+        if not self.stats.started:
+            self.stats.started = time.monotonic()
+
+    async def push(self, audio: bytes):
+        self._pending.extend(audio)
+        while len(self._pending) >= self.frame_bytes:
+            frame = bytes(self._pending[:self.frame_bytes])
+            del self._pending[:self.frame_bytes]
+            await self._send_frame(frame)
+
+    async def flush(self):
+        if self._pending:
+            frame = bytes(self._pending)
+            self._pending.clear()
+            await self._send_frame(frame)
+
+    async def _send_frame(self, frame: bytes):
+        now = self._loop.time()
+        if self._t0 is None:
+            self._t0 = now
+            self.stats.first_audio = time.monotonic()
+
+        due = self._t0 + self._queued - self.lead
+        if due > now:
+            await asyncio.sleep(due - now)
+            now = self._loop.time()
+        if due > self._t0:
+            # Frames inside the initial lead go out immediately and aren't scheduled
+            self.stats.jitter.append(abs(now - due))
+            if now - due > self.lead:
+                self.stats.underruns += 1
+
+        await self.send_text(json.dumps({
+            "event": "media", "streamSid": self.stream_sid,
+            "media": {"payload": base64.b64encode(frame).decode("utf-8")}
+        }))
+        self._queued += len(frame) / SAMPLE_RATE
+        self.stats.frames += 1
+        self.stats.audio_seconds = self._queued
+
+
+class TTSMetrics:
+    """Rolling window of recent playbacks for the metrics endpoint."""
+
+    def __init__(self, window: int = 200):
+        self.recent: deque = deque(maxlen=window)
+        self.total_utterances = 0
+
+    def record(self, stats: PlaybackStats):
+        self.recent.append(stats)
+        self.total_utterances += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        ttfa = sorted(s.ttfa_ms for s in self.recent if s.ttfa_ms is not None)
+        jitter = sorted(j for s in self.recent for j in s.jitter)
+
+        def pct(values, q):
+            return values[int(q * (len(values) - 1))] if values else None
+
+        return {
+            "utterances": self.total_utterances,
+            "ttfa_p50_ms": pct(ttfa, 0.5),
+            "ttfa_p95_ms": pct(ttfa, 0.95),
+            "jitter_p50_ms": pct(jitter, 0.5) * 1000 if jitter else None,
+            "jitter_p95_ms": pct(jitter, 0.95) * 1000 if jitter else None,
+            "underruns": sum(s.underruns for s in self.recent),
+            "cache": tts_cache.snapshot(),
+        }
+
+
+tts_metrics = TTSMetrics()
+
+
+async def speak(send_text: Callable[[str], Awaitable[None]], stream_sid: str, text: str,
+                streaming: Optional[bool] = None) -> PlaybackStats:
+    """Play `text` through the pacer, from the prompt cache when possible. Returns the playback stats."""
+    if streaming is None:
+        streaming = settings.TTS_STREAMING
+    model = settings.TTS_MODEL
+    pacer = RealtimePacer(send_text, stream_sid, lead_ms=settings.TTS_LEAD_MS)
+
+    cached = tts_cache.get(text, model)
+    if cached is not None:
+        pacer.stats.cache_hit = True
+        pacer.stats.first_byte = time.monotonic()
+        await pacer.push(cached)
+    elif streaming:
+        keep = bytearray() if tts_cache.cacheable(text) else None
+        async for chunk in stream_synthesis(text, model):
+            if pacer.stats.first_byte is None:
+                pacer.stats.first_byte = time.monotonic()
+            await pacer.push(chunk)
+            if keep is not None:
+                keep.extend(chunk)
+        if keep is not None:
+            tts_cache.put(text, model, bytes(keep))
+    else:
+        audio = await synthesize(text, model)
+        pacer.stats.first_byte = time.monotonic()
+        tts_cache.put(text, model, audio)
+        await pacer.push(audio)
+    await pacer.flush()
+    tts_metrics.record(pacer.stats)
+    return pacer.stats
@@ -0,0 +1,170 @@
+
+"""
+Content-addressed cache of synthesized prompts.
+
+Keyed by (text, voice model, encoding, sample rate). Hits are served from an
+in-memory LRU first, then from disk, so fixed prompts (greeting, booking
+questions, goodbyes) play with no provider round trip.
+
+Only the prompts of the manifest are stored: LLM output (which can repeat
+what the patient said) is never cached, in memory or on disk. The disk tier
+is bounded by TTS_CACHE_DISK_MAX_MB (oldest files removed first), and a
+failed disk read or write only costs a synthesis, never the utterance.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from voice_server.core.config import settings
+
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__), "prompt_manifest.json")
+
+
+class TTSAudioCache:
+    def __init__(self, directory: Optional[str], max_memory_bytes: int, prompts: Iterable[str],
+                 max_disk_bytes: int = 0):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes  # 0 = unbounded
+        self.prompts = {text.strip() for text in prompts}
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "disk_errors": 0}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(text: str, model: str, encoding: str = "mulaw", sample_rate: int = 8000) -> str:
+        raw = f"{model}|{encoding}|{sample_rate}|{text.strip()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def cacheable(self, text: str) -> bool:
+        return text.strip() in self.prompts
+
+    def get(self, text: str, model: str) -> Optional[bytes]:
+        if not self.cacheable(text):
+            return None
+        key = self.key(text, model)
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return audio
+
+        path = self._path(key)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    audio = f.read()
+                os.utime(path)  # Recently used: trimmed last
+            except OSError as e:
+                self._disk_error("read", e)
+                audio = None
+            if audio:
+                self._remember(key, audio)
+                self.stats["disk_hits"] += 1
+                return audio
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, text: str, model: str, audio: bytes):
+        if not audio or not self.cacheable(text):
+            return
+        key = self.key(text, model)
+        self._remember(key, audio)
+        path = self._path(key)
+        if path and not os.path.exists(path):
+            self._write(path, audio)
+        self.stats["stores"] += 1
+
+    async def warm(self, prompts: List[str], model: str, synthesize: Callable[[str], Awaitable[bytes]]):
+        """Load every prompt into memory, synthesizing the ones not on disk yet."""
+        synthesized = 0
+        for text in prompts:
+            if self.get(text, model) is not None:
+                continue
+            try:
+                self.put(text, model, await synthesize(text))
+                synthesized += 1
+            except Exception as e:
+                print(f"TTS cache warm failed for '{text[:30]}...': {e}")
+        print(f"🔊 TTS cache warmed: {len(prompts)} prompts ({synthesized} synthesized)")
+
+    def snapshot(self) -> Dict[str, float]:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+        }
+
+    def _remember(self, key: str, audio: bytes):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _write(self, path: str, audio: bytes):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")  # Unique per writer
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp, path)  # Atomic: concurrent workers never read a half file
+        except OSError as e:
+            self._disk_error("write", e)
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            return
+        self._trim_disk()
+
+    def _trim_disk(self):
+        """Remove the least recently used files until the directory fits in max_disk_bytes."""
+        if not self.max_disk_bytes:
+            return
+        try:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".ulaw"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_disk_bytes:
+                    break
+                os.remove(path)
+                total -= size
+        except OSError as e:  # Another worker may be trimming too
+            self._disk_error("trim", e)
+
+    def _disk_error(self, action: str, error: OSError):
+        self.stats["disk_errors"] += 1
+        print(f"⚠️ TTS cache disk {action} failed: {error}")
+
+    def _path(self, key: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"{key}.ulaw")
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["prompts"]
+
+
+tts_cache = TTSAudioCache(
+    directory=settings.TTS_CACHE_DIR or None,
+    max_memory_bytes=settings.TTS_CACHE_MAX_MB * 1024 * 1024,
+    prompts=load_manifest(),
+    max_disk_bytes=settings.TTS_CACHE_DISK_MAX_MB * 1024 * 1024,
+)
@@ -1,9 +1,10 @@
 
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 
 from voice_server.booking_agent.state import BookingState
 from voice_server.booking_agent.nodes.scheduler import scheduler_node
+from voice_server.core.checkpointer import make_checkpointer
+from voice_server.core.tracing import traced_node
 
 def build_booking_graph():
     """
@@ -12,7 +13,7 @@ def build_booking_graph():
     workflow = StateGraph(BookingState)
     
     # Add scheduler node
-    workflow.add_node("scheduler", scheduler_node)
+    workflow.add_node("scheduler", traced_node("scheduler", scheduler_node))
     
     # Set entry point
     workflow.set_entry_point("scheduler")
@@ -20,9 +21,8 @@ def build_booking_graph():
     # Direct edge to END to wait for user input
     workflow.add_edge("scheduler", END)
     
-    # Compile with memory
-    memory = MemorySaver()
-    return workflow.compile(checkpointer=memory)
+    # Compile with memory (MemorySaver or SQLite, per settings.CHECKPOINT_BACKEND)
+    return workflow.compile(checkpointer=make_checkpointer())
 
 # Export the compiled graph
 booking_graph = build_booking_graph()
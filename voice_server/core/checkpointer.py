@@ -0,0 +1,581 @@
+
+"""
+Durable LangGraph checkpointer on a local SQLite file.
+
+Both graphs compile with `make_checkpointer()`, so the backend is chosen by
+settings.CHECKPOINT_BACKEND: "memory" (MemorySaver, lost on restart) or
+"sqlite" (this module). One saver per database file is shared by the
+triage and booking graphs.
+
+The database runs in WAL mode. All writes go through one writer thread
+that commits everything queued behind the current write as a single
+transaction (group commit), so concurrent calls share one fsync instead of
+paying one each. CHECKPOINT_BATCH_MS > 0 also waits that long for more
+writes, trading single-call latency for fewer commits under FULL. put()/aput() return once their batch is committed, which
+keeps read-your-writes for the next turn. Reads use a small pool of
+read-only connections, which WAL lets run alongside the writer.
+
+Retention: every saver records when each thread was last written (wall
+clock). The SQLite saver keeps it in a `threads` table, updated in the same
+transaction as the checkpoint, so every worker sharing the file sees the
+same activity. `retention` compacts a call's threads to their latest
+checkpoint when the call ends, and evicts whole threads once they are idle
+for CHECKPOINT_TTL_SECONDS or when more than CHECKPOINT_MAX_THREADS are kept
+(least recently written first). The SQLite eviction runs as one
+transaction on the writer thread, against the shared table.
+
+CHECKPOINT_SYNCHRONOUS is the fsync policy (SQLite's PRAGMA synchronous):
+FULL syncs the WAL on every commit, NORMAL only at WAL checkpoints (a power
+loss can drop the last few commits but never corrupts the file), OFF never.
+"""
+import asyncio
+import atexit
+import queue
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+from voice_server.core.config import settings
+from voice_server.core.tracing import metrics
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL")
+PRUNE_STRATEGIES = ("keep_latest", "delete")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_put REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_last_put ON threads (last_put);
+"""
+
+_TOUCH = ("INSERT INTO threads VALUES (?, ?) "
+          "ON CONFLICT(thread_id) DO UPDATE SET last_put = MAX(last_put, excluded.last_put)")
+# Threads idle since before ? or beyond the ? most recently written
+_EXPIRED = ("SELECT thread_id FROM threads WHERE last_put < ? UNION "
+            "SELECT thread_id FROM (SELECT thread_id FROM threads ORDER BY last_put DESC LIMIT -1 OFFSET ?)")
+
+# A queued write: statements to run in the batch transaction, resolved (with the last one's rowcount) once committed
+_Op = Tuple[List[Tuple[str, Sequence[Any]]], Future]
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    def __init__(self, path: str, synchronous: str = "NORMAL", batch_ms: float = 0.0,
+                 pool_size: int = 4, serde=None):
+        super().__init__(serde=serde)
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"CHECKPOINT_SYNCHRONOUS must be one of {SYNCHRONOUS_MODES}, got {synchronous!r}")
+        self.path = path
+        self.synchronous = synchronous
+        self.batch_seconds = batch_ms / 1000
+        self.commits = 0   # Transactions committed (each one fsync under FULL)
+        self.writes = 0    # put/put_writes calls they contained
+
+        setup = self._connect()
+        setup.execute("PRAGMA journal_mode=WAL")
+        setup.executescript(_SCHEMA)
+        self._backfill_threads(setup)
+        setup.close()
+
+        self._ops: "queue.Queue[Optional[_Op]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+        self._writer.start()
+
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            self._readers.put(self._connect())
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="checkpoint-read")
+        self._closed = False
+
+    def _backfill_threads(self, conn: sqlite3.Connection):
+        """Files written before the threads table: last write = the ts of each thread's newest checkpoint."""
+        rows = conn.execute(
+            "SELECT c.thread_id, c.type, c.checkpoint FROM checkpoints c "
+            "WHERE c.thread_id NOT IN (SELECT thread_id FROM threads) AND c.checkpoint_id = ("
+            "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = c.thread_id)").fetchall()
+        if not rows:
+            return
+        touched = []
+        for thread_id, type_, data in rows:
+            try:
+                at = datetime.fromisoformat(self.serde.loads_typed((type_, data))["ts"]).timestamp()
+            except Exception:
+                at = time.time()
+            touched.append((thread_id, at))
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(_TOUCH, touched)
+        conn.execute("COMMIT")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    # --- WRITER ---
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            op = self._ops.get()
+            if op is None:
+                break
+            batch = [op]
+            # Group commit: take everything queued meanwhile (and within the batch window)
+            deadline = time.monotonic() + self.batch_seconds
+            stop = False
+            while True:
+                try:
+                    timeout = deadline - time.monotonic()
+                    nxt = self._ops.get(timeout=timeout) if timeout > 0 else self._ops.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._commit(conn, batch)
+            if stop:
+                break
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[_Op]):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for statements, _ in batch:
+                rowcount = 0
+                for sql, params in statements:
+                    rowcount = conn.execute(sql, params).rowcount
+                results.append(rowcount)
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.commits += 1
+        self.writes += len(batch)
+        for (_, future), rowcount in zip(batch, results):
+            future.set_result(rowcount)  # Rows changed by the op's last statement
+
+    def _submit(self, statements: List[Tuple[str, Sequence[Any]]]) -> Future:
+        if self._closed:
+            raise RuntimeError("Checkpointer is closed")
+        future: Future = Future()
+        self._ops.put((statements, future))
+        return future
+
+    # --- READERS ---
+
+    def _read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        conn = self._readers.get()
+        try:
+            return fn(conn)
+        finally:
+            self._readers.put(conn)
+
+    async def _aread(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._read, fn)
+
+    # --- STATEMENTS ---
+
+    def _put_statements(self, config: RunnableConfig, checkpoint: Checkpoint,
+                        metadata: CheckpointMetadata) -> Tuple[List[Tuple[str, Sequence[Any]]], RunnableConfig]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self.serde.dumps_typed(checkpoint)
+        meta_type, meta = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        statements = [(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+             type_, data, meta_type, meta),
+        ), (_TOUCH, (thread_id, time.time()))]
+        next_config = {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"],
+        }}
+        return statements, next_config
+
+    def _writes_statements(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]],
+                           task_id: str, task_path: str) -> List[Tuple[str, Sequence[Any]]]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special channels (errors, interrupts) overwrite; regular writes are idempotent per (task, idx)
+        verb = "INSERT OR REPLACE" if all(c in WRITES_IDX_MAP for c, _ in writes) else "INSERT OR IGNORE"
+        statements = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            statements.append((
+                f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                 channel, type_, data, task_path),
+            ))
+        return statements
+
+    def _prune_statements(self, thread_ids: Sequence[str], strategy: str) -> List[Tuple[str, Sequence[Any]]]:
+        if strategy not in PRUNE_STRATEGIES:
+            raise ValueError(f"Unknown prune strategy {strategy!r}")
+        statements = []
+        for thread_id in thread_ids:
+            if strategy == "delete":
+                statements += [("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)),
+                               ("DELETE FROM writes WHERE thread_id = ?", (thread_id,)),
+                               ("DELETE FROM threads WHERE thread_id = ?", (thread_id,))]
+                continue
+            # keep_latest: the newest checkpoint per namespace and its pending writes
+            for table in ("checkpoints", "writes"):
+                statements.append((
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_id < ("
+                    f"SELECT MAX(c.checkpoint_id) FROM checkpoints c "
+                    f"WHERE c.thread_id = {table}.thread_id AND c.checkpoint_ns = {table}.checkpoint_ns)",
+                    (thread_id,),
+                ))
+        return statements
+
+    # --- QUERIES ---
+
+    def _query(self, conn: sqlite3.Connection, config: Optional[RunnableConfig], filter: Optional[Dict[str, Any]],
+               before: Optional[RunnableConfig], limit: Optional[int]) -> List[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        sql = "SELECT * FROM checkpoints"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY checkpoint_id DESC"
+        if limit is not None and not filter:
+            sql += f" LIMIT {int(limit)}"
+
+        results: List[CheckpointTuple] = []
+        for thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, data, meta_type, meta in conn.execute(sql, params):
+            metadata = self.serde.loads_typed((meta_type, meta))
+            # Metadata is opaque to SQL; filtered here (rarely used, never on the call path)
+            if filter and not all(metadata.get(k) == v for k, v in filter.items()):
+                continue
+            writes = conn.execute(
+                "SELECT task_id, channel, type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+            results.append(CheckpointTuple(
+                config={"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id,
+                }},
+                checkpoint=self.serde.loads_typed((type_, data)),
+                metadata=metadata,
+                parent_config={"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id,
+                }} if parent_id else None,
+                pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes],
+            ))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def _get_tuple(self, conn: sqlite3.Connection, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        if get_checkpoint_id(config) is None:
+            config = {"configurable": {**config["configurable"],
+                                       "checkpoint_ns": config["configurable"].get("checkpoint_ns", "")}}
+        found = self._query(conn, config, None, None, 1)
+        return found[0] if found else None
+
+    # --- BaseCheckpointSaver ---
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self._read(lambda conn: self._get_tuple(conn, config))
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        yield from self._read(lambda conn: self._query(conn, config, filter, before, limit))
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        statements, next_config = self._put_statements(config, checkpoint, metadata)
+        self._submit(statements).result()
+        return next_config
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        self._submit(self._writes_statements(config, writes, task_id, task_path)).result()
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._submit(self._prune_statements([thread_id], "delete")).result()
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        self._submit(self._prune_statements(thread_ids, strategy)).result()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._aread(lambda conn: self._get_tuple(conn, config))
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for item in await self._aread(lambda conn: self._query(conn, config, filter, before, limit)):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        # Serialized on the loop (cheap); the commit happens on the writer thread
+        statements, next_config = self._put_statements(config, checkpoint, metadata)
+        await asyncio.wrap_future(self._submit(statements))
+        return next_config
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.wrap_future(self._submit(self._writes_statements(config, writes, task_id, task_path)))
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.wrap_future(self._submit(self._prune_statements([thread_id], "delete")))
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        await asyncio.wrap_future(self._submit(self._prune_statements(thread_ids, strategy)))
+
+    async def aevict(self, ttl_seconds: float, max_threads: int, now: Optional[float] = None) -> int:
+        """
+        Delete threads idle for longer than `ttl_seconds` (0 = no TTL) and the least recently
+        written beyond `max_threads`, by the shared threads table, in one writer transaction.
+        Returns the number of threads deleted.
+        """
+        now = time.time() if now is None else now
+        cutoff = now - ttl_seconds if ttl_seconds > 0 else float("-inf")
+        params = (cutoff, max_threads)
+        statements = [(f"DELETE FROM {table} WHERE thread_id IN ({_EXPIRED})", params)
+                      for table in ("checkpoints", "writes")]
+        statements.append((f"DELETE FROM threads WHERE thread_id IN ({_EXPIRED})", params))
+        return await asyncio.wrap_future(self._submit(statements))
+
+    def thread_count(self) -> int:
+        return self._read(lambda conn: conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0])
+
+    def stored_bytes(self) -> int:
+        """Bytes of live pages in the database (freed pages are reused, the file does not shrink)."""
+        def live(conn):
+            pages = conn.execute("PRAGMA page_count").fetchone()[0] - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            return pages * conn.execute("PRAGMA page_size").fetchone()[0]
+        return self._read(live)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same version format as MemorySaver, so a deployment can switch backends freely
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def close(self):
+        """Flush queued writes and close every connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._ops.put(None)
+        self._writer.join()
+        self._executor.shutdown(wait=True)
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+
+class MemoryCheckpointSaver(MemorySaver):
+    """MemorySaver that records thread activity and can compact or drop threads."""
+
+    def __init__(self, serde=None):
+        super().__init__(serde=serde)
+        self.last_put: Dict[str, float] = {}  # thread_id -> wall time of its latest checkpoint (this process only)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        self.last_put[config["configurable"]["thread_id"]] = time.time()
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.prune([thread_id], strategy="delete")
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        if strategy not in PRUNE_STRATEGIES:
+            raise ValueError(f"Unknown prune strategy {strategy!r}")
+        threads = set(thread_ids)
+        latest: Dict[Tuple[str, str], str] = {}  # (thread, ns) -> checkpoint id kept
+        live_blobs = set()
+        for thread_id in threads:
+            if strategy == "delete":
+                self.storage.pop(thread_id, None)
+                self.last_put.pop(thread_id, None)
+                continue
+            for ns, checkpoints in self.storage.get(thread_id, {}).items():
+                if not checkpoints:
+                    continue
+                checkpoint_id = max(checkpoints)
+                saved = checkpoints[checkpoint_id]
+                checkpoints.clear()
+                checkpoints[checkpoint_id] = saved
+                latest[(thread_id, ns)] = checkpoint_id
+                versions = self.serde.loads_typed(saved[0])["channel_versions"]
+                live_blobs.update((thread_id, ns, channel, version) for channel, version in versions.items())
+        # One pass over the shared write/blob maps for the whole batch of threads
+        for key in [k for k in self.writes if k[0] in threads and latest.get(k[:2]) != k[2]]:
+            del self.writes[key]
+        for key in [k for k in self.blobs if k[0] in threads and k not in live_blobs]:
+            del self.blobs[key]
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        self.prune(thread_ids, strategy=strategy)
+
+    async def aevict(self, ttl_seconds: float, max_threads: int, now: Optional[float] = None) -> int:
+        """Delete threads idle for longer than `ttl_seconds` and the least recently written beyond `max_threads`."""
+        now = time.time() if now is None else now
+        activity = sorted(self.last_put.items(), key=lambda item: item[1])  # Oldest first
+        drop = max(0, len(activity) - max_threads)
+        if ttl_seconds > 0:
+            drop = max(drop, sum(1 for _, at in activity if now - at > ttl_seconds))
+        if drop:
+            self.prune([thread_id for thread_id, _ in activity[:drop]], strategy="delete")
+        return drop
+
+    def thread_count(self) -> int:
+        return len(self.last_put)
+
+    def stored_bytes(self) -> int:
+        """Serialized bytes held for checkpoints, metadata, pending writes and channel values."""
+        total = 0
+        for namespaces in list(self.storage.values()):
+            for checkpoints in list(namespaces.values()):
+                total += sum(len(c[1]) + len(m[1]) for c, m, _ in list(checkpoints.values()))
+        total += sum(len(w[2][1]) for writes in list(self.writes.values()) for w in list(writes.values()))
+        total += sum(len(b[1]) for b in list(self.blobs.values()))
+        return total
+
+
+# --- RETENTION ---
+
+class CheckpointRetention:
+    """Bounds what the checkpointers keep: compaction when a call ends, TTL and max-threads eviction."""
+
+    def __init__(self, ttl_seconds: float, max_threads: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self.savers: List[BaseCheckpointSaver] = []
+        self.evicted = 0
+
+    def register(self, saver: BaseCheckpointSaver):
+        if saver not in self.savers:
+            self.savers.append(saver)
+
+    async def end_call(self, thread_ids: Sequence[str]):
+        """The call is over: keep only the latest checkpoint of its threads, then enforce the limits."""
+        for saver in self.savers:
+            await saver.aprune(thread_ids, strategy="keep_latest")
+        await self.sweep()
+
+    async def sweep(self, now: Optional[float] = None) -> int:
+        """Drop threads idle for longer than the TTL, then the least recently written beyond max_threads."""
+        evicted = 0
+        for saver in self.savers:
+            evicted += await saver.aevict(self.ttl_seconds, self.max_threads, now)
+        self.evicted += evicted
+        return evicted
+
+    async def run(self, interval: float):
+        """Periodic sweep (TTL expiry of threads whose call never signalled its end)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                evicted = await self.sweep()
+                if evicted:
+                    print(f"🧹 Checkpoints: evicted {evicted} idle threads ({self.threads()} kept)")
+            except Exception as e:
+                print(f"⚠️ Checkpoint sweep failed: {e}")
+
+    def threads(self) -> int:
+        return sum(saver.thread_count() for saver in self.savers)
+
+    def stored_bytes(self) -> int:
+        return sum(saver.stored_bytes() for saver in self.savers)
+
+
+retention = CheckpointRetention(settings.CHECKPOINT_TTL_SECONDS, settings.CHECKPOINT_MAX_THREADS)
+metrics.gauge("voice_checkpoint_threads", "Conversation threads held by the graph checkpointers.", retention.threads)
+metrics.gauge("voice_checkpoint_bytes", "Bytes of checkpoint data held (in memory, or live SQLite pages).",
+              retention.stored_bytes)
+
+
+# --- FACTORY ---
+
+_savers: Dict[str, BaseCheckpointSaver] = {}
+
+
+def make_checkpointer() -> BaseCheckpointSaver:
+    """Checkpointer for a graph, per settings.CHECKPOINT_BACKEND (one saver shared by both graphs)."""
+    backend = settings.CHECKPOINT_BACKEND.lower()
+    if backend not in ("memory", "sqlite"):
+        raise ValueError(f"Unknown CHECKPOINT_BACKEND {settings.CHECKPOINT_BACKEND!r} (memory | sqlite)")
+    key = settings.CHECKPOINT_DB_PATH if backend == "sqlite" else "memory"
+    saver = _savers.get(key)
+    if saver is None:
+        if backend == "memory":
+            saver = MemoryCheckpointSaver()
+        else:
+            saver = SqliteCheckpointSaver(
+                key,
+                synchronous=settings.CHECKPOINT_SYNCHRONOUS,
+                batch_ms=settings.CHECKPOINT_BATCH_MS,
+                pool_size=settings.CHECKPOINT_POOL_SIZE,
+            )
+            atexit.register(saver.close)  # Graphs are compiled at import and live for the process
+            print(f"💾 Checkpoints: SQLite at {key} (synchronous={saver.synchronous}, batch {settings.CHECKPOINT_BATCH_MS:g}ms)")
+        _savers[key] = saver
+        retention.register(saver)
+    return saver
@@ -22,4 +22,113 @@ class Settings:
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
     TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 
+    # Provider HTTP clients (pooled, app-scoped)
+    DEEPGRAM_BASE_URL = os.getenv("DEEPGRAM_BASE_URL", "https://api.deepgram.com")
+    DEEPGRAM_MAX_CONNECTIONS = int(os.getenv("DEEPGRAM_MAX_CONNECTIONS", "50"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"  # Needs the 'h2' package
+
+    # Speech Recognition
+    # "batch": upload the utterance after silence. "streaming": transcribe while the caller talks.
+    ASR_MODE = os.getenv("ASR_MODE", "batch")
+    ASR_ENDPOINTING_MS = int(os.getenv("ASR_ENDPOINTING_MS", "300"))
+
+    # Speech Synthesis
+    TTS_MODEL = os.getenv("TTS_MODEL", "aura-asteria-en")
+    TTS_STREAMING = os.getenv("TTS_STREAMING", "true").lower() == "true"
+    TTS_LEAD_MS = int(os.getenv("TTS_LEAD_MS", "200"))  # Audio kept queued at Twilio ahead of playback
+
+    # Endpointing (20ms frames). The RMS gate follows the line's noise floor unless VAD_ADAPTIVE=false.
+    VAD_ADAPTIVE = os.getenv("VAD_ADAPTIVE", "true").lower() == "true"
+    VAD_MIN_GATE = float(os.getenv("VAD_MIN_GATE", "150"))  # Gate floor; the whole gate when not adaptive (old loop: 300)
+    VAD_SNR_RATIO = float(os.getenv("VAD_SNR_RATIO", "2.0"))
+    VAD_START_FRAMES = int(os.getenv("VAD_START_FRAMES", "5"))
+    VAD_END_FRAMES = int(os.getenv("VAD_END_FRAMES", "20"))  # 400ms trailing silence (low confidence)
+    VAD_MIN_END_FRAMES = int(os.getenv("VAD_MIN_END_FRAMES", "10"))  # 200ms (high confidence)
+    VAD_MAX_SPEECH_FRAMES = int(os.getenv("VAD_MAX_SPEECH_FRAMES", "750"))  # ~15s forced cut
+
+    # Media stream pipeline
+    FRAME_QUEUE_SIZE = int(os.getenv("FRAME_QUEUE_SIZE", "100"))  # Inbound frames buffered ahead of VAD (~2s)
+
+    # Pre-rendered prompt audio (memory LRU + disk), manifest prompts only
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(BASE_DIR, "tts_cache"))
+    TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "32"))
+    TTS_CACHE_DISK_MAX_MB = int(os.getenv("TTS_CACHE_DISK_MAX_MB", "64"))  # Oldest files removed beyond this
+
+    # Triage graph: run the emergency scan and protocol retrieval concurrently (retrieval dropped on EMERGENCY)
+    PARALLEL_SCAN_RETRIEVAL = os.getenv("PARALLEL_SCAN_RETRIEVAL", "true").lower() == "true"
+
+    # Emergency scan: "llm" = every turn goes to the LLM; "hybrid" = rule phrases flag EMERGENCY locally and
+    # bare yes/no/duration answers skip the LLM, every other turn still goes to it
+    EMERGENCY_SCAN_MODE = os.getenv("EMERGENCY_SCAN_MODE", "llm").lower()
+
+    # Strategist intent: local rules + model first, the LLM only below this confidence
+    LOCAL_INTENT = os.getenv("LOCAL_INTENT", "true").lower() == "true"
+    INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.6"))
+
+    # LLM response cache (exact prompt match; semantic match only for the nodes listed)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+    LLM_CACHE_NODES = os.getenv("LLM_CACHE_NODES", "emergency_scan,intent,diagnostician")  # Temperature-0 nodes only
+    LLM_CACHE_SEMANTIC_NODES = os.getenv("LLM_CACHE_SEMANTIC_NODES", "")
+    LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0.95"))
+
+    # Retrieval: exact search over an in-memory copy of decision_rules, query embeddings cached (LRU)
+    RETRIEVAL_INDEX = os.getenv("RETRIEVAL_INDEX", "true").lower() == "true"
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+    # Cross-call retrieval result cache, invalidated when ingestion bumps the collection version
+    RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+    RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "512"))
+    RETRIEVAL_CACHE_BUCKET_BITS = int(os.getenv("RETRIEVAL_CACHE_BUCKET_BITS", "0"))  # Embedding-bucket keys (vector and hybrid paths); 0 = text only
+    RETRIEVAL_VERSION_CHECK_SECONDS = float(os.getenv("RETRIEVAL_VERSION_CHECK_SECONDS", "5"))
+
+    # Incremental retrieval: keep the protocols in the state until the conversation's topic shifts
+    RETRIEVAL_REUSE = os.getenv("RETRIEVAL_REUSE", "true").lower() == "true"
+    RETRIEVAL_SHORT_ANSWER_WORDS = int(os.getenv("RETRIEVAL_SHORT_ANSWER_WORDS", "4"))  # Yes/no/duration: "about two days"
+    RETRIEVAL_TOPIC_SIMILARITY = float(os.getenv("RETRIEVAL_TOPIC_SIMILARITY", "0.8"))  # vs the previous query
+    RETRIEVAL_QUERY_SYMPTOMS = int(os.getenv("RETRIEVAL_QUERY_SYMPTOMS", "3"))  # Recent symptoms in the query
+
+    # Hybrid retrieval: BM25 + vectors over all three collections, fused ("rrf" or "weighted")
+    HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+    RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))  # Per ranking, before fusion
+    RETRIEVAL_FUSION = os.getenv("RETRIEVAL_FUSION", "rrf")
+    RETRIEVAL_LEXICAL_WEIGHT = float(os.getenv("RETRIEVAL_LEXICAL_WEIGHT", "0.5"))  # "weighted" fusion only
+    RETRIEVAL_BUDGET_MS = float(os.getenv("RETRIEVAL_BUDGET_MS", "150"))  # Past this, lexical results only
+    # Chunk sections searched; protocol_summaries holds only REFERENCE chunks, so dropping it hides that collection
+    RETRIEVAL_SECTIONS = os.getenv("RETRIEVAL_SECTIONS", "RED_FLAGS,MANAGEMENT,ASSESSMENT,REFERENCE")
+
+    # Conversation compaction: older turns live on only in the patient profile
+    CONTEXT_WINDOW_MESSAGES = int(os.getenv("CONTEXT_WINDOW_MESSAGES", "8"))  # Recent messages kept in the state
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))  # Profile + window text in node prompts
+
+    # Speak LLM output sentence-by-sentence while it is still being generated
+    RESPONSE_STREAMING = os.getenv("RESPONSE_STREAMING", "true").lower() == "true"
+
+    # Barge-in (caller may interrupt the agent)
+    BARGE_IN_ENABLED = os.getenv("BARGE_IN_ENABLED", "false").lower() == "true"
+    BARGE_IN_MIN_FRAMES = int(os.getenv("BARGE_IN_MIN_FRAMES", "10"))  # 20ms frames of speech while agent talks
+
+    # Write each call's inbound media-stream events to this directory for offline replay ("" = off)
+    CALL_RECORDING_DIR = os.getenv("CALL_RECORDING_DIR", "")
+
+    # Turn tracing: per-call timelines kept in memory for /api/calls/{id}/timeline, optionally dumped as JSON
+    TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "50"))
+    TRACE_DIR = os.getenv("TRACE_DIR", "")
+
+    # Graph checkpoints: "memory" (lost on restart) or "sqlite" (durable, WAL, group-committed writes)
+    CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "memory")
+    CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(BASE_DIR, "checkpoints.sqlite"))
+    CHECKPOINT_SYNCHRONOUS = os.getenv("CHECKPOINT_SYNCHRONOUS", "NORMAL")  # fsync policy: OFF | NORMAL | FULL
+    CHECKPOINT_BATCH_MS = float(os.getenv("CHECKPOINT_BATCH_MS", "0"))  # Extra wait for more writes per commit (0: just what is queued)
+    CHECKPOINT_POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", "4"))  # Read connections
+    # Retention: ended calls keep only their latest checkpoint; whole threads are evicted when idle or over the cap
+    CHECKPOINT_TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_SECONDS", "3600"))  # 0 = no TTL
+    CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "2000"))  # Two threads per call (triage + booking)
+    CHECKPOINT_SWEEP_SECONDS = float(os.getenv("CHECKPOINT_SWEEP_SECONDS", "60"))
+
 settings = Settings()
@@ -0,0 +1,137 @@
+
+"""
+Application-scoped HTTP clients for speech providers.
+
+One pooled httpx.AsyncClient per provider, created on first use and closed
+from the FastAPI lifespan, so turns reuse warm keep-alive connections
+instead of paying a TCP/TLS handshake for every utterance.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from voice_server.core.config import settings
+
+RETRY_STATUSES = {429, 502, 503, 504}
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+
+
+class ProviderConfig:
+    def __init__(self, base_url: str, max_connections: int = 20, max_keepalive: int = 10,
+                 keepalive_expiry: float = 60.0, connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                 retries: int = 2, backoff: float = 0.1, http2: bool = False):
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.http2 = http2
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ProviderClients:
+    """Registry of pooled clients, one per provider name."""
+
+    def __init__(self, configs: Dict[str, ProviderConfig]):
+        self.configs = configs
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def client(self, provider: str) -> httpx.AsyncClient:
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            cfg = self.configs[provider]
+            http2 = cfg.http2 and _http2_available()
+            if cfg.http2 and not http2:
+                print(f"⚠️ HTTP/2 requested for {provider} but 'h2' is not installed. Using HTTP/1.1.")
+            client = httpx.AsyncClient(
+                base_url=cfg.base_url,
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=cfg.max_connections,
+                    max_keepalive_connections=cfg.max_keepalive,
+                    keepalive_expiry=cfg.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(cfg.read_timeout, connect=cfg.connect_timeout),
+            )
+            self._clients[provider] = client
+        return client
+
+    async def request(self, provider: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying connection failures and transient statuses."""
+        cfg = self.configs[provider]
+        for attempt in range(cfg.retries + 1):
+            last = attempt == cfg.retries
+            try:
+                resp = await self.client(provider).request(method, url, **kwargs)
+            except RETRY_ERRORS:
+                if last:
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUSES or last:
+                    return resp
+            await asyncio.sleep(cfg.backoff * (2 ** attempt))
+
+    @asynccontextmanager
+    async def stream(self, provider: str, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """
+        Streaming request. Retries only happen before the response is handed
+        out, so callers never see a partially replayed body.
+        """
+        cfg = self.configs[provider]
+        client = self.client(provider)
+        resp = None
+        for attempt in range(cfg.retries + 1):
+            last = attempt == cfg.retries
+            try:
+                resp = await client.send(client.build_request(method, url, **kwargs), stream=True)
+            except RETRY_ERRORS:
+                if last:
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUSES or last:
+                    break
+                await resp.aclose()
+            await asyncio.sleep(cfg.backoff * (2 ** attempt))
+        try:
+            yield resp
+        finally:
+            await resp.aclose()
+
+    async def warm(self, provider: str, path: str = "/"):
+        """Open a connection ahead of the first call (errors are ignored)."""
+        try:
+            await self.client(provider).head(path)
+        except httpx.HTTPError:
+            pass
+
+    async def aclose(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(c.aclose() for c in clients), return_exceptions=True)
+
+
+def _deepgram_config(base_url: Optional[str] = None) -> ProviderConfig:
+    return ProviderConfig(
+        base_url=base_url or settings.DEEPGRAM_BASE_URL,
+        max_connections=settings.DEEPGRAM_MAX_CONNECTIONS,
+        max_keepalive=settings.DEEPGRAM_MAX_CONNECTIONS,
+        connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout=settings.HTTP_READ_TIMEOUT,
+        retries=settings.HTTP_RETRIES,
+        http2=settings.HTTP2_ENABLED,
+    )
+
+
+provider_clients = ProviderClients({"deepgram": _deepgram_config()})
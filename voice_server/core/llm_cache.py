@@ -0,0 +1,218 @@
+"""
+Shared response cache for the graph nodes' LLM calls.
+
+Many prompts repeat across calls: the emergency scan of "yes"/"no", intent
+checks of short answers, the diagnosis of the same symptom summary.
+`cached_ainvoke` (chat models) and `LLMCache.get_or_call` (any coroutine
+returning text) look a prompt up before calling the provider:
+
+- exact: the node name, the model and the normalized prompt (lowercased,
+  whitespace collapsed) form the key
+- semantic (opt-in per node): the prompt is embedded and the closest cached
+  prompt of the same node and model is used if its cosine similarity
+  reaches LLM_CACHE_SEMANTIC_THRESHOLD
+
+Entries expire after LLM_CACHE_TTL_SECONDS and the least recently used go
+once LLM_CACHE_MAX_ENTRIES is reached. Only nodes listed in LLM_CACHE_NODES
+are cached. The defaults are the temperature-0 calls. Clarify (temperature
+0.2) can be added, at the cost of always giving the same rewording.
+Concurrent misses on the same key share one provider call.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from langchain_core.messages import AIMessage
+
+from voice_server.core.config import settings
+from voice_server.core.tracing import metrics
+
+Key = Tuple[str, str, str]  # (node, model, normalized prompt)
+
+
+def normalize_prompt(prompt: Any) -> str:
+    if isinstance(prompt, (list, tuple)):
+        prompt = "\n".join(f"{getattr(m, 'type', 'user')}: {getattr(m, 'content', m)}" for m in prompt)
+    return " ".join(str(prompt).lower().split())
+
+
+def _node_list(value: str) -> set:
+    return {n.strip() for n in value.split(",") if n.strip()}
+
+
+class LLMCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, nodes: set, semantic_nodes: set = frozenset(),
+                 semantic_threshold: float = 0.95, embed: Optional[Callable[[str], np.ndarray]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.nodes = set(nodes)
+        self.semantic_nodes = set(semantic_nodes)
+        self.semantic_threshold = semantic_threshold
+        self._embed = embed
+        self._entries: "OrderedDict[Key, Tuple[str, float]]" = OrderedDict()  # key -> (response, expires at)
+        self._vectors: Dict[Key, np.ndarray] = {}  # Unit prompt embeddings of semantic-node entries
+        self._inflight: Dict[Key, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.semantic_hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def enabled(self, node: str) -> bool:
+        return settings.LLM_CACHE_ENABLED and node in self.nodes
+
+    # --- LOOKUP ---
+
+    def get(self, key: Key) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def get_similar(self, key: Key, vector: np.ndarray) -> Optional[str]:
+        node, model, _ = key
+        with self._lock:
+            candidates = [k for k in self._vectors if k[0] == node and k[1] == model]
+            if not candidates:
+                return None
+            scores = np.stack([self._vectors[k] for k in candidates]) @ vector
+        best = int(scores.argmax())
+        if scores[best] < self.semantic_threshold:
+            return None
+        return self.get(candidates[best])
+
+    def put(self, key: Key, response: str, vector: Optional[np.ndarray] = None):
+        with self._lock:
+            self._entries[key] = (response, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            if vector is not None:
+                self._vectors[key] = vector
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Key):
+        self._entries.pop(key, None)
+        self._vectors.pop(key, None)
+
+    def _vector(self, text: str) -> np.ndarray:
+        if self._embed is None:
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+            embedder = DefaultEmbeddingFunction()
+            self._embed = lambda t: np.asarray(embedder([t])[0], dtype=np.float32)
+        vector = self._embed(text)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    async def get_or_call(self, node: str, model: str, prompt: Any, call: Callable[[], Awaitable[str]]) -> str:
+        """Cached response for `prompt`, or `await call()` (stored on success)."""
+        if not self.enabled(node):
+            return await call()
+        key = (node, model, normalize_prompt(prompt))
+        cached = self.get(key)
+        if cached is not None:
+            self._count(self.hits, node)
+            return cached
+
+        vector = None
+        if node in self.semantic_nodes:
+            try:
+                vector = await asyncio.to_thread(self._vector, key[2])
+                cached = self.get_similar(key, vector)
+            except Exception as e:
+                print(f"⚠️ LLM cache: semantic lookup failed ({e}), using exact match only")
+            if cached is not None:
+                self._count(self.hits, node)
+                self._count(self.semantic_hits, node)
+                return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:  # Same prompt already on its way to the provider
+            try:
+                response = await asyncio.shield(pending)
+                self._count(self.hits, node)
+                return response
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The first caller was cancelled (barge-in): make the call ourselves
+
+        self._count(self.misses, node)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        future.set_result(response)
+        self.put(key, response, vector)
+        return response
+
+    # --- STATS ---
+
+    def _count(self, counter: Dict[str, int], node: str):
+        with self._lock:
+            counter[node] = counter.get(node, 0) + 1
+
+    def total(self, counter: Dict[str, int]) -> int:
+        return sum(counter.values())
+
+    def hit_ratio(self) -> float:
+        lookups = self.total(self.hits) + self.total(self.misses)
+        return self.total(self.hits) / lookups if lookups else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "entries": len(self),
+            "hit_ratio": round(self.hit_ratio(), 3),
+            "nodes": {node: {"hits": self.hits.get(node, 0), "semantic_hits": self.semantic_hits.get(node, 0),
+                             "misses": self.misses.get(node, 0)}
+                      for node in sorted(set(self.hits) | set(self.misses))},
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
+
+
+llm_cache = LLMCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    nodes=_node_list(settings.LLM_CACHE_NODES),
+    semantic_nodes=_node_list(settings.LLM_CACHE_SEMANTIC_NODES),
+    semantic_threshold=settings.LLM_CACHE_SEMANTIC_THRESHOLD,
+)
+
+
+async def cached_ainvoke(node: str, llm: Any, prompt: Any, config: Optional[dict] = None) -> AIMessage:
+    """`llm.ainvoke(prompt, config)` through the cache. Cache hits are not streamed."""
+    async def call() -> str:
+        return (await llm.ainvoke(prompt, config=config)).content
+
+    model = getattr(llm, "model_name", None) or type(llm).__name__
+    return AIMessage(content=await llm_cache.get_or_call(node, model, prompt, call))
+
+
+metrics.gauge("voice_llm_cache_hits_total", "LLM calls answered from the response cache.",
+              lambda: llm_cache.total(llm_cache.hits))
+metrics.gauge("voice_llm_cache_misses_total", "Cacheable LLM calls that went to the provider.",
+              lambda: llm_cache.total(llm_cache.misses))
+metrics.gauge("voice_llm_cache_hit_ratio", "Share of cacheable LLM calls answered from the cache.", llm_cache.hit_ratio)
+metrics.gauge("voice_llm_cache_entries", "Responses held by the LLM cache.", lambda: len(llm_cache))
@@ -0,0 +1,232 @@
+
+"""
+Per-call turn tracing and Prometheus histograms.
+
+Each media-stream call gets a CallTrace keyed by its session id. It records
+point events (speech_end, transcript, first_tts_byte, mark_sent, ...) and
+spans (each graph node, each TTS utterance) against one monotonic clock.
+Stage latencies of a turn (asr, graph, tts, mark round trip, ...) are the
+gaps between its events and are observed into histograms that /metrics
+renders in the Prometheus text format.
+
+Graph nodes are wrapped with `traced_node`, which finds the call's trace
+through a contextvar, so node code itself needs no changes.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from voice_server.core.config import settings
+
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0)
+
+
+# --- PROMETHEUS ---
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, List[float]] = {}  # label value -> bucket counts + [sum, count]
+        self._lock = threading.Lock()  # Sync graph nodes observe from worker threads
+
+    def observe(self, label_value: str, seconds: float):
+        with self._lock:
+            series = self._series.setdefault(label_value, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for value, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="{bound}"}} {count:g}')
+            lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="+Inf"}} {series[-1]:g}')
+            lines.append(f'{self.name}_sum{{{self.label}="{value}"}} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{self.label}="{value}"}} {series[-1]:g}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms: List[Histogram] = []
+        self.gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def histogram(self, name: str, help_text: str, label: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        hist = Histogram(name, help_text, label, buckets)
+        self.histograms.append(hist)
+        return hist
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        """Gauge sampled at scrape time."""
+        self.gauges[name] = (help_text, read)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for hist in self.histograms:
+            lines.extend(hist.render())
+        for name, (help_text, read) in self.gauges.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {float(read()):g}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram(
+    "voice_turn_stage_seconds", "Duration of each stage of a caller turn.", "stage")
+node_seconds = metrics.histogram(
+    "voice_graph_node_seconds", "Time spent in each LangGraph node.", "node")
+
+
+# --- CALL TRACES ---
+
+# Turn keys the replay report and the stage histograms are derived from
+TURN_STAGES = {
+    "end_to_first_audio": ("speech_end", "first_audio"),
+    "asr": ("speech_end", "transcript"),
+    "graph": ("transcript", "graph_done"),
+    "graph_first_text": ("transcript", "first_text"),
+    "tts_first_byte": ("tts_start", "first_tts_byte"),
+    "tts_first_audio": ("tts_start", "first_audio"),
+    "mark_round_trip": ("mark_sent", "mark_received"),
+}
+
+
+class CallTrace:
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        self.started_wall = time.time()
+        self.t0 = time.monotonic()
+        self.events: List[Dict[str, Any]] = []
+        self.turns: List[Dict[str, float]] = []  # First time each point event happened, per turn
+        self._lock = threading.Lock()
+
+    @property
+    def turn(self) -> int:
+        return len(self.turns)
+
+    def new_turn(self, at: Optional[float] = None):
+        at = time.monotonic() if at is None else at
+        with self._lock:
+            self.turns.append({})
+        self.mark("speech_end", at)
+
+    def mark(self, name: str, at: Optional[float] = None, **attrs):
+        """Point event. The first occurrence per turn is kept for the turn summary."""
+        at = time.monotonic() if at is None else at
+        with self._lock:
+            self.events.append({"t_ms": self._ms(at), "turn": self.turn, "event": name, **attrs})
+            if self.turns and name not in self.turns[-1]:
+                self.turns[-1][name] = at
+                self._observe_turn_stages(name)
+
+    def span(self, name: str, start: float, end: Optional[float] = None, **attrs):
+        """Closed span between two monotonic timestamps."""
+        end = time.monotonic() if end is None else end
+        with self._lock:
+            self.events.append({
+                "t_ms": self._ms(start), "turn": self.turn, "span": name,
+                "duration_ms": round((end - start) * 1000, 1), **attrs
+            })
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e["t_ms"])
+            turns = [
+                {name: round((turn[b] - turn[a]) * 1000, 1)
+                 for name, (a, b) in TURN_STAGES.items() if a in turn and b in turn}
+                for turn in self.turns
+            ]
+        return {"call_id": self.call_id, "started_at": self.started_wall, "turns": turns, "events": events}
+
+    def _observe_turn_stages(self, name: str):
+        turn = self.turns[-1]
+        for stage, (a, b) in TURN_STAGES.items():
+            if b == name and a in turn:
+                stage_seconds.observe(stage, turn[b] - turn[a])
+
+    def _ms(self, at: float) -> float:
+        return round((at - self.t0) * 1000, 1)
+
+
+class Tracer:
+    """Active calls plus the most recent finished ones (for the timeline endpoint)."""
+
+    def __init__(self, history: int = 50, directory: Optional[str] = None):
+        self.history = history  # Finished traces kept; active ones are never evicted
+        self.directory = directory
+        self.calls: "OrderedDict[str, CallTrace]" = OrderedDict()
+        self._finished: "OrderedDict[str, None]" = OrderedDict()  # Finished call ids, oldest first
+
+    def start_call(self, call_id: str) -> CallTrace:
+        trace = CallTrace(call_id)
+        self.calls[call_id] = trace
+        self._finished.pop(call_id, None)
+        return trace
+
+    async def end_call(self, trace: CallTrace):
+        self._finished[trace.call_id] = None
+        while len(self._finished) > self.history:
+            call_id, _ = self._finished.popitem(last=False)
+            self.calls.pop(call_id, None)
+        if self.directory:
+            try:
+                await asyncio.to_thread(self._dump, trace)
+            except OSError as e:
+                print(f"⚠️ Trace dump failed for {trace.call_id}: {e}")
+
+    def _dump(self, trace: CallTrace):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{trace.call_id}.json"), "w") as f:
+            json.dump(trace.to_dict(), f)
+
+    def get(self, call_id: str) -> Optional[CallTrace]:
+        return self.calls.get(call_id)
+
+
+tracer = Tracer(history=settings.TRACE_HISTORY, directory=settings.TRACE_DIR or None)
+
+# The trace of the call whose turn is being processed (propagates into graph node tasks)
+current_trace: contextvars.ContextVar[Optional[CallTrace]] = contextvars.ContextVar("current_trace", default=None)
+
+
+def traced_node(name: str, fn: Callable) -> Callable:
+    """Wrap a graph node: observe its latency and add a node span to the current call's timeline."""
+
+    def finish(start: float):
+        end = time.monotonic()
+        node_seconds.observe(name, end - start)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.span(f"node:{name}", start, end)
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(state):
+            start = time.monotonic()
+            try:
+                return await fn(state)
+            finally:
+                finish(start)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(state):
+        start = time.monotonic()
+        try:
+            return fn(state)
+        finally:
+            finish(start)
+    return wrapper
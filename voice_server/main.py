@@ -11,7 +11,6 @@ import asyncio
 import os
 import shutil
 from voice_server.core.config import settings
-import math
 
 # --- GROQ ---
 from groq import Groq
@@ -32,7 +31,31 @@ twilio_client = Client(
 )
 
 
-app = FastAPI(title="Agentic Doctor V2 - Ported")
+# --- PROVIDER CLIENTS ---
+from contextlib import asynccontextmanager
+from voice_server.core.http_clients import provider_clients
+from voice_server.audio.tts import synthesize
+from voice_server.audio.tts_cache import tts_cache, load_manifest
+from voice_server.core.checkpointer import retention
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled Deepgram connections live for the whole process
+    await provider_clients.warm("deepgram")
+    # Pre-render fixed prompts in the background so startup isn't blocked
+    warm_task = None
+    if settings.DEEPGRAM_API_KEY:
+        warm_task = asyncio.create_task(tts_cache.warm(load_manifest(), settings.TTS_MODEL, synthesize))
+    # Evict checkpoint threads of conversations that never signalled their end (e.g. /chat sessions)
+    sweep_task = asyncio.create_task(retention.run(settings.CHECKPOINT_SWEEP_SECONDS))
+    yield
+    if warm_task and not warm_task.done():
+        warm_task.cancel()
+    sweep_task.cancel()
+    await provider_clients.aclose()
+
+
+app = FastAPI(title="Agentic Doctor V2 - Ported", lifespan=lifespan)
 
 from fastapi.middleware.cors import CORSMiddleware
 app.add_middleware(
@@ -158,344 +181,538 @@ async def chat_endpoint(req: ChatRequest):
 # --- MERGED VOICE LOGIC ---
 import base64
 import webrtcvad
-import struct
-import httpx
+from voice_server.audio.codec import decode_mulaw, mulaw_rms, FRAME_BYTES
+from voice_server.audio.ring_buffer import AudioRingBuffer
+from voice_server.audio.asr import create_recognizer
+from voice_server.audio.tts import speak, tts_metrics, TTSError
+from voice_server.audio.segmenter import SentenceSegmenter
+from voice_server.audio.endpointer import AdaptiveEndpointer, EndpointerConfig, START, END, TIMEOUT
+from voice_server.agent.nodes.strategist import SPEAKABLE_TAG
+from voice_server.replay.recording import CallRecorder
+from voice_server.core.tracing import tracer, current_trace, metrics
+from voice_server.core.llm_cache import llm_cache
 
 # We need DEEPGRAM_KEY
 DEEPGRAM_API_KEY = settings.DEEPGRAM_API_KEY
 
-async def send_audio_to_twilio(websocket, stream_sid, text):
+async def send_audio_to_twilio(websocket, stream_sid, text, mark=True):
     if not text: return
     # print(f"🔊 Speaking: {text}")
     await broadcast_log(f"🔊 Speaking: {text}", "info")
 
-    
-    url = "https://api.deepgram.com/v1/speak?model=aura-asteria-en&encoding=mulaw&sample_rate=8000"
-    headers = {"Authorization": f"Token {DEEPGRAM_API_KEY}", "Content-Type": "application/json"}
+    stats = None
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, headers=headers, json={"text": text})
-            if resp.status_code == 200:
-                chunk_size = 1024
-                audio = resp.content
-                for i in range(0, len(audio), chunk_size):
-                    chunk = audio[i:i+chunk_size]
-                    b64 = base64.b64encode(chunk).decode('utf-8')
-                    # Check connection open
-                    await websocket.send_text(json.dumps({
-                        "event": "media", "streamSid": stream_sid, "media": {"payload": b64}
-                    }))
-                    await asyncio.sleep(0.01) # Pacing
-                
-                # Mark end
-                await websocket.send_text(json.dumps({
-                    "event": "mark", "streamSid": stream_sid, "mark": {"name": "speech_end"}
-                }))
-            else:
-                await broadcast_log(f"Deepgram Error: {resp.status_code} - {resp.text}", "error")
+        # Audio is forwarded as it is synthesized and paced at playback speed
+        stats = await speak(websocket.send_text, stream_sid, text)
+        await broadcast_log(
+            f"⏱️ TTS first audio: {stats.ttfa_ms or 0:.0f}ms | Jitter p95: {stats.jitter_p95_ms:.1f}ms", "info"
+        )
+
+        # Mark end (only after the last segment of a response)
+        if mark:
+            await send_speech_end_mark(websocket, stream_sid)
+    except TTSError as e:
+        await broadcast_log(str(e), "error")
     except Exception as e:
         await broadcast_log(f"TTS Error: {e}", "error")
+    return stats
+
+
+async def send_speech_end_mark(websocket, stream_sid):
+    await websocket.send_text(json.dumps({
+        "event": "mark", "streamSid": stream_sid, "mark": {"name": "speech_end"}
+    }))
 
 
 async def transcribe_audio_deepgram(audio_bytes):
-    url = "https://api.deepgram.com/v1/listen?model=nova-2&encoding=mulaw&sample_rate=8000"
+    url = "/v1/listen?model=nova-2&encoding=mulaw&sample_rate=8000"
     headers = {"Authorization": f"Token {DEEPGRAM_API_KEY}", "Content-Type": "audio/mulaw"}
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, headers=headers, content=audio_bytes)
-            if resp.status_code == 200:
-                data = resp.json()
-                transcript = data['results']['channels'][0]['alternatives'][0]['transcript']
-                return transcript
+        # httpx needs bytes: the ring view is copied once here, at the HTTP boundary
+        resp = await provider_clients.request("deepgram", "POST", url, headers=headers, content=bytes(audio_bytes))
+        if resp.status_code == 200:
+            data = resp.json()
+            transcript = data['results']['channels'][0]['alternatives'][0]['transcript']
+            return transcript
     except Exception as e:
         await broadcast_log(f"ASR Error: {e}", "error")
 
 
     return ""
 
-def mulaw_to_pcm16(data: bytes) -> bytes:
-    res = bytearray()
-    for b in data:
-        b = ~b & 0xFF
-        sign = b & 0x80
-        exponent = (b >> 4) & 0x07
-        mantissa = b & 0x0F
-        sample = (2 * mantissa + 33) << (exponent + 2)
-        sample -= 33
-        if sign == 0: sample = -sample
-        if sample > 32767: sample = 32767
-        if sample < -32768: sample = -32768
-        res.extend(struct.pack('<h', sample))
-    return bytes(res)
-
-def calculate_rms(pcm_data: bytes) -> float:
-    """Calculate Root Mean Square amplitude of PCM16 data"""
-    if not pcm_data: return 0.0
-    
-    count = len(pcm_data) // 2
-    sum_squares = 0.0
-    
-    import struct
-    # Iterate over 2-byte chunks (16-bit samples)
-    for i in range(0, len(pcm_data), 2):
-        sample = struct.unpack('<h', pcm_data[i:i+2])[0]
-        sum_squares += sample * sample
-        
-    return math.sqrt(sum_squares / count)
-
 # ... (Websocket Endpoint Re-implementation) ...
+GREETING = "Hello. I am your medical assistant. You can speak now."
+
+
+class CallSession:
+    """
+    One Twilio media stream, run as cooperating tasks joined by bounded queues:
+
+        receiver -> audio ring -> vad -> turn_queue -> processor -> speech_queue -> sender
+
+    The receiver only parses packets, so mark/stop events and inbound audio are
+    read on time no matter how long ASR, the graphs or TTS take.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.session_id = f"call_{uuid.uuid4()}"
+        self.config = {"configurable": {"thread_id": self.session_id}}
+        self.stream_sid = None
+
+        # Queues (bounded: a slow stage pushes back instead of growing memory)
+        self.turn_queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self.speech_queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+
+        # VAD state
+        self.vad = webrtcvad.Vad(2)
+        # Inbound audio lives in one preallocated ring; VAD frames and the utterance are views into it.
+        # It holds the longest utterance the endpointer lets through (START + VAD_MAX_SPEECH_FRAMES, then
+        # a forced cut) plus the unread backlog, so the utterance is never overwritten before the cut.
+        self.max_utterance_bytes = (settings.VAD_MAX_SPEECH_FRAMES + 2) * FRAME_BYTES
+        backlog = settings.FRAME_QUEUE_SIZE * FRAME_BYTES
+        self.audio = AudioRingBuffer(capacity=self.max_utterance_bytes + backlog, max_backlog=backlog)
+        self.audio_ready = asyncio.Event()
+        self.utterance_start: Optional[int] = None  # Ring position where the current utterance began
+        self.utterance_end = 0
+        self._pcm = None  # Reused decode buffer (numpy), so VAD doesn't allocate per frame
+        # Noise floor, RMS gate and trailing-silence window adapt per call
+        self.endpointer = AdaptiveEndpointer(EndpointerConfig.from_settings())
+
+        # Streaming ASR: recognizer for the utterance in progress (None in batch mode)
+        self.streaming_asr = settings.ASR_MODE == "streaming"
+        self.recognizer = None
+
+        # STRICT TURN-TAKING STATE
+        self.listening_mode = True
+
+        # BARGE-IN: keep VAD running while the agent speaks and cut playback when the caller talks
+        self.barge_in = settings.BARGE_IN_ENABLED
+        self.agent_speaking = False
+        self.playback_task = None
+        self.interrupted = False  # Set by barge-in: stop queueing the rest of the current response
+
+        # Booking State Persistence
+        self.booking_mode = False
+        self.booking_config = {"configurable": {"thread_id": f"booking_{self.session_id}"}}
+
+        # Turn timeline: speech_end, transcript, graph nodes, TTS first byte, mark round trip (see core/tracing.py)
+        self.trace = tracer.start_call(self.session_id)
+        # Raw inbound events for offline replay (see replay_call.py)
+        self.recorder = None
+        if settings.CALL_RECORDING_DIR:
+            self.recorder = CallRecorder(os.path.join(settings.CALL_RECORDING_DIR, f"{self.session_id}.mscall"))
+
+    async def run(self):
+        tasks = [
+            asyncio.create_task(self._receiver(), name="receiver"),
+            asyncio.create_task(self._vad_worker(), name="vad"),
+            asyncio.create_task(self._turn_processor(), name="processor"),
+            asyncio.create_task(self._sender(), name="sender"),
+        ]
+        try:
+            # The receiver ends on stop/disconnect; any other task ending means it crashed
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception():
+                    print(f"WS Error ({task.get_name()}): {task.exception()}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.playback_task and not self.playback_task.done():
+                self.playback_task.cancel()
+            if self.recognizer:
+                await self.recognizer.close()
+            if self.recorder:
+                self.recorder.close()
+            await tracer.end_call(self.trace)
+            await self._end_checkpoints()
+            if self.audio.dropped:
+                print(f"⚠️ {self.session_id}: dropped {self.audio.dropped // FRAME_BYTES} inbound frames (VAD backlog)")
+
+    async def _end_checkpoints(self):
+        """Conversation over: keep only the latest checkpoint of this call's threads."""
+        try:
+            await retention.end_call([self.config["configurable"]["thread_id"],
+                                      self.booking_config["configurable"]["thread_id"]])
+        except Exception as e:
+            print(f"⚠️ Checkpoint compaction failed for {self.session_id}: {e}")
+
+    # --- RECEIVER ---
+
+    async def _receiver(self):
+        try:
+            while True:
+                data = await self.websocket.receive_text()
+                packet = json.loads(data)
+                event = packet.get("event")
+                if self.recorder:
+                    self.recorder.record_packet(packet, data)
+
+                if event == "start":
+                    self.stream_sid = packet.get("start", {}).get("streamSid")
+                    await broadcast_log(f"🚀 Stream Started: {self.stream_sid}", "info")
+
+                    # Greeting
+                    # Mute while greeting
+                    self.listening_mode = False
+                    await broadcast_log("🛑 Listening Paused (Agent Speaking)", "warning")
+                    await self.speech_queue.put((GREETING, True))
+
+                elif event == "media":
+                    if not self.listening_mode:
+                        # Drop audio packets if not in listening mode
+                        continue
+
+                    payload = packet.get("media", {}).get("payload")
+                    if payload:
+                        self.audio.write(base64.b64decode(payload))
+                        self.audio_ready.set()
+
+                elif event == "mark":
+                    mark_name = packet.get("mark", {}).get("name")
+                    if mark_name == "speech_end":
+                        await self._on_speech_end()
+
+                elif event == "stop":
+                    await broadcast_log("🛑 Call Ended (Twilio Stop Event)", "warning")
+                    return
+
+        except WebSocketDisconnect:
+            await broadcast_log("🔌 WebSocket Disconnected", "error")
+
+    async def _on_speech_end(self):
+        self.trace.mark("mark_received")
+        self.agent_speaking = False
+        if self.barge_in and self.endpointer.is_speaking:
+            # Caller already talking over the tail of playback: keep capturing
+            return
+        self.listening_mode = True
+        await broadcast_log("👂 Listening Resumed", "success")
+        # Clear buffer to avoid processing old audio
+        self.audio.skip_unread()
+        self.utterance_start = None
+        await self._drop_recognizer()
+        self.endpointer.reset()
+
+    async def _drop_recognizer(self):
+        if self.recognizer:
+            await self.recognizer.close()
+            self.recognizer = None
+
+    # --- VAD / ENDPOINTING ---
+
+    async def _vad_worker(self):
+        while True:
+            await self.audio_ready.wait()
+            self.audio_ready.clear()
+
+            # Process in 20ms frames (160 bytes for 8kHz mulaw), read in place from the ring
+            while self.listening_mode:
+                frame = self.audio.read_frame()
+                if frame is None:
+                    break
+                await self._process_frame(frame)
+            if not self.listening_mode:
+                # Audio that arrived while paused is never processed
+                self.audio.skip_unread()
+
+    async def _process_frame(self, frame_mulaw: memoryview):
+        pcm_frame = self._pcm = decode_mulaw(frame_mulaw, out=self._pcm)
+
+        # --- VAD + RMS LOGIC ---
+        is_speech_vad = self.vad.is_speech(pcm_frame, 8000)
+        rms = mulaw_rms(frame_mulaw)
+
+        # While the agent talks, the endpointer requires more evidence before treating it as an interruption
+        event = self.endpointer.process(is_speech_vad, rms, strict=self.agent_speaking)
+
+        # Start of speech
+        if event == START:
+            if self.agent_speaking:
+                await broadcast_log("✋ Barge-in: caller interrupted, stopping playback", "warning")
+                await self._stop_playback()
+            await broadcast_log(
+                f"🗣️ User started speaking... (RMS: {int(rms)}, Gate: {int(self.endpointer.gate)})", "info"
+            )
+            self.utterance_start = self.audio.read_pos - len(frame_mulaw)
+            self.utterance_end = self.audio.read_pos
+            if self.streaming_asr:
+                self.recognizer = create_recognizer()
+                self.recognizer.feed(frame_mulaw)
+        elif self.endpointer.is_speaking or event is not None:
+            if self.utterance_start is not None and self.utterance_end - self.utterance_start < self.max_utterance_bytes:
+                self.utterance_end = self.audio.read_pos
+                if self.recognizer:
+                    self.recognizer.feed(frame_mulaw)
+
+        # Recognizer endpoint: caller finished, no need to wait for our silence window
+        if self.endpointer.is_speaking and self.recognizer and self.recognizer.endpointed:
+            event = self.endpointer.force_end()
+
+        # Force Timeout Check
+        if event == TIMEOUT:
+            print("⏱️ Max speech duration reached (15s). Forcing processing.")
+
+        # End of speech (trailing silence adapts between 200ms and 400ms)
+        if event in (END, TIMEOUT):
+            self.trace.new_turn()
+            await broadcast_log(f"🤫 Silence detected. Processing speech...", "info")
+
+            # MUTE INPUT IMMEDIATELY
+            self.listening_mode = False
+            await broadcast_log("🛑 Listening Paused (Agent Thinking)", "warning")
+
+            # The utterance is handed over as one contiguous view into the ring (no copy),
+            # trimmed to what the ring still holds rather than failing the call
+            audio = b""
+            if self.utterance_start is not None:
+                start, end = self.audio.clamp(self.utterance_start, self.utterance_end)
+                if start > self.utterance_start:
+                    print(f"⚠️ {self.session_id}: utterance longer than the audio ring, "
+                          f"first {(start - self.utterance_start) / 8000:.1f}s dropped")
+                audio = self.audio.view(start, end)
+            recognizer = self.recognizer
+            self.utterance_start = None
+            self.recognizer = None
+            # Hand the utterance to the processor (waits if a turn is still queued)
+            await self.turn_queue.put((audio, recognizer))
+
+    # --- TURN PROCESSOR ---
+
+    async def _turn_processor(self):
+        # Graph nodes run in this task's context and add their spans to this call's trace
+        current_trace.set(self.trace)
+        while True:
+            audio, recognizer = await self.turn_queue.get()
+            self.interrupted = False
+            transcript = ""
+            # Transcribe
+            if len(audio) > 800: # Min duration check ~100ms
+                print(f"Processing audio buffer: {len(audio)} bytes")
+                if recognizer:
+                    transcript = await recognizer.finish()
+                else:
+                    transcript = await transcribe_audio_deepgram(audio)
+                self.trace.mark("transcript", chars=len(transcript or ""))
+                if self.recorder:
+                    self.recorder.record_transcript(transcript)
+                await broadcast_log(f"📝 Transcript: {transcript}", "success")
+            elif recognizer:
+                await recognizer.close()
+
+            if transcript and len(transcript) > 1:
+                segments = await self._respond(transcript)
+                self.trace.mark("graph_done")
+                # Fixed prompts are spoken as their own segment so they play from the TTS cache
+                for segment in segments:
+                    await self._say(segment)
+                # Close the response: listening resumes when Twilio plays this mark
+                await self._say(None, mark=True)
+            else:
+                # FAILURE CASE: We paused listening, but we aren't going to speak.
+                # We MUST resume listening so the user can try again.
+                self.listening_mode = True
+                await broadcast_log("⚠️ No speech detected. Listening Resumed.", "warning")
+
+    async def _respond(self, transcript: str) -> List[str]:
+        if self.booking_mode:
+            await broadcast_log(f"📅 Processing Booking...", "info")
+            # Invoke booking agent directly
+            booking_result = await booking_graph.ainvoke(
+                {"messages": [HumanMessage(content=transcript)]},
+                config=self.booking_config
+            )
+
+            response_text = booking_result.get("final_response")
+            if not response_text:
+                msgs = booking_result.get("messages", [])
+                if msgs: response_text = msgs[-1].content
+                else: response_text = "I heard you."
+
+            # Check completion
+            if booking_result.get("booking_stage") == "complete":
+                await broadcast_log("✅ Booking Complete.", "success")
+                await self._end_checkpoints()
+                # We could hang up here or just say goodbye
+            return [response_text]
+
+        # --- CLINICAL MODE ---
+        await broadcast_log("🤖 Invoking Clinical Agent...", "info")
+        result, streamed = await self._run_clinical(transcript)
+
+        # Check if clinical assessment is complete
+        triage_decision = result.get("triage_decision", "PENDING")
+        assessment_complete = result.get("assessment_complete", False)
+
+        # Trigger booking agent if:
+        # 1. Emergency detected, OR
+        # 2. Assessment explicitly marked as complete (summary generated)
+        should_book = (triage_decision == "EMERGENCY") or assessment_complete
+
+        if not should_book:
+            if streamed:
+                # Already spoken sentence-by-sentence while it was generated
+                return []
+            # Continue with clinical agent response
+            response_text = result.get("final_response")
+            if not response_text:
+                msgs = result.get("messages", [])
+                if msgs: response_text = msgs[-1].content
+                else: response_text = "I heard you."
+            return [response_text]
+
+        await broadcast_log("⚠️ Emergency/Done -> Switching to Booking Agent", "warning")
+        self.booking_mode = True # SWITCH MODE PERMANENTLY
+
+        # Prepare booking context
+        medical_summary = result.get("final_response", "Assessment complete.")
+
+        # Invoke booking agent (Initial)
+        booking_result = await booking_graph.ainvoke(
+            {
+                "messages": [HumanMessage(content=transcript)], # Context
+                "triage_decision": triage_decision,
+                "medical_summary": medical_summary,
+                "booking_stage": "initial",
+                "doctor_name": "Dr. Smith"
+            },
+            config=self.booking_config
+        )
+
+        booking_response = booking_result.get("final_response")
+        if not booking_response:
+            msgs = booking_result.get("messages", [])
+            if msgs: booking_response = msgs[-1].content
+            else: booking_response = "How can I help you book?"
+
+        # COMBINE: Clinical Summary + Booking Greeting
+        # This ensures the user hears the summary first
+        if medical_summary and not streamed:
+            return [medical_summary, booking_response]
+        return [booking_response]
+
+    async def _run_clinical(self, transcript: str):
+        """
+        Run the clinical graph. With RESPONSE_STREAMING, tokens from speakable LLM
+        calls are cut into sentences and queued for TTS while the graph is still running.
+        Returns (final state, whether any of the response was already queued).
+        """
+        graph_input = {"messages": [HumanMessage(content=transcript)]}
+        if not settings.RESPONSE_STREAMING:
+            return await agent_graph.ainvoke(graph_input, config=self.config), False
+
+        segmenter = SentenceSegmenter()
+        result, streamed = {}, False
+        async for mode, chunk in agent_graph.astream(graph_input, config=self.config, stream_mode=["messages", "values"]):
+            if mode == "values":
+                result = chunk
+                continue
+            message, metadata = chunk
+            if SPEAKABLE_TAG not in (metadata.get("tags") or []) or not isinstance(message.content, str):
+                continue
+            for sentence in segmenter.push(message.content):
+                await self._say(sentence)
+                streamed = True
+        for sentence in segmenter.flush():
+            await self._say(sentence)
+            streamed = True
+        return result, streamed
+
+    async def _say(self, text: Optional[str], mark: bool = False):
+        if self.interrupted:
+            return
+        if text:
+            self.trace.mark("first_text")
+        await self.speech_queue.put((text, mark))
+
+    # --- AUDIO SENDER ---
+
+    async def _sender(self):
+        while True:
+            text, mark = await self.speech_queue.get()
+            if text is None:
+                if mark:
+                    await send_speech_end_mark(self.websocket, self.stream_sid)
+                    self.trace.mark("mark_sent")
+                continue
+            if self.barge_in:
+                self.agent_speaking = True
+                self.listening_mode = True
+            self.playback_task = asyncio.create_task(
+                send_audio_to_twilio(self.websocket, self.stream_sid, text, mark=mark)
+            )
+            self.trace.mark("tts_start")
+            try:
+                # asyncio.wait does not raise when playback is cancelled by a barge-in
+                await asyncio.wait({self.playback_task})
+            finally:
+                if not self.playback_task.done():
+                    self.playback_task.cancel()
+            stats = None if self.playback_task.cancelled() else self.playback_task.result()
+            if stats and stats.first_audio:
+                self.trace.mark("first_tts_byte", stats.first_byte)
+                self.trace.mark("first_audio", stats.first_audio)
+                self.trace.span("tts", stats.started, chars=len(text), cache_hit=stats.cache_hit,
+                                audio_ms=round(stats.audio_seconds * 1000))
+            if mark:
+                self.trace.mark("mark_sent")
+
+    async def _stop_playback(self):
+        self.agent_speaking = False
+        self.interrupted = True
+        # Anything still queued to be said is stale once the caller interrupts
+        while not self.speech_queue.empty():
+            self.speech_queue.get_nowait()
+        if self.playback_task and not self.playback_task.done():
+            self.playback_task.cancel()
+            try:
+                await self.playback_task
+            except asyncio.CancelledError:
+                pass
+        # Drop whatever audio Twilio still has buffered
+        await self.websocket.send_text(json.dumps({"event": "clear", "streamSid": self.stream_sid}))
+
+
 @app.websocket("/media-stream")
 async def websocket_media_stream(websocket: WebSocket):
     await websocket.accept()
-    # print("📞 Call Connected (WebSocket)")
     await broadcast_log("✅ Call Connected (Media Stream)", "success")
 
-    
-    session_id = f"call_{uuid.uuid4()}"
-    config = {"configurable": {"thread_id": session_id}}
-    
-    vad = webrtcvad.Vad(2) 
-    
-    vad_buffer = bytearray()
-    collected_audio = bytearray() 
-    
-    silence_frames = 0
-    speech_frames = 0
-    is_speaking = False
-    
-    total_speaking_frames = 0
-    MAX_SPEECH_FRAMES = 750 # ~15 seconds max speech per turn
-    RMS_THRESHOLD = 300 # Energy threshold (Adjustable: 100-500 is typical noise floor)
-    
-    MAX_SPEECH_FRAMES = 750 # ~15 seconds max speech per turn
-    RMS_THRESHOLD = 300 # Energy threshold (Adjustable: 100-500 is typical noise floor)
-    
-    stream_sid = None
-    
-    # STRICT TURN-TAKING STATE
-    listening_mode = True 
-
-    
-    # Booking State Persistence
-    booking_mode = False
-    booking_config = {"configurable": {"thread_id": f"booking_{session_id}"}}
-    
     try:
-        while True:
-            data = await websocket.receive_text()
-            packet = json.loads(data)
-            event = packet.get("event")
-            
-            if event == "start":
-                stream_sid = packet.get("start", {}).get("streamSid")
-                # print(f"Stream Started: {stream_sid}")
-                await broadcast_log(f"🚀 Stream Started: {stream_sid}", "info")
-                
-                # Reset listening mode on start
-                listening_mode = True
-
-
-                # Greeting
-                # Mute while greeting
-                listening_mode = False
-                await broadcast_log("🛑 Listening Paused (Agent Speaking)", "warning")
-                await send_audio_to_twilio(websocket, stream_sid, "Hello. I am your medical assistant. You can speak now.")
-
-                
-            elif event == "media":
-                if not listening_mode:
-                    # Drop audio packets if not in listening mode
-                    continue
-                    
-                payload = packet.get("media", {}).get("payload")
-
-                if payload:
-                    chunk = base64.b64decode(payload)
-                    vad_buffer.extend(chunk)
-                    
-                    if is_speaking:
-                        collected_audio.extend(chunk)
-                    
-                    # Process in 20ms chunks (160 bytes for 8kHz mulaw)
-                    while len(vad_buffer) >= 160:
-                        frame_mulaw = vad_buffer[:160]
-                        del vad_buffer[:160]
-                        
-                        pcm_frame = mulaw_to_pcm16(frame_mulaw)
-                        
-                        # --- VAD + RMS LOGIC ---
-                        is_speech_vad = vad.is_speech(pcm_frame, 8000)
-                        rms = calculate_rms(pcm_frame)
-                        
-                        # Only count as speech if VAD says Yes AND Energy is high enough
-                        if is_speech_vad and rms > RMS_THRESHOLD:
-                            speech_frames += 1
-                            silence_frames = 0
-                        else:
-                            # If RMS is low, treat as silence even if VAD flickers
-                            silence_frames += 1
-
-                        # Start of speech
-                        if speech_frames > 5:
-                             if not is_speaking:
-                                is_speaking = True
-                                # print(f"🗣️ User started speaking... (RMS: {int(rms)})")
-                                await broadcast_log(f"🗣️ User started speaking... (RMS: {int(rms)})", "info")
-                                total_speaking_frames = 0
-                                collected_audio.clear() 
-                                collected_audio.extend(frame_mulaw) 
-                             else:
-                                 if len(collected_audio) < 160000: 
-                                     collected_audio.extend(frame_mulaw)
-                                 total_speaking_frames += 1
-
-                        # Force Timeout Check
-                        if is_speaking and total_speaking_frames > MAX_SPEECH_FRAMES:
-                             print("⏱️ Max speech duration reached (15s). Forcing processing.")
-                             silence_frames = 100 
-
-                        # End of speech (Silence for > 400ms = 20 frames)
-                        if silence_frames > 20 and is_speaking:
-                            # print(f"✅ Silence detected ({silence_frames} frames). Processing speech...")
-                            await broadcast_log(f"🤫 Silence detected. Processing speech...", "info")
-                            
-                            # MUTE INPUT IMMEDIATELY
-                            listening_mode = False
-                            await broadcast_log("🛑 Listening Paused (Agent Thinking)", "warning")
-                            
-                            is_speaking = False
-
-                            speech_frames = 0
-                            silence_frames = 0
-                            total_speaking_frames = 0
-                            
-                            # Transcribe
-                            if len(collected_audio) > 800: # Min duration check ~100ms
-                                print(f"Processing audio buffer: {len(collected_audio)} bytes")
-                                transcript = await transcribe_audio_deepgram(bytes(collected_audio))
-                                # print(f"📝 Transcript: {transcript}")
-                                await broadcast_log(f"📝 Transcript: {transcript}", "success")
-
-                                
-                                if transcript and len(transcript) > 1:
-                                    
-                                    if booking_mode:
-                                        # print(f"📅 processing Booking... Mode: {booking_mode}, Thread: {booking_config}")
-                                        await broadcast_log(f"📅 Processing Booking...", "info")
-                                        # Invoke booking agent directly
-                                        booking_result = await booking_graph.ainvoke(
-                                            {"messages": [HumanMessage(content=transcript)]},
-                                            config=booking_config
-                                        )
-                                        
-                                        response_text = booking_result.get("final_response")
-                                        if not response_text:
-                                            msgs = booking_result.get("messages", [])
-                                            if msgs: response_text = msgs[-1].content
-                                            else: response_text = "I heard you."
-                                            
-                                        # Check completion
-                                        if booking_result.get("booking_stage") == "complete":
-                                            # print("✅ Booking Complete. Ending Call.")
-                                            await broadcast_log("✅ Booking Complete.", "success")
-                                            # We could hang up here or just say goodbye
-                                            
-                                    else:
-                                        # --- CLINICAL MODE ---
-                                        # print("🤖 Invoking Clinical Agent...")
-                                        await broadcast_log("🤖 Invoking Clinical Agent...", "info")
-                                        result = await agent_graph.ainvoke(
-                                            {"messages": [HumanMessage(content=transcript)]}, 
-                                            config=config
-                                        )
-                                        
-                                        # Check if clinical assessment is complete
-                                        triage_decision = result.get("triage_decision", "PENDING")
-                                        assessment_complete = result.get("assessment_complete", False)
-                                        
-                                        # Trigger booking agent if:
-                                        # 1. Emergency detected, OR
-                                        # 2. Assessment explicitly marked as complete (summary generated)
-                                        should_book = (triage_decision == "EMERGENCY") or assessment_complete
-                                        
-                                        if should_book:
-                                            # print("📅 Triggering Booking Agent...")
-                                            await broadcast_log("⚠️ Emergency/Done -> Switching to Booking Agent", "warning")
-                                            booking_mode = True # SWITCH MODE PERMANENTLY
-                                            
-                                            
-                                            # Prepare booking context
-                                            medical_summary = result.get("final_response", "Assessment complete.")
-                                            
-                                            # Invoke booking agent (Initial)
-                                            booking_result = await booking_graph.ainvoke(
-                                                {
-                                                    "messages": [HumanMessage(content=transcript)], # Context
-                                                    "triage_decision": triage_decision,
-                                                    "medical_summary": medical_summary,
-                                                    "booking_stage": "initial",
-                                                    "doctor_name": "Dr. Smith"
-                                                },
-                                                config=booking_config
-                                            )
-                                            
-                                            booking_response = booking_result.get("final_response")
-                                            if not booking_response:
-                                                msgs = booking_result.get("messages", [])
-                                                if msgs: booking_response = msgs[-1].content
-                                                else: booking_response = "How can I help you book?"
-
-                                            # COMBINE: Clinical Summary + Booking Greeting
-                                            # This ensures the user hears the summary first
-                                            if medical_summary:
-                                                response_text = f"{medical_summary} ... {booking_response}"
-                                            else:
-                                                response_text = booking_response
-
-                                        else:
-                                            # Continue with clinical agent response
-                                            response_text = result.get("final_response")
-                                            if not response_text:
-                                                 msgs = result.get("messages", [])
-                                                 if msgs: response_text = msgs[-1].content
-                                                 else: response_text = "I heard you."
-                                    
-                                    await send_audio_to_twilio(websocket, stream_sid, response_text)
-                                else:
-                                    # print("⚠️ No transcript detected. (Likely noise)")
-                                    # FAILURE CASE: We paused listening, but we aren't going to speak.
-                                    # We MUST resume listening so the user can try again.
-                                    listening_mode = True
-                                    await broadcast_log("⚠️ No speech detected. Listening Resumed.", "warning")
-
-                                    
-                            collected_audio.clear()
-
-            elif event == "mark":
-                mark_name = packet.get("mark", {}).get("name")
-                if mark_name == "speech_end":
-                    listening_mode = True
-                    await broadcast_log("👂 Listening Resumed", "success")
-                    # Clear buffer to avoid processing old audio
-                    collected_audio.clear()
-                    vad_buffer.clear()
-                    is_speaking = False
-                    speech_frames = 0
-                    silence_frames = 0
-
-            elif event == "stop":
-                # print("Call Ended.")
-                await broadcast_log("🛑 Call Ended (Twilio Stop Event)", "warning")
-                break
-
-                
-    except WebSocketDisconnect:
-        # print("WebSocket Disconnected")
-        await broadcast_log("🔌 WebSocket Disconnected", "error")
-
+        await CallSession(websocket).run()
     except Exception as e:
         print(f"WS Error: {e}")
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Turn stage and graph node latency histograms (Prometheus text format)."""
+    from fastapi.responses import Response
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/calls")
+async def list_call_traces():
+    return {"calls": list(tracer.calls.keys())}
+
+@app.get("/api/calls/{call_id}/timeline")
+async def call_timeline(call_id: str):
+    """Per-call JSON timeline: per-turn stage latencies plus every event and span."""
+    trace = tracer.get(call_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired call id")
+    return trace.to_dict()
+
+@app.get("/api/tts_metrics")
+async def tts_metrics_endpoint():
+    """Time-to-first-audio, pacing jitter and prompt cache hits over recent utterances."""
+    return tts_metrics.snapshot()
+
+@app.get("/api/llm_cache")
+async def llm_cache_endpoint():
+    """LLM response cache hits/misses per node."""
+    return llm_cache.snapshot()
+
 # --- MAKE CALL ENDPOINT ---
 class MakeCallRequest(BaseModel):
     to_number: str
@@ -0,0 +1 @@
+# Call Record & Replay Module
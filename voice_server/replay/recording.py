@@ -0,0 +1,95 @@
+
+"""
+Compact recordings of Twilio /media-stream calls.
+
+File layout (gzip): b"MSCALL1\\n" then one record per inbound event:
+    <u32 ms since call start><u8 kind><u32 length><payload>
+Media payloads are stored as raw mu-law bytes (not base64), other events as
+their JSON text. Transcripts seen live are stored too, so a replay can
+answer ASR with what the caller actually said.
+"""
+import base64
+import gzip
+import json
+import os
+import struct
+import time
+from typing import Iterator, List, NamedTuple, Optional
+
+MAGIC = b"MSCALL1\n"
+_HEADER = struct.Struct("<IBI")
+
+MEDIA, START, MARK, STOP, TRANSCRIPT, OTHER = range(6)
+_KINDS = {"media": MEDIA, "start": START, "mark": MARK, "stop": STOP}
+
+
+class RecordedEvent(NamedTuple):
+    offset_ms: int
+    kind: int
+    payload: bytes
+
+    def to_packet(self, stream_sid: Optional[str] = None) -> str:
+        """Rebuild the Twilio JSON message for this event."""
+        if self.kind == MEDIA:
+            return json.dumps({
+                "event": "media", "streamSid": stream_sid,
+                "media": {"payload": base64.b64encode(self.payload).decode("utf-8")}
+            })
+        return self.payload.decode("utf-8")
+
+
+class CallRecorder:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._file = gzip.open(path, "wb", compresslevel=6)
+        self._file.write(MAGIC)
+        self._t0 = time.monotonic()
+
+    def record_packet(self, packet: dict, raw: str):
+        event = packet.get("event")
+        kind = _KINDS.get(event, OTHER)
+        if kind == MEDIA:
+            payload = base64.b64decode(packet.get("media", {}).get("payload") or "")
+        else:
+            payload = raw.encode("utf-8")
+        self._write(kind, payload)
+
+    def record_transcript(self, transcript: str):
+        self._write(TRANSCRIPT, (transcript or "").encode("utf-8"))
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def _write(self, kind: int, payload: bytes):
+        if self._file.closed:
+            return
+        offset = int((time.monotonic() - self._t0) * 1000)
+        self._file.write(_HEADER.pack(offset, kind, len(payload)))
+        self._file.write(payload)
+
+
+def read_recording(path: str) -> Iterator[RecordedEvent]:
+    with gzip.open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a media-stream recording")
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            offset, kind, length = _HEADER.unpack(header)
+            yield RecordedEvent(offset, kind, f.read(length))
+
+
+def recorded_transcripts(path: str) -> List[str]:
+    return [e.payload.decode("utf-8") for e in read_recording(path) if e.kind == TRANSCRIPT]
+
+
+def write_recording(path: str, events: List[RecordedEvent]):
+    """Write already-built events (used for synthetic calls)."""
+    with gzip.open(path, "wb") as f:
+        f.write(MAGIC)
+        for e in events:
+            f.write(_HEADER.pack(e.offset_ms, e.kind, len(e.payload)))
+            f.write(e.payload)
@@ -0,0 +1,235 @@
+
+"""
+Replays a recorded call against CallSession without Twilio.
+
+ReplayWebSocket plays the Twilio side: it delivers the recorded inbound
+events on their original schedule (scaled by `speed`), and answers our
+outbound `mark` events once the audio queued before them would have
+finished playing, like Twilio does (a `clear` releases them at once).
+
+With `align=True` the caller audio after each recorded `speech_end` mark
+is held until the replayed agent has actually finished its reply, so a
+slower or faster build still hears every utterance in full.
+"""
+import asyncio
+import base64
+import json
+import math
+import random
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import WebSocketDisconnect
+
+from voice_server.audio.codec import SAMPLE_RATE, encode_mulaw
+from voice_server.core.tracing import TURN_STAGES
+from voice_server.replay.recording import MARK, MEDIA, START, STOP, TRANSCRIPT, RecordedEvent
+
+FRAME_MS = 20
+
+
+class ReplayWebSocket:
+    def __init__(self, events: List[RecordedEvent], speed: float = 1.0, align: bool = True,
+                 mark_timeout: float = 30.0):
+        self.speed = speed
+        self.align = align
+        self.mark_timeout = mark_timeout
+        self.before_stop: Optional[Callable[[], Awaitable[None]]] = None
+        self.stream_sid = "replay"
+        self.outbound_frames = 0
+        self.marks_played = 0
+
+        # Segments: the caller's events between two recorded speech_end marks
+        self.segments: List[List[RecordedEvent]] = [[]]
+        self.segment_starts = [0]
+        for e in events:
+            if e.kind == TRANSCRIPT:
+                continue
+            if e.kind == MARK:
+                self.segments.append([])
+                self.segment_starts.append(e.offset_ms)
+                continue
+            if e.kind == START:
+                self.stream_sid = json.loads(e.payload).get("start", {}).get("streamSid") or self.stream_sid
+            self.segments[-1].append(e)
+
+        self._inbound: asyncio.Queue = asyncio.Queue()
+        self._mark_played = asyncio.Event()
+        self._playout_end = 0.0
+        self._pending_marks: Dict[int, Tuple[asyncio.TimerHandle, str]] = {}
+        self._mark_ids = 0
+
+    # --- WebSocket surface used by CallSession ---
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self) -> str:
+        data = await self._inbound.get()
+        if data is None:
+            raise WebSocketDisconnect(1000)
+        return data
+
+    async def send_text(self, data: str):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        message = json.loads(data)
+        event = message.get("event")
+        if event == "media":
+            self.outbound_frames += 1
+            seconds = len(base64.b64decode(message["media"]["payload"])) / SAMPLE_RATE
+            self._playout_end = max(self._playout_end, now) + seconds / self.speed
+        elif event == "mark":
+            packet = json.dumps({"event": "mark", "streamSid": self.stream_sid, "mark": message.get("mark", {})})
+            self._mark_ids += 1
+            handle = loop.call_later(max(0.0, self._playout_end - now), self._deliver_mark, self._mark_ids)
+            self._pending_marks[self._mark_ids] = (handle, packet)
+        elif event == "clear":
+            # Twilio drops buffered audio and returns the outstanding marks immediately
+            self._playout_end = now
+            for mark_id, (handle, _) in list(self._pending_marks.items()):
+                handle.cancel()
+                self._deliver_mark(mark_id)
+
+    def _deliver_mark(self, mark_id: int):
+        _, packet = self._pending_marks.pop(mark_id)
+        self._inbound.put_nowait(packet)
+        self.marks_played += 1
+        self._mark_played.set()
+
+    # --- Caller side ---
+
+    async def play(self):
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        for n, (segment, start_ms) in enumerate(zip(self.segments, self.segment_starts)):
+            if n and self.align:
+                await self._wait_for_marks(n)
+                t0 = loop.time() - start_ms / 1000 / self.speed
+            for e in segment:
+                delay = t0 + e.offset_ms / 1000 / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if e.kind == STOP and self.before_stop:
+                    await self.before_stop()
+                await self._inbound.put(e.to_packet(self.stream_sid))
+        if self.before_stop:
+            await self.before_stop()
+        await self._inbound.put(None)  # Recording without a stop event: disconnect
+
+    async def _wait_for_marks(self, count: int):
+        try:
+            async with asyncio.timeout(self.mark_timeout):
+                while self.marks_played < count:
+                    self._mark_played.clear()
+                    await self._mark_played.wait()
+        except TimeoutError:
+            print(f"⚠️ Replay: agent never finished reply {count} (no speech_end mark), continuing")
+
+
+async def replay_session(session_cls, events: List[RecordedEvent], speed: float = 1.0, align: bool = True):
+    """Run one CallSession against the recording. Returns the session (see session.trace)."""
+    ws = ReplayWebSocket(events, speed=speed, align=align)
+    session = session_cls(ws)
+
+    async def wait_idle():
+        # Let the last reply finish before the caller hangs up
+        for _ in range(int(ws.mark_timeout / 0.05)):
+            if session.listening_mode and session.turn_queue.empty() and session.speech_queue.empty():
+                return
+            await asyncio.sleep(0.05)
+
+    ws.before_stop = wait_idle
+    caller = asyncio.create_task(ws.play())
+    try:
+        await session.run()
+    finally:
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+    return session
+
+
+# --- REPORT ---
+
+def turn_latencies(turns: List[Dict[str, float]]) -> Dict[str, List[float]]:
+    """Milliseconds per stage over the turns that reached it (turns = CallTrace.turns)."""
+    out = {name: [] for name in TURN_STAGES}
+    for turn in turns:
+        for name, (a, b) in TURN_STAGES.items():
+            if a in turn and b in turn:
+                out[name].append((turn[b] - turn[a]) * 1000)
+    return out
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]  # Nearest rank
+
+
+def summarize(latencies: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        name: {
+            "turns": len(values),
+            "p50_ms": percentile(values, 0.5),
+            "p95_ms": percentile(values, 0.95),
+            "max_ms": max(values) if values else None,
+        }
+        for name, values in latencies.items()
+    }
+
+
+# --- SYNTHETIC CALLS ---
+
+def _voiced(seconds: float, rms: float, rnd: random.Random) -> List[float]:
+    """Harmonic 'syllables' with short gaps (voiced enough for webrtcvad)."""
+    f0 = rnd.uniform(110, 220)
+    samples: List[float] = []
+    while len(samples) < seconds * SAMPLE_RATE:
+        syl = int(rnd.uniform(0.12, 0.3) * SAMPLE_RATE)
+        t = len(samples)
+        for i in range(syl):
+            env = math.sin(math.pi * i / syl)
+            v = sum(math.sin(2 * math.pi * f0 * h * (t + i) / SAMPLE_RATE) / h for h in range(1, 6))
+            samples.append(rms * 1.6 * env * v + rnd.gauss(0, 30))
+        samples.extend(rnd.gauss(0, 30) for _ in range(int(rnd.uniform(0.03, 0.09) * SAMPLE_RATE)))
+    return samples
+
+
+def _noise(seconds: float, rnd: random.Random) -> List[float]:
+    return [rnd.gauss(0, 30) for _ in range(int(seconds * SAMPLE_RATE))]
+
+
+def synthetic_call(transcripts: List[str], seed: int = 0, pause: float = 0.6) -> List[RecordedEvent]:
+    """
+    A recording of a caller answering each agent reply with one utterance
+    (~0.3s of speech per word), with the transcripts ASR should return.
+    """
+    rnd = random.Random(seed)
+    events: List[RecordedEvent] = []
+    t_ms = 0
+
+    def media(samples: List[float]):
+        nonlocal t_ms
+        pcm = b"".join(int(max(-32768, min(32767, s))).to_bytes(2, "little", signed=True) for s in samples)
+        audio = encode_mulaw(pcm)
+        step = SAMPLE_RATE * FRAME_MS // 1000
+        for i in range(0, len(audio) - step + 1, step):
+            events.append(RecordedEvent(t_ms, MEDIA, audio[i:i + step]))
+            t_ms += FRAME_MS
+
+    def packet(kind: int, message: dict):
+        events.append(RecordedEvent(t_ms, kind, json.dumps(message).encode("utf-8")))
+
+    packet(START, {"event": "start", "start": {"streamSid": "MZreplay"}})
+    media(_noise(0.5, rnd))
+    for text in transcripts:
+        packet(MARK, {"event": "mark", "mark": {"name": "speech_end"}})
+        media(_noise(pause, rnd))
+        media(_voiced(max(0.6, 0.3 * len(text.split())), rnd.uniform(800, 3000), rnd))
+        media(_noise(1.0, rnd))
+        events.append(RecordedEvent(t_ms, TRANSCRIPT, text.encode("utf-8")))
+    packet(MARK, {"event": "mark", "mark": {"name": "speech_end"}})
+    media(_noise(0.5, rnd))
+    packet(STOP, {"event": "stop"})
+    return events
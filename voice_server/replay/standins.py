@@ -0,0 +1,139 @@
+
+"""
+Offline stand-ins for the Groq LLMs and the Chroma rules collection.
+
+They answer with canned, well-formed output after a configurable delay so a
+replayed call walks the real graphs (emergency scan -> retrieval ->
+diagnostician -> strategist -> booking) without network access.
+"""
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+QUESTIONS = [
+    "How long have you had these symptoms?",
+    "Do you have a fever?",
+    "Is the pain getting worse?",
+]
+
+SUMMARY = (
+    "Your symptoms suggest a mild viral infection that should settle with rest and fluids. "
+    "Please watch for a high fever, difficulty breathing or chest pain. "
+    "If any of these appear, see a doctor immediately. Otherwise, monitor at home for 24 hours."
+)
+
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(m.content for m in messages if isinstance(m.content, str))
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"\S+\s*", text)
+
+
+class StandInChatModel(BaseChatModel):
+    """Chat model that answers `responder(prompt)` word by word after `latency` seconds."""
+
+    responder: Callable[[str], str]
+    latency: float = 0.3
+    token_delay: float = 0.01
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-stand-in"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self.responder(_prompt_text(messages))
+        time.sleep(self.latency + self.token_delay * len(_tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self.responder(_prompt_text(messages))
+        await asyncio.sleep(self.latency + self.token_delay * len(_tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        text = self.responder(_prompt_text(messages))
+        await asyncio.sleep(self.latency)
+        for i, token in enumerate(_tokens(text)):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class StandInGroqClient:
+    """Duck-types `AsyncGroq().chat.completions.create` for the diagnostician."""
+
+    def __init__(self, responder: Callable[[str], str], latency: float = 0.5):
+        self.responder = responder
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, messages: List[dict], **kwargs) -> Any:
+        await asyncio.sleep(self.latency)
+        content = self.responder(messages[-1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class StandInCollection:
+    """Answers `col_rules.query` with fixed guideline snippets."""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+
+    def query(self, query_texts: List[str], n_results: int = 3, **kwargs) -> dict:
+        time.sleep(self.latency)
+        docs = [f"Guideline {i + 1}: assess onset, severity and red flags." for i in range(n_results)]
+        return {"documents": [docs], "ids": [[f"rule_{i}" for i in range(n_results)]]}
+
+
+def scanner_response(prompt: str) -> str:
+    return json.dumps({"is_emergency": False, "reason": "replay stand-in"})
+
+
+def intent_response(prompt: str) -> str:
+    return json.dumps({"intent": "ANSWER", "reason": "replay stand-in"})
+
+
+def strategist_response(prompt: str) -> str:
+    if "confused" in prompt:
+        return "I am asking how long you have felt unwell. How long have you had these symptoms?"
+    return SUMMARY
+
+
+def diagnostician_response(prompt: str) -> str:
+    if "new_questions_to_add" in prompt:
+        # Follow-up: work through the initial plan, then let the strategist summarize
+        return json.dumps({"differential_diagnosis": ["Viral infection"], "new_questions_to_add": [], "stop_asking": False})
+    return json.dumps({"differential_diagnosis": ["Viral infection"], "new_questions": QUESTIONS})
+
+
+def install_standins(llm_ms: float = 300, diagnostician_ms: float = 600, token_ms: float = 10,
+                     retrieval_ms: Optional[float] = 50):
+    """
+    Patch the graph nodes' module-level clients. `retrieval_ms=None` keeps the
+    real Chroma collection (needs the embedding model on disk).
+    """
+    from voice_server.agent.nodes import diagnostician, emergency, retrieval, strategist
+    from voice_server.booking_agent.nodes import scheduler
+
+    llm = dict(latency=llm_ms / 1000, token_delay=token_ms / 1000)
+    emergency.llm_scanner = StandInChatModel(responder=scanner_response, **llm)
+    strategist.llm_fast = StandInChatModel(responder=intent_response, **llm)
+    strategist.llm_strategist = StandInChatModel(responder=strategist_response, **llm)
+    scheduler.llm_booking = StandInChatModel(responder=intent_response, **llm)
+    diagnostician.client = StandInGroqClient(diagnostician_response, latency=diagnostician_ms / 1000)
+    if retrieval_ms is not None:
+        retrieval.col_rules = StandInCollection(latency=retrieval_ms / 1000)
+        retrieval.rules_index = None
+        retrieval.hybrid = None